@@ -8,10 +8,98 @@ class Settings(BaseSettings):
     telnyx_phone_number: str = os.getenv("TELNYX_PHONE_NUMBER", "")
     telnyx_public_key: Optional[str] = os.getenv("TELNYX_PUBLIC_KEY", "")  # For webhook verification
     telnyx_api_url: str = "https://api.telnyx.com/v2"
+    # Shared Call Control HTTP client / per-call command queue tuning
+    telnyx_http_max_connections: int = 100
+    telnyx_http_max_keepalive: int = 20
+    telnyx_http_timeout: float = 10.0
+    telnyx_queue_idle_seconds: float = 30.0
+    # Speech recognition mode for the Telnyx call flow: "recording" (record -> download -> Whisper)
+    # or "streaming" (media stream websocket -> streaming transcriber)
+    stt_mode: str = os.getenv("STT_MODE", "recording")
+    stt_streaming_provider: str = os.getenv("STT_STREAMING_PROVIDER", "whisper")  # whisper | local
+    stt_vad_threshold: float = 500.0
+    stt_silence_ms: int = 700
+    # Public wss:// base URL Telnyx connects media streams to (e.g. wss://bakame.fly.dev); required for streaming
+    public_ws_base_url: str = os.getenv("PUBLIC_WS_BASE_URL", "")
+    # Speak AI responses sentence by sentence while the LLM is still generating
+    stream_llm_responses: bool = True
+    # Forward µ-law base64 payloads between Telnyx and OpenAI Realtime without decoding
+    voice_bridge_passthrough: bool = True
+    # Stop AI playback when the caller starts talking (server VAD, plus the local VAD when enabled)
+    voice_bridge_barge_in: bool = True
+    # Local energy VAD on inbound frames: triggers barge-in at speech start without waiting
+    # for the server (costs a µ-law decode per frame)
+    voice_bridge_local_vad: bool = False
+    # Per-direction bridge queues, in messages, and what a full queue does ("block" or "drop_oldest").
+    # Caller audio blocks the Telnyx reader rather than lose speech; late playback audio is dropped.
+    voice_bridge_upstream_queue_messages: int = 50
+    voice_bridge_upstream_overflow: str = "block"
+    voice_bridge_downstream_queue_messages: int = 500
+    voice_bridge_downstream_overflow: str = "drop_oldest"
+    # Send AI audio to Telnyx as 20 ms frames at wall-clock rate, starting once jitter_ms is buffered,
+    # instead of forwarding OpenAI's bursts; unplayed audio beyond the cap is dropped oldest-first
+    voice_bridge_paced_output: bool = True
+    voice_bridge_jitter_ms: int = 60
+    voice_bridge_max_playout_buffer_ms: int = 30000
+    # Warm OpenAI Realtime sessions kept ready for call pickup. OpenAI ends a session 30 minutes
+    # after it opens, so idle ones are recycled early enough to leave the call most of that.
+    # Off by default: only worth the open websockets once a route starts voice bridge sessions.
+    realtime_pool_enabled: bool = False
+    realtime_pool_size: int = 2
+    realtime_pool_max_idle_seconds: float = 300.0
+    # Webhook ingestion queue
+    webhook_queue_max_depth: int = 1000
+    webhook_workers: int = 8
+    # Background call pipelines per worker, and how long shutdown waits for them
+    max_concurrent_pipelines: int = 20
+    shutdown_drain_seconds: float = 10.0
+    # Drop webhook retries by Telnyx event ID ("memory" or "redis"; follows the call state backend by default)
+    webhook_dedup_backend: str = os.getenv("WEBHOOK_DEDUP_BACKEND", os.getenv("CALL_STATE_BACKEND", "memory"))
+    webhook_dedup_window_seconds: float = 600
+    webhook_dedup_max_events: int = 10000
+    # Shared per-call state and locks: "memory" (single worker) or "redis" (multiple uvicorn workers)
+    call_state_backend: str = os.getenv("CALL_STATE_BACKEND", "memory")
+    call_state_ttl_seconds: float = 14400
+    call_lock_lease_seconds: float = 10.0
+    call_lock_wait_seconds: float = 5.0
+    # Pre-generated greeting/error utterance pool for the legacy /webhook routes
+    utterance_pool_size: int = 5
+    utterance_pool_refill_per_minute: float = 30.0
+    utterance_pool_ttl_seconds: float = 3600.0
+    # Pre-generated math problems / comprehension stories per (module, difficulty, theme) bucket,
+    # refilled by background workers sharing one generation rate
+    content_pool_depth: int = 2
+    content_pool_refill_per_minute: float = 20.0
+    content_pool_workers: int = 2
+    # A module is no longer pooled after this many rejected generations in a row with none ever valid
+    content_pool_reject_limit: int = 10
+    # Local comprehension grading: score >= accept is correct, <= reject is wrong, the LLM decides
+    # in between (calibrated with benchmark_answer_grader.py)
+    answer_grader_accept: float = 0.5
+    answer_grader_reject: float = 0.2
     # Only use OPENAIAPI environment variable
     openai_api_key: str = os.getenv("OPENAIAPI", "")
+    openai_realtime_url: str = "wss://api.openai.com/v1/realtime?model=gpt-realtime"
+    # Shared async chat completions client: connection pool, per-request timeout and SDK retries
+    # (exponential backoff on connection errors, 408/409/429 and 5xx). Base URL None = api.openai.com
+    openai_base_url: Optional[str] = None
+    openai_http_max_connections: int = 100
+    openai_http_max_keepalive: int = 20
+    openai_timeout_seconds: float = 20.0
+    openai_max_retries: int = 2
+    # Results of temperature 0 chat completions are reused for this long (identical concurrent
+    # requests are always coalesced onto one call)
+    openai_cache_ttl_seconds: float = 300.0
+    openai_cache_max_entries: int = 256
     llama_api_key: str = os.getenv("LLAMA_API_KEY", "")
     use_llama: bool = False  # Use OpenAI by default
+    # Llama -> OpenAI provider router: Llama request timeout; hedge delay after which OpenAI is asked
+    # too (first answer wins); a provider is skipped for breaker_reset_seconds after
+    # breaker_failures consecutive failures
+    llama_timeout_seconds: float = 8.0
+    llm_hedge_ms: int = 1500
+    llm_breaker_failures: int = 3
+    llm_breaker_reset_seconds: float = 30.0
     newsapi_key: str = os.getenv("NEWSAPI_KEY", "")
     deepgram_api_key: str = os.getenv("DEEPGRAM_API_KEY", "")
     redis_url: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
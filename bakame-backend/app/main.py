@@ -1,7 +1,16 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
 from app.routers import webhooks, telnyx_webhooks
+from app.services.telnyx_service import telnyx_service
+from app.services.call_state_service import call_state
+from app.services.webhook_dedup_service import webhook_deduplicator
+from app.services.task_supervisor_service import call_tasks
+from app.services.realtime_pool_service import realtime_pool
+from app.services.content_pool_service import content_pool
+from app.services.openai_service import openai_service
+from app.services.llama_service import llama_service
 import logging
 
 # Configure logging
@@ -14,10 +23,34 @@ logging.basicConfig(
     ]
 )
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background services on boot; drain them and release shared connections on shutdown"""
+    if settings.stt_mode == "streaming" and not settings.public_ws_base_url.startswith(("ws://", "wss://")):
+        # Telnyx needs an absolute URL to open the media stream to - fail at boot, not on every call
+        raise RuntimeError("STT_MODE=streaming requires PUBLIC_WS_BASE_URL (e.g. wss://bakame.fly.dev)")
+    telnyx_webhooks.ingestion_queue.start()
+    webhooks.utterance_pool.start()
+    if settings.realtime_pool_enabled:
+        realtime_pool.start()
+    yield
+    await webhooks.utterance_pool.stop()
+    await realtime_pool.stop()
+    # Started on first use by the math/comprehension modules
+    await content_pool.stop()
+    await telnyx_webhooks.ingestion_queue.stop()
+    await call_tasks.drain(settings.shutdown_drain_seconds)
+    await telnyx_service.close()
+    await openai_service.close()
+    await llama_service.close()
+    await call_state.close()
+    await webhook_deduplicator.close()
+
 app = FastAPI(
     title="BAKAME Learning Assistant API",
     description="Voice-based educational platform for feature phones - Telnyx Integration",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -1,14 +1,36 @@
+import json
 import random
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from app.services.openai_service import openai_service
 from app.services.llama_service import llama_service
 from app.services.emotional_intelligence_service import emotional_intelligence_service
 from app.services.gamification_service import gamification_service
+from app.services.content_pool_service import content_pool
+from app.services.answer_grader_service import answer_grader
 from app.config import settings
 
+DYNAMIC_DIFFICULTIES = ["basic", "intermediate", "advanced"]
+
+# Title + 150-200 word story + three question/answer pairs as JSON runs to ~450 tokens;
+# the default completion caps (300 OpenAI, 100 Llama) cut it off mid-object
+STORY_MAX_TOKENS = 800
+
+STORY_THEMES = [
+    "community cooperation and Ubuntu philosophy",
+    "innovation and technology in modern Rwanda",
+    "environmental conservation in the Land of a Thousand Hills",
+    "education and youth empowerment",
+    "cultural traditions meeting modern life",
+    "entrepreneurship and economic development",
+    "unity and reconciliation",
+    "agricultural innovation and food security"
+]
+
 class ComprehensionModule:
     def __init__(self):
         self.module_name = "comprehension"
+        # Stories are generated ahead of time; a student only waits on the LLM on a cold miss
+        content_pool.register(self.module_name, DYNAMIC_DIFFICULTIES, STORY_THEMES, self._generate_dynamic_story)
         self.sample_stories = [
             {
                 "title": "The Community Garden in Kigali",
@@ -86,7 +108,7 @@ class ComprehensionModule:
         stories_completed = user_stats.get("comprehension_stories_completed", 0)
         
         if stories_completed >= 2:
-            dynamic_story = await self._generate_dynamic_story(user_context)
+            dynamic_story = await content_pool.get(self.module_name, self._dynamic_difficulty(user_context))
             if dynamic_story:
                 user_context.setdefault("user_state", {})["current_story"] = dynamic_story
                 user_context["user_state"]["current_question_index"] = 0
@@ -111,15 +133,24 @@ class ComprehensionModule:
         correct_answer = current_story["answers"][question_index]
         question = current_story["questions"][question_index]
         
-        messages = [
-            {"role": "user", "content": f"Question: {question}\nCorrect answer: {correct_answer}\nUser's answer: {user_input}\n\nIs the user's answer correct? Consider variations in wording. Respond with 'CORRECT' or 'INCORRECT' followed by brief feedback."}
-        ]
-        
-        if settings.use_llama:
-            evaluation = await llama_service.generate_response(messages, self.module_name)
+        # Clear matches and clear misses are graded locally; only borderline answers cost an LLM round trip
+        grade = answer_grader.grade(user_input, correct_answer)
+        if grade.verdict is True:
+            evaluation = "CORRECT Well remembered!"
+        elif grade.verdict is False:
+            evaluation = f"INCORRECT The story tells us: {correct_answer}."
         else:
-            evaluation = await openai_service.generate_response(messages, self.module_name)
-        is_correct = "CORRECT" in evaluation.upper()
+            messages = [
+                {"role": "user", "content": f"Question: {question}\nCorrect answer: {correct_answer}\nUser's answer: {user_input}\n\nIs the user's answer correct? Consider variations in wording. Respond with 'CORRECT' or 'INCORRECT' followed by brief feedback."}
+            ]
+            
+            if settings.use_llama:
+                evaluation = await llama_service.generate_response(messages, self.module_name)
+            else:
+                # Deterministic, so the same borderline answer to the same question is graded once
+                evaluation = await openai_service.generate_response(messages, self.module_name, temperature=0)
+        # "CORRECT" in evaluation would also match "INCORRECT"
+        is_correct = evaluation.strip().upper().startswith("CORRECT")
         
         user_stats = user_context.get("user_state", {})
         
@@ -172,67 +203,52 @@ class ComprehensionModule:
                 user_input, base_response, emotion_data, self.module_name
             )
     
-    async def _generate_dynamic_story(self, user_context: Dict[str, Any]) -> Dict[str, Any]:
-        """Generate a new Rwanda-specific story using AI"""
+    def _dynamic_difficulty(self, user_context: Dict[str, Any]) -> str:
+        """Difficulty of the next generated story, from the student's average score so far"""
+        user_stats = user_context.get("user_state", {})
+        stories_completed = user_stats.get("comprehension_stories_completed", 0)
+        total_score = user_stats.get("comprehension_total_score", 0)
+        
+        if stories_completed > 0:
+            avg_score = total_score / stories_completed
+            if avg_score >= 0.8:
+                return "advanced"
+            elif avg_score >= 0.6:
+                return "intermediate"
+        return "basic"
+    
+    async def _generate_dynamic_story(self, difficulty: str, theme: str) -> Optional[Dict[str, Any]]:
+        """Generate a new Rwanda-specific story using AI; None unless it parses and validates"""
+        messages = [
+            {"role": "user", "content": f"Create a {difficulty}-level comprehension story about {theme} set in Rwanda. Include:\n\n1. A compelling title\n2. A 150-200 word story featuring Rwandan characters, places (like Kigali, Butare, Musanze), and cultural elements\n3. Exactly 3 comprehension questions that test understanding\n4. Clear answers for each question\n\nRespond with only a JSON object using double quotes: {{\"title\": \"Story Title\", \"content\": \"Story text...\", \"questions\": [\"Q1\", \"Q2\", \"Q3\"], \"answers\": [\"A1\", \"A2\", \"A3\"]}}"}
+        ]
+        
+        if settings.use_llama:
+            response = await llama_service.generate_response(messages, self.module_name, max_tokens=STORY_MAX_TOKENS)
+        else:
+            response = await openai_service.generate_response(messages, self.module_name, max_tokens=STORY_MAX_TOKENS)
+        
+        start_idx = response.find('{')
+        end_idx = response.rfind('}') + 1
+        if start_idx == -1 or end_idx == 0:
+            return None
         try:
-            user_stats = user_context.get("user_state", {})
-            stories_completed = user_stats.get("comprehension_stories_completed", 0)
-            total_score = user_stats.get("comprehension_total_score", 0)
-            
-            if stories_completed > 0:
-                avg_score = total_score / stories_completed
-                if avg_score >= 0.8:
-                    difficulty = "advanced"
-                elif avg_score >= 0.6:
-                    difficulty = "intermediate"
-                else:
-                    difficulty = "basic"
-            else:
-                difficulty = "basic"
-            
-            story_themes = [
-                "community cooperation and Ubuntu philosophy",
-                "innovation and technology in modern Rwanda",
-                "environmental conservation in the Land of a Thousand Hills",
-                "education and youth empowerment",
-                "cultural traditions meeting modern life",
-                "entrepreneurship and economic development",
-                "unity and reconciliation",
-                "agricultural innovation and food security"
-            ]
-            
-            theme = random.choice(story_themes)
-            
-            messages = [
-                {"role": "user", "content": f"Create a {difficulty}-level comprehension story about {theme} set in Rwanda. Include:\n\n1. A compelling title\n2. A 150-200 word story featuring Rwandan characters, places (like Kigali, Butare, Musanze), and cultural elements\n3. Exactly 3 comprehension questions that test understanding\n4. Clear answers for each question\n\nFormat as JSON: {{'title': 'Story Title', 'content': 'Story text...', 'questions': ['Q1', 'Q2', 'Q3'], 'answers': ['A1', 'A2', 'A3']}}"}
-            ]
-            
-            if settings.use_llama:
-                response = await llama_service.generate_response(messages, self.module_name)
-            else:
-                response = await openai_service.generate_response(messages, self.module_name)
-            
-            import json
-            try:
-                start_idx = response.find('{')
-                end_idx = response.rfind('}') + 1
-                if start_idx != -1 and end_idx != 0:
-                    json_str = response[start_idx:end_idx]
-                    story_data = json.loads(json_str)
-                    
-                    required_fields = ['title', 'content', 'questions', 'answers']
-                    if all(field in story_data for field in required_fields):
-                        if len(story_data['questions']) == 3 and len(story_data['answers']) == 3:
-                            return story_data
-                
-            except json.JSONDecodeError:
-                pass
-            
+            story_data = json.loads(response[start_idx:end_idx])
+        except json.JSONDecodeError:
             return None
-            
-        except Exception as e:
-            print(f"Error generating dynamic story: {e}")
+        if not isinstance(story_data, dict):
             return None
+        
+        for field in ("title", "content"):
+            if not isinstance(story_data.get(field), str) or not story_data[field].strip():
+                return None
+        for field in ("questions", "answers"):
+            items = story_data.get(field)
+            if not isinstance(items, list) or len(items) != 3:
+                return None
+            if not all(isinstance(item, str) and item.strip() for item in items):
+                return None
+        return story_data
     
     def get_welcome_message(self) -> str:
         """Get welcome message for Comprehension module"""
@@ -1,16 +1,22 @@
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator
 from app.services.openai_service import openai_service
 
 class GeneralModule:
     def __init__(self):
         self.module_name = "english_conversation"
     
-    async def process(self, user_input: str, user_context: Dict[str, Any]) -> str:
-        """Always call OpenAI for every input - no hardcoding, no history"""
+    async def process(self, user_input: str, user_context: Dict[str, Any], temperature: float = 0.9) -> str:
+        """Always call OpenAI for every input - no hardcoding, no history (temperature 0 for canned prompts, which are cached)"""
         print(f"[Module] Processing: {user_input}")
         # Direct pass to OpenAI - no modifications, no history
-        response = await openai_service.generate_response(user_input, {})
+        response = await openai_service.generate_response(user_input, {}, temperature=temperature)
         print(f"[Module] Returning: {response[:100]}...")
         return response
+    
+    async def stream(self, user_input: str, user_context: Dict[str, Any]) -> AsyncIterator[str]:
+        """Streaming variant of process - yields response text as it is generated"""
+        print(f"[Module] Streaming: {user_input}")
+        async for token in openai_service.stream_response(user_input, {}):
+            yield token
 
 general_module = GeneralModule()
\ No newline at end of file
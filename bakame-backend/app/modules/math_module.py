@@ -1,15 +1,35 @@
+import json
 import random
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from app.services.openai_service import openai_service
 from app.services.llama_service import llama_service
 from app.services.emotional_intelligence_service import emotional_intelligence_service
 from app.services.gamification_service import gamification_service
 from app.services.multimodal_service import multimodal_service
+from app.services.content_pool_service import content_pool
 from app.config import settings
 
+DYNAMIC_DIFFICULTIES = ["easy", "medium", "hard"]
+
+# Enough for the JSON object with a worded scenario (Llama's default cap of 100 truncates it)
+PROBLEM_MAX_TOKENS = 300
+
+PROBLEM_CONTEXTS = [
+    "market transactions in Kigali using Rwandan francs (RWF)",
+    "calculating distances between Rwandan cities (Kigali, Butare, Musanze, Gisenyi)",
+    "agricultural calculations for coffee or tea farming",
+    "construction projects for community buildings",
+    "mobile money transactions and savings",
+    "school supplies and educational costs",
+    "transportation costs between provinces",
+    "community development project budgets"
+]
+
 class MathModule:
     def __init__(self):
         self.module_name = "math"
+        # Rwanda-specific problems are generated ahead of time; a student only waits on the LLM on a cold miss
+        content_pool.register(self.module_name, DYNAMIC_DIFFICULTIES, PROBLEM_CONTEXTS, self._generate_dynamic_problem)
     
     async def process(self, user_input: str, user_context: Dict[str, Any]) -> str:
         """Process mental math input with multimodal adaptation"""
@@ -43,7 +63,7 @@ class MathModule:
         problems_completed = user_stats.get("math_problems_attempted", 0)
         
         if problems_completed >= 3:
-            dynamic_problem = await self._generate_dynamic_problem(user_context)
+            dynamic_problem = await content_pool.get(self.module_name, self._dynamic_difficulty(user_context))
             if dynamic_problem:
                 user_context.setdefault("user_state", {})["current_math_problem"] = dynamic_problem
                 return f"Here's a Rwanda-specific math problem: {dynamic_problem['question']} Please give me your answer."
@@ -180,65 +200,52 @@ class MathModule:
         """Get welcome message for Math module"""
         return "Muraho! 🧮✨ I'm excited to explore math together using Rwandan contexts! We'll work with Rwandan francs, calculate distances between our beautiful cities like Kigali and Butare, and solve problems that connect to daily life in Rwanda. Math helps build our nation's future in technology and development. Ready to strengthen those mental muscles? Byiza, let's start!"
 
-    async def _generate_dynamic_problem(self, user_context: Dict[str, Any]) -> Dict[str, Any]:
-        """Generate a new Rwanda-specific math problem using AI"""
+    def _dynamic_difficulty(self, user_context: Dict[str, Any]) -> str:
+        """Difficulty of the next Rwanda-specific problem, from the student's accuracy so far"""
+        user_stats = user_context.get("user_state", {})
+        problems_attempted = user_stats.get("math_problems_attempted", 0)
+        problems_correct = user_stats.get("math_problems_correct", 0)
+        
+        if problems_attempted > 0:
+            accuracy = problems_correct / problems_attempted
+            if accuracy >= 0.8:
+                return "hard"
+            elif accuracy >= 0.6:
+                return "medium"
+        return "easy"
+
+    async def _generate_dynamic_problem(self, difficulty: str, context: str) -> Optional[Dict[str, Any]]:
+        """Generate a new Rwanda-specific math problem using AI; None unless it parses and validates"""
+        messages = [
+            {"role": "user", "content": f"Create a {difficulty}-level math problem about {context} in Rwanda. Include:\n\n1. A realistic scenario with Rwandan context\n2. A clear math question\n3. The correct numerical answer\n\nRespond with only a JSON object using double quotes: {{\"question\": \"A farmer in Musanze...\", \"answer\": 150, \"context\": \"agricultural\"}}"}
+        ]
+        
+        if settings.use_llama:
+            response = await llama_service.generate_response(messages, self.module_name, max_tokens=PROBLEM_MAX_TOKENS)
+        else:
+            response = await openai_service.generate_response(messages, self.module_name, max_tokens=PROBLEM_MAX_TOKENS)
+        
+        start_idx = response.find('{')
+        end_idx = response.rfind('}') + 1
+        if start_idx == -1 or end_idx == 0:
+            return None
         try:
-            user_stats = user_context.get("user_state", {})
-            problems_attempted = user_stats.get("math_problems_attempted", 0)
-            problems_correct = user_stats.get("math_problems_correct", 0)
-            
-            if problems_attempted > 0:
-                accuracy = problems_correct / problems_attempted
-                if accuracy >= 0.8:
-                    difficulty = "hard"
-                elif accuracy >= 0.6:
-                    difficulty = "medium"
-                else:
-                    difficulty = "easy"
-            else:
-                difficulty = "easy"
-            
-            problem_contexts = [
-                "market transactions in Kigali using Rwandan francs (RWF)",
-                "calculating distances between Rwandan cities (Kigali, Butare, Musanze, Gisenyi)",
-                "agricultural calculations for coffee or tea farming",
-                "construction projects for community buildings",
-                "mobile money transactions and savings",
-                "school supplies and educational costs",
-                "transportation costs between provinces",
-                "community development project budgets"
-            ]
-            
-            context = random.choice(problem_contexts)
-            
-            messages = [
-                {"role": "user", "content": f"Create a {difficulty}-level math problem about {context} in Rwanda. Include:\n\n1. A realistic scenario with Rwandan context\n2. A clear math question\n3. The correct numerical answer\n\nFormat as JSON: {{'question': 'A farmer in Musanze...', 'answer': 150, 'context': 'agricultural'}}"}
-            ]
-            
-            if settings.use_llama:
-                response = await llama_service.generate_response(messages, self.module_name)
-            else:
-                response = await openai_service.generate_response(messages, self.module_name)
-            
-            import json
-            try:
-                start_idx = response.find('{')
-                end_idx = response.rfind('}') + 1
-                if start_idx != -1 and end_idx != 0:
-                    json_str = response[start_idx:end_idx]
-                    problem_data = json.loads(json_str)
-                    
-                    required_fields = ['question', 'answer']
-                    if all(field in problem_data for field in required_fields):
-                        return problem_data
-                
-            except json.JSONDecodeError:
-                pass
-            
+            problem_data = json.loads(response[start_idx:end_idx])
+        except json.JSONDecodeError:
             return None
-            
-        except Exception as e:
-            print(f"Error generating dynamic math problem: {e}")
+        if not isinstance(problem_data, dict):
+            return None
+        
+        question = problem_data.get("question")
+        if not isinstance(question, str) or not question.strip():
+            return None
+        # _check_math_answer compares numerically, so "150 RWF" or "about 3" can't be used
+        try:
+            answer = float(str(problem_data.get("answer")).replace(",", ""))
+        except ValueError:
             return None
+        problem_data["answer"] = int(answer) if answer.is_integer() else round(answer, 2)
+        problem_data["question"] = question.strip()
+        return problem_data
 
 math_module = MathModule()
@@ -8,6 +8,7 @@ from app.services.gamification_service import gamification_service
 from app.services.emotional_intelligence_service import emotional_intelligence_service
 from app.services.community_service import community_service
 from app.services.teacher_service import teacher_service
+from app.services.llama_service import llama_service
 from app.models.database import get_db
 from app.models.auth import WebUser
 from app.routers.auth import get_current_user
@@ -285,6 +286,17 @@ async def get_engagement_metrics() -> Dict[str, Any]:
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving engagement metrics: {str(e)}")
 
+@router.get("/analytics/llm-providers")
+async def get_llm_provider_stats() -> Dict[str, Any]:
+    """Per-provider success rate, latency and circuit state for the Llama -> OpenAI router"""
+    try:
+        return {
+            "status": "success",
+            "message": "LLM provider stats retrieved",
+            "data": llama_service.get_stats()
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving LLM provider stats: {str(e)}")
 
 @router.get("/community/analytics")
 async def get_community_analytics():
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Request, Response, HTTPException
+from fastapi import APIRouter, Request, Response, HTTPException, WebSocket, WebSocketDisconnect
 from typing import Dict, Any, Optional
 import json
 import logging
@@ -6,9 +6,25 @@ import os
 import asyncio
 import requests
 import html
+import base64
+import urllib.parse
 from app.services.telnyx_service import telnyx_service
 from app.services.stt_service import stt_service
+from app.services.streaming_stt_service import StreamingSTTSession, create_transcriber, streaming_stt_stats
+from app.services.response_streaming_service import response_streamer
+from app.services.webhook_ingestion_service import WebhookIngestionQueue, IngestionQueueFull
+from app.services.call_state_service import call_state
+from app.services.webhook_dedup_service import webhook_deduplicator
+from app.services.call_fsm_service import call_fsm, CallPhase
+from app.services.task_supervisor_service import call_tasks
+from app.services.voice_bridge_service import voice_bridge_service
+from app.services.realtime_pool_service import realtime_pool
+from app.services.content_pool_service import content_pool
+from app.services.answer_grader_service import answer_grader
+from app.services.openai_service import openai_service
+from app.services.llama_service import llama_service
 from app.modules.general_module import general_module
+from app.config import settings
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -16,14 +32,30 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Fixed phrases spoken on calls
+GREETING = "Hello! I'm your AI assistant. How can I help you today?"
+THINKING_MESSAGE = "Got it! Let me think about that for a moment."
+ERROR_REQUEST = "I'm sorry, there was an error processing your request."
+ERROR_MESSAGE = "I'm sorry, there was an error processing your message. Please try again."
+ERROR_NOT_CAUGHT = "I'm sorry, I didn't catch that. Could you please repeat?"
+ERROR_RECORDING_ACCESS = "I'm sorry, I had trouble accessing the recording. Please try again."
+ERROR_RECORDING_MISSING = "I'm sorry, there was a problem with the recording."
+
+# client_state tag on the "thinking" filler - its speak.ended must not start a new recording
+FILLER_STATE = "thinking_filler"
+
 # Store call sessions for maintaining context
-call_sessions = {}
+# Per-call state lives in call_state (shared across uvicorn workers when backed by Redis)
 
 @router.post("/incoming")
 async def handle_telnyx_webhook(request: Request):
     """
     Main webhook endpoint for all Telnyx events
     Replaces the old /webhook/call endpoint from Twilio
+    
+    Validates and enqueues the event, then acks immediately.
+    Retried deliveries (same event id) are acked without being queued again.
+    The ingestion workers run the actual handlers (see dispatch_telnyx_event).
     """
     try:
         # Get the raw body for signature verification
@@ -32,90 +64,150 @@ async def handle_telnyx_webhook(request: Request):
         # Parse JSON payload
         webhook_data = await request.json()
         
-        # Log all webhook events for debugging
-        logger.info(f"[Telnyx Webhook] Received event: {json.dumps(webhook_data, indent=2)}")
-        
         # Verify webhook signature (optional but recommended for production)
         # signature = request.headers.get("telnyx-signature")
         # if not telnyx_service.verify_webhook_signature(body, signature):
         #     logger.error("Invalid webhook signature")
         #     raise HTTPException(status_code=401, detail="Invalid signature")
         
-        # Extract event data
-        event_data = webhook_data.get("data", {})
-        event_type = event_data.get("event_type")
-        payload = event_data.get("payload", {})
-        
-        # Extract common fields
-        call_control_id = payload.get("call_control_id")
-        call_session_id = payload.get("call_session_id")
-        from_number = payload.get("from")
-        to_number = payload.get("to")
-        
-        logger.info(f"[Telnyx Webhook] Event Type: {event_type}")
-        logger.info(f"[Telnyx Webhook] Call Control ID: {call_control_id}")
-        logger.info(f"[Telnyx Webhook] From: {from_number} -> To: {to_number}")
-        
-        # Handle different event types
-        if event_type == "call.initiated":
-            # New incoming call
-            await handle_call_initiated(call_control_id, from_number)
-            
-        elif event_type == "call.answered":
-            # Call was answered successfully
-            await handle_call_answered(call_control_id, from_number)
-            
-        elif event_type == "call.speak.ended":
-            # Speaking has finished, start recording for next user input
-            logger.info(f"[Telnyx Webhook] Speak ended for call {call_control_id}, starting recording")
-            await handle_speak_ended(call_control_id, from_number)
-            
-        elif event_type == "call.gather.ended":
-            # User input received
-            digits = payload.get("digits")
-            await handle_gather_ended(call_control_id, from_number, digits)
-            
-        elif event_type == "call.hangup":
-            # Call ended
-            logger.info(f"[Telnyx Webhook] Call {call_control_id} hung up")
-            # Clean up session
-            if call_session_id in call_sessions:
-                del call_sessions[call_session_id]
-                
-        elif event_type == "call.recording.saved":
-            # Recording available - process with STT → AI → TTS (async in background)
-            # recording_urls is a dict with format as keys: {"wav": "url", "mp3": "url"}
-            recording_urls = payload.get("recording_urls", {})
-            recording_url = None
-            if isinstance(recording_urls, dict):
-                # Prefer WAV format for best quality
-                recording_url = recording_urls.get("wav") or recording_urls.get("mp3")
-            logger.info(f"[Telnyx Webhook] Recording saved: {recording_url}")
-            
-            # Process recording asynchronously (even if call hung up - for logging/debugging)
-            # The background task will handle the full STT → AI → TTS pipeline
-            await handle_recording_saved(call_control_id, from_number, recording_url)
-            
-        else:
-            logger.info(f"[Telnyx Webhook] Unhandled event type: {event_type}")
+        event_data = webhook_data.get("data") if isinstance(webhook_data, dict) else None
+        if not isinstance(event_data, dict) or not event_data.get("event_type"):
+            raise HTTPException(status_code=400, detail="Missing data.event_type")
+        
+        event_type = event_data["event_type"]
+        payload = event_data.get("payload") or {}
+        
+        # Events for the same call are processed in order; fall back to the event id for call-less events
+        call_key = payload.get("call_control_id") or payload.get("call_session_id") or event_data.get("id") or event_type
+        
+        event_id = event_data.get("id")
+        if event_id and not await webhook_deduplicator.first_seen(event_id):
+            logger.info(f"[Telnyx Webhook] Duplicate delivery of event {event_id} ({event_type}) ignored")
+            return {"status": "ok", "message": f"Duplicate event {event_type} ignored"}
+        
+        try:
+            ingestion_queue.submit(call_key, webhook_data)
+        except IngestionQueueFull:
+            # Telnyx will retry - make sure the retry isn't mistaken for a duplicate
+            if event_id:
+                await webhook_deduplicator.forget(event_id)
+            raise
         
         # Return 200 OK to acknowledge webhook receipt
-        return {"status": "ok", "message": f"Event {event_type} processed"}
+        return {"status": "ok", "message": f"Event {event_type} queued"}
         
+    except IngestionQueueFull as e:
+        logger.error(f"[Telnyx Webhook] {str(e)}")
+        # Ask Telnyx to retry later rather than silently dropping the event
+        raise HTTPException(status_code=503, detail="Webhook queue full")
     except json.JSONDecodeError as e:
         logger.error(f"[Telnyx Webhook] JSON decode error: {str(e)}")
         raise HTTPException(status_code=400, detail="Invalid JSON payload")
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"[Telnyx Webhook] Error processing webhook: {str(e)}")
+        logger.error(f"[Telnyx Webhook] Error queueing webhook: {str(e)}")
         # Return 200 to prevent retries even on error
         return {"status": "error", "message": str(e)}
 
+async def dispatch_telnyx_event(webhook_data: Dict[str, Any]):
+    """
+    Run the handler for one Telnyx event (called by the ingestion workers)
+    Holds the call's lock so events for one call are handled one at a time across workers.
+    Exceptions propagate to the worker, which logs and counts them.
+    """
+    call_control_id = webhook_data.get("data", {}).get("payload", {}).get("call_control_id")
+    if not call_control_id:
+        await handle_telnyx_event(webhook_data)
+        return
+
+    async with call_state.lock(call_control_id) as locked:
+        if not locked:
+            logger.warning(f"[Telnyx Webhook] Handling event for {call_control_id} without the call lock")
+        await handle_telnyx_event(webhook_data)
+
+async def handle_telnyx_event(webhook_data: Dict[str, Any]):
+    """Switch on the Telnyx event type"""
+    # Log all webhook events for debugging
+    logger.info(f"[Telnyx Webhook] Received event: {json.dumps(webhook_data, indent=2)}")
+    
+    # Extract event data
+    event_data = webhook_data.get("data", {})
+    event_type = event_data.get("event_type")
+    payload = event_data.get("payload", {})
+    
+    # Extract common fields
+    call_control_id = payload.get("call_control_id")
+    call_session_id = payload.get("call_session_id")
+    from_number = payload.get("from")
+    to_number = payload.get("to")
+    
+    logger.info(f"[Telnyx Webhook] Event Type: {event_type}")
+    logger.info(f"[Telnyx Webhook] Call Control ID: {call_control_id}")
+    logger.info(f"[Telnyx Webhook] From: {from_number} -> To: {to_number}")
+    
+    # Handle different event types
+    if event_type == "call.initiated":
+        # New incoming call
+        await handle_call_initiated(call_control_id, from_number)
+        
+    elif event_type == "call.answered":
+        # Call was answered successfully
+        await handle_call_answered(call_control_id, from_number)
+        
+    elif event_type == "call.speak.ended":
+        # Speaking has finished, start recording for next user input
+        # (unless it was the filler line or more streamed sentences of the AI response are still queued)
+        if telnyx_service.decode_client_state(payload.get("client_state")) == FILLER_STATE:
+            logger.info(f"[Telnyx Webhook] Filler finished for call {call_control_id}, still processing")
+        elif response_streamer.on_speak_ended(call_control_id, payload.get("client_state")):
+            logger.info(f"[Telnyx Webhook] Speak ended for call {call_control_id}, more sentences queued")
+        else:
+            logger.info(f"[Telnyx Webhook] Speak ended for call {call_control_id}, starting recording")
+            await handle_speak_ended(call_control_id, from_number)
+        
+    elif event_type == "call.gather.ended":
+        # User input received
+        digits = payload.get("digits")
+        await handle_gather_ended(call_control_id, from_number, digits)
+        
+    elif event_type == "call.hangup":
+        # Call ended
+        logger.info(f"[Telnyx Webhook] Call {call_control_id} hung up")
+        # Clean up session - stop any pipeline still working on a turn for this call
+        call_tasks.cancel_call(call_control_id)
+        await call_fsm.transition(call_control_id, CallPhase.ENDED, "call.hangup")
+        await call_state.delete(call_control_id)
+        telnyx_service.release_call(call_control_id)
+        response_streamer.release_call(call_control_id)
+            
+    elif event_type == "call.recording.saved":
+        # Recording available - process with STT → AI → TTS (async in background)
+        # recording_urls is a dict with format as keys: {"wav": "url", "mp3": "url"}
+        recording_urls = payload.get("recording_urls", {})
+        recording_url = None
+        if isinstance(recording_urls, dict):
+            # Prefer WAV format for best quality
+            recording_url = recording_urls.get("wav") or recording_urls.get("mp3")
+        logger.info(f"[Telnyx Webhook] Recording saved: {recording_url}")
+        
+        # Process recording asynchronously (even if call hung up - for logging/debugging)
+        # The background task will handle the full STT → AI → TTS pipeline
+        await handle_recording_saved(call_control_id, from_number, recording_url)
+        
+    else:
+        logger.info(f"[Telnyx Webhook] Unhandled event type: {event_type}")
+
 async def handle_call_initiated(call_control_id: str, from_number: str):
     """
     Handle new incoming call - equivalent to Twilio's initial /webhook/call
     """
     try:
         logger.info(f"[Telnyx] Handling new call from {from_number}")
+        if not await call_fsm.transition(call_control_id, CallPhase.ANSWERING, "call.initiated"):
+            return
+        # Later events on the call (and the media stream) don't carry the caller's number
+        await call_state.update(call_control_id, from_number=from_number)
         
         # Answer the call first
         await telnyx_service.answer_call(call_control_id)
@@ -130,9 +222,11 @@ async def handle_call_answered(call_control_id: str, from_number: str):
     """
     try:
         logger.info(f"[Telnyx] Call answered from {from_number}")
+        if not await call_fsm.transition(call_control_id, CallPhase.GREETING, "call.answered"):
+            return
         
         # Speak a greeting - recording will start when speak ends
-        greeting = "Hello! I'm your AI assistant. How can I help you today?"
+        greeting = GREETING
         await telnyx_service.speak(
             call_control_id=call_control_id,
             text=greeting,
@@ -142,6 +236,15 @@ async def handle_call_answered(call_control_id: str, from_number: str):
         
         logger.info(f"[Telnyx] Greeting sent to {from_number}")
         
+        # Streaming STT: open the inbound media stream once instead of recording every turn
+        if settings.stt_mode == "streaming":
+            encoded_id = urllib.parse.quote(call_control_id, safe='')
+            await telnyx_service.start_streaming(
+                call_control_id=call_control_id,
+                stream_url=f"{settings.public_ws_base_url}/telnyx/stt/{encoded_id}",
+                track="inbound_track"
+            )
+        
     except Exception as e:
         logger.error(f"[Telnyx] Error in call answered handler: {str(e)}")
 
@@ -151,6 +254,15 @@ async def handle_speak_ended(call_control_id: str, from_number: str):
     User speaks FIRST, then AI processes in background
     """
     try:
+        # Only the end of the greeting or of an AI response hands the turn to the caller
+        if not await call_fsm.transition(call_control_id, CallPhase.LISTENING, "speak ended"):
+            return
+        
+        if settings.stt_mode == "streaming":
+            # Media stream is already open - the next utterance arrives via /telnyx/stt
+            logger.info(f"[Telnyx] Speak ended for {from_number}, listening on media stream")
+            return
+        
         logger.info(f"[Telnyx] Speak ended for {from_number}, starting recording NOW")
         
         # Start recording IMMEDIATELY so user can speak
@@ -175,9 +287,17 @@ async def handle_gather_ended(call_control_id: str, from_number: str, digits: st
         user_input = digits if digits else "..."
         logger.info(f"[Telnyx] Received input from {from_number}: {user_input}")
         
+        # Digits arrive while the gather prompt is still the current speak
+        if await call_fsm.current(call_control_id) == CallPhase.SPEAKING:
+            await call_fsm.transition(call_control_id, CallPhase.LISTENING, "gather ended")
+        if not await call_fsm.transition(call_control_id, CallPhase.PROCESSING, "gather ended"):
+            return
+        
         # Get AI response (same as before)
         ai_response = await general_module.process(user_input, {})
         
+        if not await call_fsm.transition(call_control_id, CallPhase.SPEAKING, "AI response"):
+            return
         # Send response and gather more input
         # This replaces the Twilio <Gather> + <Say> combination
         await telnyx_service.gather_using_speak(
@@ -195,7 +315,8 @@ async def handle_gather_ended(call_control_id: str, from_number: str, digits: st
         
         # Send error message
         try:
-            error_response = await general_module.process("System error occurred", {})
+            # Fixed prompt at temperature 0 - served from the OpenAI service cache during error bursts
+            error_response = await general_module.process("System error occurred", {}, temperature=0)
             await telnyx_service.speak(
                 call_control_id=call_control_id,
                 text=error_response,
@@ -206,11 +327,81 @@ async def handle_gather_ended(call_control_id: str, from_number: str, digits: st
             # If all else fails, just speak a generic error
             await telnyx_service.speak(
                 call_control_id=call_control_id,
-                text="I'm sorry, there was an error processing your request.",
+                text=ERROR_REQUEST,
                 voice="male",
                 language="en-US"
             )
 
+async def respond_to_transcript(call_control_id: str, transcription: str, stop_recording: bool = False):
+    """
+    Shared tail of every caller turn: AI response → (stop recording) → speak
+    """
+    if settings.stream_llm_responses:
+        if not await call_fsm.transition(call_control_id, CallPhase.SPEAKING, "AI response"):
+            return
+        
+        # Stop recording first; the call's command queue keeps it ahead of the streamed sentences
+        stop_future = telnyx_service.enqueue_command(call_control_id, "record_stop", {}) if stop_recording else None
+        
+        # Speak sentence by sentence while GPT is still generating
+        ai_response = await response_streamer.speak_stream(
+            call_control_id,
+            general_module.stream(transcription, {}),
+            voice="male",
+            language="en-US"
+        )
+        logger.info(f"[Telnyx] AI response (streamed): {ai_response}")
+        
+        if stop_future is not None:
+            try:
+                await stop_future
+            except Exception as e:
+                logger.warning(f"[Telnyx] Could not stop recording: {str(e)}")
+        
+        # Every sentence already finished playing (or nothing was spoken) - no speak.ended will start the next turn
+        if not response_streamer.is_speaking(call_control_id):
+            state = await call_state.get(call_control_id) or {}
+            await handle_speak_ended(call_control_id, state.get("from_number") or "unknown caller")
+        return
+    
+    # Process with OpenAI GPT (~2-3 seconds)
+    ai_response = await general_module.process(transcription, {})
+    logger.info(f"[Telnyx] AI response: {ai_response}")
+    
+    if not await call_fsm.transition(call_control_id, CallPhase.SPEAKING, "AI response"):
+        return
+    
+    # Stop any active recording
+    if stop_recording:
+        try:
+            await telnyx_service.stop_recording(call_control_id)
+        except Exception as e:
+            logger.warning(f"[Telnyx] Could not stop recording: {str(e)}")
+    
+    # Speak the AI response
+    await telnyx_service.speak(
+        call_control_id=call_control_id,
+        text=ai_response,
+        voice="male",
+        language="en-US"
+    )
+
+async def speak_error_line(call_control_id: str, text: str, reason: str):
+    """
+    Speak an error line if the call can still take one (not hung up); never raises
+    """
+    if await call_fsm.current(call_control_id) != CallPhase.SPEAKING and not await call_fsm.transition(call_control_id, CallPhase.SPEAKING, reason):
+        return
+    try:
+        await telnyx_service.speak(
+            call_control_id=call_control_id,
+            text=text,
+            voice="male",
+            language="en-US"
+        )
+    except Exception as e:
+        logger.error(f"[Telnyx] Could not speak error line: {str(e)}")
+
 async def process_recording_pipeline(call_control_id: str, from_number: str, recording_url: str):
     """
     Background task: Process STT → AI → TTS pipeline (takes ~7 seconds)
@@ -240,60 +431,24 @@ async def process_recording_pipeline(call_control_id: str, from_number: str, rec
             logger.warning(f"[Telnyx] [Background] Empty transcription, asking to repeat")
             try:
                 await telnyx_service.stop_recording(call_control_id)
-            except:
+            except Exception:
                 pass
-            await telnyx_service.speak(
-                call_control_id=call_control_id,
-                text="I'm sorry, I didn't catch that. Could you please repeat?",
-                voice="male",
-                language="en-US"
-            )
+            await speak_error_line(call_control_id, ERROR_NOT_CAUGHT, "empty transcription")
             return
         
         logger.info(f"[Telnyx] [Background] User said: {transcription}")
         
-        # Step 3: Process with OpenAI GPT (~2-3 seconds)
-        ai_response = await general_module.process(transcription, {})
-        logger.info(f"[Telnyx] [Background] AI response: {ai_response}")
-        
-        # Step 4: Stop any active recording
-        try:
-            await telnyx_service.stop_recording(call_control_id)
-        except Exception as e:
-            logger.warning(f"[Telnyx] [Background] Could not stop recording: {str(e)}")
-        
-        # Step 5: Speak the AI response
-        await telnyx_service.speak(
-            call_control_id=call_control_id,
-            text=ai_response,
-            voice="male",
-            language="en-US"
-        )
+        # Steps 3-5: GPT → stop recording → speak
+        await respond_to_transcript(call_control_id, transcription, stop_recording=True)
         
         logger.info(f"[Telnyx] [Background] Pipeline complete, AI response sent")
         
     except requests.exceptions.RequestException as e:
         logger.error(f"[Telnyx] [Background] Error downloading recording: {str(e)}")
-        try:
-            await telnyx_service.speak(
-                call_control_id=call_control_id,
-                text="I'm sorry, I had trouble accessing the recording. Please try again.",
-                voice="male",
-                language="en-US"
-            )
-        except:
-            pass
+        await speak_error_line(call_control_id, ERROR_RECORDING_ACCESS, "recording download failed")
     except Exception as e:
         logger.error(f"[Telnyx] [Background] Error in pipeline: {str(e)}")
-        try:
-            await telnyx_service.speak(
-                call_control_id=call_control_id,
-                text="I'm sorry, there was an error processing your message. Please try again.",
-                voice="male",
-                language="en-US"
-            )
-        except:
-            pass
+        await speak_error_line(call_control_id, ERROR_MESSAGE, "pipeline error")
 
 async def handle_recording_saved(call_control_id: str, from_number: str, recording_url: Optional[str]):
     """
@@ -308,12 +463,11 @@ async def handle_recording_saved(call_control_id: str, from_number: str, recordi
         # Validate recording URL
         if not recording_url:
             logger.error(f"[Telnyx] No recording URL provided for {from_number}")
-            await telnyx_service.speak(
-                call_control_id=call_control_id,
-                text="I'm sorry, there was a problem with the recording.",
-                voice="male",
-                language="en-US"
-            )
+            await speak_error_line(call_control_id, ERROR_RECORDING_MISSING, "recording missing")
+            return
+        
+        # A recording that lands while the previous turn is still processing or speaking is stray
+        if not await call_fsm.transition(call_control_id, CallPhase.PROCESSING, "recording.saved"):
             return
         
         logger.info(f"[Telnyx] Recording saved, starting background processing")
@@ -322,15 +476,18 @@ async def handle_recording_saved(call_control_id: str, from_number: str, recordi
         # This prevents hangups while STT → AI → TTS pipeline executes
         await telnyx_service.speak(
             call_control_id=call_control_id,
-            text="Got it! Let me think about that for a moment.",
+            text=THINKING_MESSAGE,
             voice="male",
-            language="en-US"
+            language="en-US",
+            client_state=FILLER_STATE
         )
         
         # BACKGROUND: Launch async processing task (does not block webhook response)
-        # Webhook will return 200 OK immediately while this runs in background
-        asyncio.create_task(
-            process_recording_pipeline(call_control_id, from_number, recording_url)
+        # Webhook will return 200 OK immediately while this runs in background; hangup cancels it
+        call_tasks.spawn(
+            call_control_id,
+            process_recording_pipeline(call_control_id, from_number, recording_url),
+            name="recording_pipeline"
         )
         
         logger.info(f"[Telnyx] Background processing launched, webhook returning 200 OK")
@@ -338,6 +495,63 @@ async def handle_recording_saved(call_control_id: str, from_number: str, recordi
     except Exception as e:
         logger.error(f"[Telnyx] Error in recording saved handler: {str(e)}")
 
+async def handle_streamed_utterance(call_control_id: str, transcript: str):
+    """
+    Final transcript from the media stream - go straight to the module, no recording round trips
+    """
+    try:
+        logger.info(f"[Telnyx] [Stream] User said: {transcript}")
+        # Utterances picked up while the AI is still thinking or talking don't start another turn
+        if not await call_fsm.transition(call_control_id, CallPhase.PROCESSING, "streamed utterance"):
+            return
+        await respond_to_transcript(call_control_id, transcript)
+    except Exception as e:
+        logger.error(f"[Telnyx] [Stream] Error responding to utterance: {str(e)}")
+        await speak_error_line(call_control_id, ERROR_MESSAGE, "utterance error")
+
+@router.websocket("/stt/{call_control_id}")
+async def stt_media_stream(websocket: WebSocket, call_control_id: str):
+    """
+    Telnyx media stream endpoint for streaming STT mode (started in handle_call_answered)
+    Inbound µ-law frames are fed to the streaming transcriber as they arrive
+    """
+    await websocket.accept()
+    session = StreamingSTTSession(
+        call_control_id=call_control_id,
+        transcriber=create_transcriber(),
+        # Each turn runs as a supervised task so hangup can cancel it
+        on_utterance=lambda call_id, transcript: call_tasks.spawn(
+            call_id, handle_streamed_utterance(call_id, transcript), name="streamed_turn"
+        )
+    )
+    logger.info(f"[Telnyx] [Stream] STT media stream connected for call {call_control_id}")
+    
+    try:
+        while True:
+            event = json.loads(await websocket.receive_text())
+            event_type = event.get("event")
+            
+            if event_type == "media":
+                payload = event.get("media", {}).get("payload", "")
+                if payload:
+                    await session.handle_frame(base64.b64decode(payload))
+            elif event_type == "stop":
+                logger.info(f"[Telnyx] [Stream] STT media stream stopped for call {call_control_id}")
+                break
+    except WebSocketDisconnect:
+        logger.info(f"[Telnyx] [Stream] STT media stream disconnected for call {call_control_id}")
+    except Exception as e:
+        logger.error(f"[Telnyx] [Stream] Error on STT media stream: {str(e)}")
+    finally:
+        await session.close()
+
+# Fast-ack ingestion stage draining into dispatch_telnyx_event
+ingestion_queue = WebhookIngestionQueue(
+    handler=dispatch_telnyx_event,
+    max_depth=settings.webhook_queue_max_depth,
+    num_workers=settings.webhook_workers
+)
+
 @router.post("/outbound/call")
 async def make_outbound_call(to_number: str, message: str):
     """
@@ -364,9 +578,7 @@ async def make_outbound_call(to_number: str, message: str):
             call_control_id = call_response.get("call_control_id", "")
         
         # Store initial message for when call is answered
-        call_sessions[call_control_id] = {
-            "initial_message": message
-        }
+        await call_state.update(call_control_id, initial_message=message)
         
         return {
             "status": "success",
@@ -390,6 +602,28 @@ async def health_check():
         "provider": "Telnyx"
     }
 
+@router.get("/metrics")
+async def metrics():
+    """
+    Latency and throughput counters for the Telnyx call path
+    """
+    return {
+        "telnyx_commands": telnyx_service.get_stats(),
+        "webhook_ingestion": ingestion_queue.get_stats(),
+        "webhook_dedup": webhook_deduplicator.get_stats(),
+        "streaming_stt": streaming_stt_stats.get_stats(),
+        "response_streaming": response_streamer.get_stats(),
+        "call_state": call_state.get_stats(),
+        "call_fsm": call_fsm.get_stats(),
+        "call_tasks": call_tasks.get_stats(),
+        "voice_bridge": voice_bridge_service.get_stats(),
+        "realtime_pool": realtime_pool.get_stats(),
+        "content_pool": content_pool.get_stats(),
+        "answer_grader": answer_grader.get_stats(),
+        "openai": openai_service.get_stats(),
+        "llm_router": llama_service.get_stats()
+    }
+
 # Debugging endpoint to test Telnyx connection
 @router.post("/test/speak")
 async def test_speak(call_control_id: str, message: str):
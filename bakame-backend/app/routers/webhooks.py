@@ -2,17 +2,38 @@ from fastapi import APIRouter, Request, Form, Response
 from typing import Optional
 from app.services.twilio_service import twilio_service
 from app.modules.general_module import general_module
+from app.services.utterance_pool_service import UtterancePool
+from app.config import settings
 
 router = APIRouter()
 
+# Greetings and error lines are generated ahead of time so no request waits on the LLM for them.
+# Each kind uses the same prompt the handlers used to send inline; the static text is only
+# spoken when the pool has run dry. Refills are sampled (never cached) so each entry is worded afresh.
+utterance_pool = UtterancePool(
+    generators={
+        "greeting": lambda: general_module.process("Hello", {}),
+        "voice_error": lambda: general_module.process("System error occurred", {}),
+        "sms_error": lambda: general_module.process("Error processing message", {})
+    },
+    fallbacks={
+        "greeting": "Hello! I'm your AI assistant. How can I help you today?",
+        "voice_error": "I'm sorry, something went wrong on my side. Could you please say that again?",
+        "sms_error": "Sorry, we couldn't process your message. Please try again."
+    },
+    size=settings.utterance_pool_size,
+    refill_per_minute=settings.utterance_pool_refill_per_minute,
+    ttl_seconds=settings.utterance_pool_ttl_seconds
+)
+
 @router.post("/call")
 async def handle_voice_call(From: str = Form(...)):
     """Handle incoming voice calls - always fresh, no history"""
     
     print(f"[Webhook] New call from {From}")
     
-    # Always call OpenAI for welcome message - fresh greeting each time
-    welcome_message = await general_module.process("Hello", {})
+    # Pre-generated greeting - refilled from OpenAI in the background
+    welcome_message = utterance_pool.take("greeting")
     
     # Create voice response
     response = await twilio_service.create_voice_response(
@@ -48,8 +69,7 @@ async def process_voice_input(
         
     except Exception as e:
         print(f"[Webhook] Error: {e}")
-        # Even errors go through OpenAI
-        error_response = await general_module.process("System error occurred", {})
+        error_response = utterance_pool.take("voice_error")
         response = await twilio_service.create_voice_response(
             message=error_response,
             gather_input=True,
@@ -77,7 +97,7 @@ async def handle_sms(
         
     except Exception as e:
         print(f"[Webhook] SMS Error: {e}")
-        error_response = await general_module.process("Error processing message", {})
+        error_response = utterance_pool.take("sms_error")
         return Response(
             content=twilio_service.create_sms_response(error_response),
             media_type="application/xml"
@@ -86,4 +106,9 @@ async def handle_sms(
 @router.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "service": "BAKAME"}
\ No newline at end of file
+    return {"status": "healthy", "service": "BAKAME"}
+
+@router.get("/metrics")
+async def get_metrics():
+    """Utterance pool depth, hit rate and refill counters"""
+    return {"utterance_pool": utterance_pool.get_stats()}
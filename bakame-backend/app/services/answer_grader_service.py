@@ -0,0 +1,181 @@
+import re
+import time
+from difflib import SequenceMatcher
+from typing import Dict, Any, List, Optional, Set
+from app.config import settings
+from app.services.metrics_service import LatencyHistogram, elapsed_ms
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "but", "of", "to", "in", "on", "at", "for", "with", "by", "from",
+    "is", "are", "was", "were", "be", "been", "it", "its", "this", "that", "these", "those", "there",
+    "he", "she", "they", "them", "his", "her", "their", "him", "i", "you", "we", "my", "your", "our",
+    "so", "as", "if", "then", "than", "do", "did", "does", "had", "has", "have", "could", "would",
+    "will", "can", "just", "about", "because", "think", "answer", "story", "very", "really", "also",
+    "who", "what", "when", "where", "why", "how", "which", "up", "out", "into", "over", "all"
+}
+
+NEGATIONS = {"not", "no", "never", "nobody", "nothing", "didn't", "wasn't", "weren't", "don't", "doesn't",
+             "couldn't", "isn't", "aren't", "won't", "cannot", "can't", "neither", "nor"}
+
+NUMBER_WORDS = {
+    "zero": "0", "one": "1", "two": "2", "three": "3", "four": "4", "five": "5", "six": "6",
+    "seven": "7", "eight": "8", "nine": "9", "ten": "10", "eleven": "11", "twelve": "12",
+    "twenty": "20", "thirty": "30", "fifty": "50", "hundred": "100", "thousand": "1000"
+}
+
+NON_ANSWERS = {"i don't know", "i dont know", "no idea", "not sure", "i forgot", "i can't remember",
+               "i cant remember", "pass", "skip"}
+# Dropped before matching NON_ANSWERS, so "um sorry i don't know" is still a non-answer
+FILLERS = {"um", "uh", "er", "erm", "hmm", "well", "sorry", "really", "teacher"}
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+# "Mr. Johnson (or the elderly man)" -> two acceptable answers
+_ALTERNATIVE_RE = re.compile(r"\(\s*or\s+([^)]*)\)", re.IGNORECASE)
+_TITLE_RE = re.compile(r"\b(Mr|Mrs|Ms|Dr)\.")
+_ENTITY_RE = re.compile(r"(?<![.!?]\s)(?<!^)\b([A-Z][a-z]+(?:-[A-Z][a-z]+)?)")
+
+
+def normalize(text: str) -> str:
+    """Lowercase, unify apostrophes and spell numbers as digits (STT writes 'three' or '3')."""
+    text = text.lower().replace("’", "'").replace("-", " ")
+    return " ".join(NUMBER_WORDS.get(token, token) for token in _TOKEN_RE.findall(text))
+
+
+def _stem(token: str) -> str:
+    for suffix in ("ing", "ed", "es", "s", "ly"):
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[:-len(suffix)]
+    return token
+
+
+def content_tokens(text: str) -> List[str]:
+    """Normalized, stemmed tokens with stopwords and negations dropped."""
+    return [_stem(token) for token in normalize(text).split() if token not in STOPWORDS and token not in NEGATIONS]
+
+
+def entities(text: str) -> Set[str]:
+    """Names and places in a reference answer (capitalized words not starting a sentence)."""
+    text = _TITLE_RE.sub(r"\1", text)
+    return {token for match in _ENTITY_RE.findall(text) for token in content_tokens(match)}
+
+
+def _fuzzy_in(token: str, candidates: List[str], cutoff: float = 0.8) -> bool:
+    """Exact or near match - tolerates STT misspellings of names ('Uwimaana', 'Jean Batiste')."""
+    if token in candidates:
+        return True
+    return any(abs(len(token) - len(other)) <= 3 and SequenceMatcher(None, token, other).ratio() >= cutoff
+               for other in candidates if len(token) >= 4)
+
+
+class GradeResult:
+    """A local grading decision: verdict True/False when confident, None when the LLM should decide."""
+
+    __slots__ = ("verdict", "score", "recall", "similarity", "entity_match", "reason")
+
+    def __init__(self, verdict: Optional[bool], score: float, recall: float = 0.0, similarity: float = 0.0,
+                 entity_match: Optional[bool] = None, reason: str = ""):
+        self.verdict = verdict
+        self.score = score
+        self.recall = recall
+        self.similarity = similarity
+        self.entity_match = entity_match
+        self.reason = reason
+
+
+class AnswerGrader:
+    """
+    Grades a spoken answer against a known reference answer without calling the LLM.
+
+    The score blends keyword recall (share of the reference's content words the answer
+    contains, fuzzy-matched), token-sequence similarity, and whether the answer names the
+    reference's people/places. At or above `accept` the answer is correct, at or below
+    `reject` it is wrong; in between (and whenever the answer negates what the reference
+    says) the verdict is left to the LLM. Thresholds come from benchmark_answer_grader.py.
+    """
+
+    def __init__(self, accept: float = 0.5, reject: float = 0.2):
+        self.accept = accept
+        self.reject = reject
+
+        self.local_correct = 0
+        self.local_incorrect = 0
+        self.escalated = 0
+        self.grade_time = LatencyHistogram()
+
+    def score(self, answer: str, reference: str) -> GradeResult:
+        """Best score over the reference's alternatives ('X (or Y)'); no verdict applied."""
+        alternatives = [_ALTERNATIVE_RE.sub("", reference).strip()] + _ALTERNATIVE_RE.findall(reference)
+        return max((self._score_one(answer, alternative) for alternative in alternatives if alternative),
+                   key=lambda result: result.score)
+
+    def _score_one(self, answer: str, reference: str) -> GradeResult:
+        reference_tokens = content_tokens(reference)
+        answer_tokens = content_tokens(answer)
+        if not reference_tokens or not answer_tokens:
+            return GradeResult(None, 0.0)
+
+        unique_reference = list(dict.fromkeys(reference_tokens))
+        matched = sum(1 for token in unique_reference if _fuzzy_in(token, answer_tokens))
+        recall = matched / len(unique_reference)
+        similarity = SequenceMatcher(None, " ".join(answer_tokens), " ".join(reference_tokens)).ratio()
+
+        names = entities(reference)
+        entity_match = None
+        if names:
+            entity_match = any(_fuzzy_in(name, answer_tokens) for name in names)
+
+        score = 0.7 * recall + 0.3 * similarity
+        if entity_match and len(names) * 2 >= len(unique_reference):
+            # The reference is mostly a name ("who"/"where" questions) - naming it is most of the answer
+            score = max(score, 0.5 + 0.5 * score)
+        return GradeResult(None, round(score, 3), round(recall, 3), round(similarity, 3), entity_match)
+
+    def grade(self, answer: str, reference: str) -> GradeResult:
+        start = time.perf_counter()
+        result = self._grade(answer, reference)
+        self.grade_time.record(elapsed_ms(start))
+        if result.verdict is None:
+            self.escalated += 1
+        elif result.verdict:
+            self.local_correct += 1
+        else:
+            self.local_incorrect += 1
+        return result
+
+    def _grade(self, answer: str, reference: str) -> GradeResult:
+        spoken = normalize(answer)
+        # Only a bare non-answer is wrong outright - "not sure but I think it was Uwimana" is still graded
+        if " ".join(token for token in spoken.split() if token not in FILLERS) in NON_ANSWERS | {""}:
+            return GradeResult(False, 0.0, reason="no answer")
+
+        result = self.score(answer, reference)
+        negated = bool(NEGATIONS & set(spoken.split())) and not NEGATIONS & set(normalize(reference).split())
+        if result.score >= self.accept:
+            if negated:
+                # "It was not Uwimana" overlaps the reference word for word - let the LLM read it
+                result.reason = "negation"
+                return result
+            result.verdict = True
+            result.reason = "match"
+        elif result.score <= self.reject:
+            result.verdict = False
+            result.reason = "no overlap"
+        else:
+            result.reason = "borderline"
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        graded = self.local_correct + self.local_incorrect + self.escalated
+        return {
+            "accept_threshold": self.accept,
+            "reject_threshold": self.reject,
+            "graded": graded,
+            "local_correct": self.local_correct,
+            "local_incorrect": self.local_incorrect,
+            "escalated_to_llm": self.escalated,
+            "local_fraction": round((self.local_correct + self.local_incorrect) / graded, 3) if graded else None,
+            "grade_time": self.grade_time.snapshot()
+        }
+
+
+answer_grader = AnswerGrader(accept=settings.answer_grader_accept, reject=settings.answer_grader_reject)
@@ -0,0 +1,125 @@
+import io
+import math
+import wave
+from typing import List, Optional
+
+# Telnyx media streams and the OpenAI Realtime g711_ulaw format are 8 kHz mono µ-law
+SAMPLE_RATE = 8000
+FRAME_MS = 20
+FRAME_BYTES = SAMPLE_RATE * FRAME_MS // 1000  # 160 bytes = 20 ms of µ-law
+ULAW_SILENCE = 0xFF
+
+
+def _ulaw_to_linear(byte: int) -> int:
+    """Decode one G.711 µ-law byte to a signed 16-bit sample."""
+    byte = ~byte & 0xFF
+    sign = byte & 0x80
+    exponent = (byte >> 4) & 0x07
+    mantissa = byte & 0x0F
+    sample = ((mantissa << 3) + 0x84) << exponent
+    sample -= 0x84
+    return -sample if sign else sample
+
+
+# Lookup table - decoding a 160-byte frame is then a list comprehension
+ULAW_TO_LINEAR: List[int] = [_ulaw_to_linear(b) for b in range(256)]
+
+
+def linear_to_ulaw(sample: int) -> int:
+    """Encode one signed 16-bit sample to a G.711 µ-law byte."""
+    bias = 0x84
+    clip = 32635
+    sign = 0x80 if sample < 0 else 0
+    if sign:
+        sample = -sample
+    sample = min(sample, clip) + bias
+    exponent = 7
+    mask = 0x4000
+    while exponent > 0 and not (sample & mask):
+        exponent -= 1
+        mask >>= 1
+    mantissa = (sample >> (exponent + 3)) & 0x0F
+    return ~(sign | (exponent << 4) | mantissa) & 0xFF
+
+
+def ulaw_rms(frame: bytes) -> float:
+    """RMS level of a µ-law frame on the 16-bit linear scale."""
+    if not frame:
+        return 0.0
+    table = ULAW_TO_LINEAR
+    total = sum(table[b] * table[b] for b in frame)
+    return math.sqrt(total / len(frame))
+
+
+def ulaw_to_wav(audio: bytes) -> bytes:
+    """Wrap µ-law 8 kHz audio as a 16-bit PCM WAV file (for Whisper uploads)."""
+    table = ULAW_TO_LINEAR
+    pcm = bytearray()
+    for b in audio:
+        pcm += table[b].to_bytes(2, "little", signed=True)
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(SAMPLE_RATE)
+        wav_file.writeframes(bytes(pcm))
+    return buffer.getvalue()
+
+
+def synth_ulaw_tone(duration_ms: int, frequency: float = 440.0, amplitude: int = 8000) -> bytes:
+    """Generate a µ-law sine tone - stand-in for speech in offline benchmarks."""
+    samples = SAMPLE_RATE * duration_ms // 1000
+    return bytes(
+        linear_to_ulaw(int(amplitude * math.sin(2 * math.pi * frequency * n / SAMPLE_RATE)))
+        for n in range(samples)
+    )
+
+
+def ulaw_silence(duration_ms: int) -> bytes:
+    """µ-law digital silence of the given duration."""
+    return bytes([ULAW_SILENCE]) * (SAMPLE_RATE * duration_ms // 1000)
+
+
+class EnergyVAD:
+    """
+    Frame-level energy voice activity detector for 20 ms µ-law frames.
+
+    Speech starts after `start_frames` consecutive frames above threshold and
+    ends after `silence_ms` of frames below it.
+    """
+
+    def __init__(self, threshold: float = 500.0, silence_ms: int = 700, start_frames: int = 2):
+        self.threshold = threshold
+        self.silence_frames = max(1, silence_ms // FRAME_MS)
+        self.start_frames = start_frames
+        self.in_speech = False
+        self.last_frame_voiced = False
+        self._voiced_run = 0
+        self._silent_run = 0
+
+    def process(self, frame: bytes) -> Optional[str]:
+        """Feed one frame; returns 'speech_start', 'speech_end' or None."""
+        voiced = ulaw_rms(frame) >= self.threshold
+        self.last_frame_voiced = voiced
+
+        if not self.in_speech:
+            self._voiced_run = self._voiced_run + 1 if voiced else 0
+            if self._voiced_run >= self.start_frames:
+                self.in_speech = True
+                self._silent_run = 0
+                return "speech_start"
+            return None
+
+        self._silent_run = 0 if voiced else self._silent_run + 1
+        if self._silent_run >= self.silence_frames:
+            self.in_speech = False
+            self._voiced_run = 0
+            return "speech_end"
+        return None
+
+    def reset(self):
+        self.in_speech = False
+        self.last_frame_voiced = False
+        self._voiced_run = 0
+        self._silent_run = 0
@@ -0,0 +1,390 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, Any, Optional, Callable, Awaitable, Deque, Set, Tuple
+from app.services.audio_utils import FRAME_MS, FRAME_BYTES, ULAW_SILENCE
+from app.services.metrics_service import LatencyHistogram, elapsed_ms
+
+logger = logging.getLogger(__name__)
+
+# Overflow policies for AudioPipe
+DROP_OLDEST = "drop_oldest"
+BLOCK = "block"
+OVERFLOW_POLICIES = (DROP_OLDEST, BLOCK)
+
+# Enqueue-to-sent lag; a healthy leg stays within a frame or two
+SEND_LAG_BUCKETS_MS = (1, 5, 10, 20, 50, 100, 250, 500, 1000, 5000)
+
+
+class AudioPipe:
+    """
+    Bounded queue with a dedicated sender task for one direction of the voice bridge.
+
+    Producers `put()` and move on once the message is queued, so a slow socket on this
+    leg only backs up this pipe instead of stalling the reader on the other leg. When the
+    queue is full, "drop_oldest" discards the stalest message (playback audio that late is
+    better skipped) and "block" makes the producer wait for room (caller audio the model
+    must hear in full).
+    """
+
+    def __init__(self, name: str, send: Callable[[Any], Awaitable[Any]],
+                 max_messages: int = 50, overflow: str = BLOCK):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy {overflow!r}, expected one of {OVERFLOW_POLICIES}")
+        self.name = name
+        self.send = send
+        self.max_messages = max_messages
+        self.overflow = overflow
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_messages)
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+        self._failing = False
+        # Enqueue time of the message currently being sent, for the live lag gauge
+        self._in_flight_since: Optional[float] = None
+
+        self.send_lag = LatencyHistogram(SEND_LAG_BUCKETS_MS)
+        self.block_time = LatencyHistogram(SEND_LAG_BUCKETS_MS)
+        self.sent = 0
+        self.dropped = 0
+        self.blocked = 0
+        self.cleared = 0
+        self.send_errors = 0
+        self.peak_depth = 0
+
+    def start(self):
+        """Spawn the sender task (idempotent)."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._sender(), name=f"bridge-{self.name}")
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    async def put(self, item: Any):
+        """Queue a message for sending, applying the overflow policy when full."""
+        if self.overflow == BLOCK and self._queue.full() and not self._closed:
+            self.blocked += 1
+            start = time.perf_counter()
+            await self._queue.put((time.perf_counter(), item))
+            self.block_time.record(elapsed_ms(start))
+            self.peak_depth = max(self.peak_depth, self._queue.qsize())
+            return
+        self.put_nowait(item)
+
+    def put_nowait(self, item: Any) -> bool:
+        """Queue without waiting; a full "block" pipe can't wait here, so it drops `item` and returns False."""
+        if self._closed:
+            self.dropped += 1
+            return False
+        if self._queue.full():
+            self.dropped += 1
+            if self.overflow != DROP_OLDEST:
+                return False
+            self._discard_one()
+        self._queue.put_nowait((time.perf_counter(), item))
+        self.peak_depth = max(self.peak_depth, self._queue.qsize())
+        return True
+
+    def _discard_one(self):
+        self._queue.get_nowait()
+        self._queue.task_done()
+
+    def clear(self) -> int:
+        """Discard everything still queued (e.g. playback audio on barge-in); returns how many."""
+        count = 0
+        while not self._queue.empty():
+            self._discard_one()
+            count += 1
+        self.cleared += count
+        return count
+
+    async def _sender(self):
+        while True:
+            entry: Tuple[float, Any] = await self._queue.get()
+            enqueued_at, item = entry
+            self._in_flight_since = enqueued_at
+            ok = True
+            try:
+                await self.send(item)
+                self.sent += 1
+                self._failing = False
+            except Exception as e:
+                ok = False
+                self.send_errors += 1
+                # A dead socket fails every frame - log the first failure of a run only
+                if not self._failing:
+                    logger.error(f"[Bridge] {self.name} send failed: {str(e)}")
+                self._failing = True
+            finally:
+                self._in_flight_since = None
+                self.send_lag.record(elapsed_ms(enqueued_at), ok=ok)
+                self._queue.task_done()
+
+    async def close(self, drain_timeout: float = 0.0):
+        """Stop accepting messages, give queued ones up to `drain_timeout` to go out, then stop the sender."""
+        self._closed = True
+        if self._task is None:
+            return
+        if drain_timeout > 0 and not self._queue.empty():
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"[Bridge] {self.name} closed with {self.depth} messages unsent")
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "policy": self.overflow,
+            "depth": self.depth,
+            "peak_depth": self.peak_depth,
+            "max_messages": self.max_messages,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "blocked": self.blocked,
+            "cleared": self.cleared,
+            "send_errors": self.send_errors,
+            # Age of the message on the wire right now - grows while the socket is stuck
+            "current_lag_ms": round(elapsed_ms(self._in_flight_since), 2) if self._in_flight_since else 0.0,
+            "send_lag_p50_ms": self.send_lag.percentile(50),
+            "send_lag_p95_ms": self.send_lag.percentile(95),
+            "send_lag_max_ms": round(self.send_lag.max_ms, 2),
+            "block_time_max_ms": round(self.block_time.max_ms, 2)
+        }
+
+
+class OutboundPacer:
+    """
+    Plays AI audio toward Telnyx at wall-clock rate in fixed 20 ms µ-law frames.
+
+    OpenAI delivers audio in bursts, much faster than real time. Forwarding bursts as-is
+    piles seconds of unplayed audio up on Telnyx's side, where a barge-in clear is the only
+    way to stop it, and leaves gaps between bursts. The pacer keeps that audio here
+    instead: it re-chunks incoming bytes into frames and, on each tick of the shared
+    PlayoutClock, hands one to `send`.
+
+    Playback starts once `jitter_ms` is buffered, or the item has ended, or `jitter_ms`
+    has passed since the first frame arrived. Those first frames go out together, so
+    Telnyx holds a cushion of about `jitter_ms` and no more.
+
+    Counters:
+    - underruns: the buffer ran dry mid-item, and playback rebuffers;
+    - overrun_frames: frames dropped because more than `max_buffer_ms` was waiting.
+    """
+
+    def __init__(self, send: Callable[[bytes], Any], jitter_ms: int = 60, max_buffer_ms: int = 30000,
+                 clock: Optional["PlayoutClock"] = None):
+        self.send = send
+        self.jitter_ms = jitter_ms
+        self.max_buffer_ms = max_buffer_ms
+        self.clock = clock or playout_clock
+        self._jitter_frames = max(1, jitter_ms // FRAME_MS)
+        self._max_frames = max(1, max_buffer_ms // FRAME_MS)
+
+        # Whole frames ready to play, plus the partial frame still being filled
+        self._frames: Deque[bytes] = deque()
+        self._partial = bytearray()
+        # Set when the current audio item is complete, so a short tail isn't treated as an underrun
+        self._ended = False
+        self._waiting_since: Optional[float] = None
+        self.playing = False
+
+        # Byte offsets in the stream: everything written, and everything sent or discarded
+        self.written = 0
+        self.position = 0
+
+        self.frames_sent = 0
+        self.underruns = 0
+        self.overrun_frames = 0
+        self.cleared_frames = 0
+        self.peak_buffer_ms = 0.0
+
+    @property
+    def buffered_ms(self) -> float:
+        return (len(self._frames) * FRAME_BYTES + len(self._partial)) / FRAME_BYTES * FRAME_MS
+
+    def write(self, audio: bytes):
+        """Queue µ-law audio for playback."""
+        self.written += len(audio)
+        self._ended = False
+        partial = self._partial
+        partial += audio
+        whole = len(partial) - len(partial) % FRAME_BYTES
+        if whole:
+            self._frames.extend(bytes(partial[i:i + FRAME_BYTES]) for i in range(0, whole, FRAME_BYTES))
+            del partial[:whole]
+        excess = len(self._frames) - self._max_frames
+        if excess > 0:
+            # Drop the oldest frames
+            for _ in range(excess):
+                self._frames.popleft()
+            self.position += excess * FRAME_BYTES
+            self.overrun_frames += excess
+        self.peak_buffer_ms = max(self.peak_buffer_ms, self.buffered_ms)
+        self.clock.register(self)
+
+    def end_of_audio(self):
+        """The current audio item is complete: play out what's left, padding the last frame with silence."""
+        if self._partial:
+            padding = FRAME_BYTES - len(self._partial)
+            self._frames.append(bytes(self._partial) + bytes([ULAW_SILENCE]) * padding)
+            self.written += padding
+            self._partial.clear()
+        self._ended = True
+
+    def clear(self) -> int:
+        """Drop all unplayed audio (barge-in); returns the frames dropped."""
+        frames = len(self._frames) + (1 if self._partial else 0)
+        self.position += len(self._frames) * FRAME_BYTES + len(self._partial)
+        self._frames.clear()
+        self._partial.clear()
+        self.cleared_frames += frames
+        self.playing = False
+        self._waiting_since = None
+        return frames
+
+    def tick(self, now: float) -> bool:
+        """Send this tick's frame(s); returns False once there's nothing left to play."""
+        queued = self._frames
+        if self.playing:
+            if not queued:
+                if not self._ended:
+                    self.underruns += 1
+                self.playing = False
+                return bool(self._partial)
+            frames = 1
+        else:
+            # Jitter buffer: start once enough is queued, the item has ended, or we've waited jitter_ms
+            if not queued:
+                return bool(self._partial)
+            if self._waiting_since is None:
+                self._waiting_since = now
+            if (len(queued) < self._jitter_frames and not self._ended
+                    and (now - self._waiting_since) * 1000 < self.jitter_ms):
+                return True
+            self.playing = True
+            self._waiting_since = None
+            frames = min(len(queued), self._jitter_frames)
+
+        for _ in range(frames):
+            self.send(queued.popleft())
+        self.position += frames * FRAME_BYTES
+        self.frames_sent += frames
+        return True
+
+    def close(self):
+        self.clock.unregister(self)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "jitter_ms": self.jitter_ms,
+            "playing": self.playing,
+            "buffered_ms": round(self.buffered_ms),
+            "peak_buffered_ms": round(self.peak_buffer_ms),
+            "frames_sent": self.frames_sent,
+            "underruns": self.underruns,
+            "overrun_frames": self.overrun_frames,
+            "cleared_frames": self.cleared_frames
+        }
+
+
+class PlayoutClock:
+    """
+    One 20 ms tick per worker driving every OutboundPacer that has audio to play.
+
+    One timer per tick, however many calls are speaking, instead of one per call per
+    frame. The schedule is drift-corrected against the loop clock. A tick that fires more
+    than a frame late is counted and the schedule resyncs rather than bursting to catch up.
+    """
+
+    def __init__(self):
+        self._pacers: Set[OutboundPacer] = set()
+        self._task: Optional[asyncio.Task] = None
+        self.ticks = 0
+        self.late_ticks = 0
+        self.tick_errors = 0
+
+    def register(self, pacer: OutboundPacer):
+        self._pacers.add(pacer)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="bridge-playout-clock")
+
+    def unregister(self, pacer: OutboundPacer):
+        self._pacers.discard(pacer)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        frame_s = FRAME_MS / 1000.0
+        next_at = loop.time()
+        while self._pacers:
+            now = loop.time()
+            for pacer in list(self._pacers):
+                try:
+                    active = pacer.tick(now)
+                except Exception as e:
+                    self.tick_errors += 1
+                    logger.error(f"[Bridge] Playout tick failed: {str(e)}")
+                    active = False
+                if not active:
+                    self._pacers.discard(pacer)
+            self.ticks += 1
+
+            next_at += frame_s
+            delay = next_at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                if delay < -frame_s:
+                    self.late_ticks += 1
+                    next_at = loop.time()
+                await asyncio.sleep(0)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "active_pacers": len(self._pacers),
+            "ticks": self.ticks,
+            "late_ticks": self.late_ticks,
+            "tick_errors": self.tick_errors
+        }
+
+
+class BridgeCallStats:
+    """Message and byte rates for one bridged call, per direction."""
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.inbound_frames = 0
+        self.upstream_messages = 0
+        self.upstream_bytes = 0
+        self.downstream_messages = 0
+        self.downstream_bytes = 0
+        self.barge_ins = 0
+        self.stale_deltas_dropped = 0
+
+    def record_upstream(self, message_bytes: int):
+        self.upstream_messages += 1
+        self.upstream_bytes += message_bytes
+
+    def record_downstream(self, message_bytes: int):
+        self.downstream_messages += 1
+        self.downstream_bytes += message_bytes
+
+    def snapshot(self) -> Dict[str, Any]:
+        elapsed = max(time.monotonic() - self.started_at, 1e-6)
+        return {
+            "seconds": round(elapsed, 1),
+            "inbound_frames": self.inbound_frames,
+            "upstream_messages": self.upstream_messages,
+            "upstream_msgs_per_sec": round(self.upstream_messages / elapsed, 1),
+            "upstream_bytes_per_sec": round(self.upstream_bytes / elapsed),
+            "downstream_messages": self.downstream_messages,
+            "downstream_msgs_per_sec": round(self.downstream_messages / elapsed, 1),
+            "downstream_bytes_per_sec": round(self.downstream_bytes / elapsed),
+            "barge_ins": self.barge_ins,
+            "stale_deltas_dropped": self.stale_deltas_dropped
+        }
+
+
+playout_clock = PlayoutClock()
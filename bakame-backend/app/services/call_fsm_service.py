@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Any, Optional
+from app.services.call_state_service import call_state
+from app.services.metrics_service import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+
+class CallPhase:
+    """Conversation states of a Telnyx call"""
+    ANSWERING = "answering"
+    GREETING = "greeting"
+    LISTENING = "listening"
+    PROCESSING = "processing"
+    SPEAKING = "speaking"
+    ENDED = "ended"
+
+
+STATES = (CallPhase.ANSWERING, CallPhase.GREETING, CallPhase.LISTENING,
+          CallPhase.PROCESSING, CallPhase.SPEAKING, CallPhase.ENDED)
+
+# Allowed next states. None is a call this worker has not seen yet (answered outbound calls start at GREETING).
+# Every state can move to ENDED.
+TRANSITIONS = {
+    None: {CallPhase.ANSWERING, CallPhase.GREETING},
+    CallPhase.ANSWERING: {CallPhase.GREETING},
+    CallPhase.GREETING: {CallPhase.LISTENING},
+    CallPhase.LISTENING: {CallPhase.PROCESSING, CallPhase.SPEAKING},
+    CallPhase.PROCESSING: {CallPhase.SPEAKING},
+    CallPhase.SPEAKING: {CallPhase.LISTENING},
+    CallPhase.ENDED: set()
+}
+
+# Dwell times range from sub-second (speaking a short line) to minutes (waiting for the caller)
+DWELL_BUCKETS_MS = (100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, 300000)
+
+
+class _CallRecord:
+    __slots__ = ("state", "entered_at")
+
+    def __init__(self, state: Optional[str], entered_at: float):
+        self.state = state
+        self.entered_at = entered_at
+
+
+class CallStateMachine:
+    """
+    Per-call conversation state for the Telnyx call flow.
+
+    Event handlers ask to move the call into the state their Call Control command would
+    put it in, and only issue the command if the transition is valid. So stray events,
+    like the speak.ended of a filler line or a recording.saved mid-response, can't start
+    overlapping recordings or pipelines.
+
+    call_state is the source of truth: every check re-reads `fsm_state` from it and every
+    transition is written through, so with several workers each one sees the others'
+    transitions (webhook handlers already hold the cross-worker call lock). A per-call
+    in-process lock makes read-check-write atomic among this worker's coroutines. The
+    local records only mirror the last state this worker saw, for the stats.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _CallRecord] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._lock_users: Dict[str, int] = {}
+        self.dwell = {state: LatencyHistogram(DWELL_BUCKETS_MS) for state in STATES if state != CallPhase.ENDED}
+        self.transitions = 0
+        self.rejected: Dict[str, int] = {}
+
+    async def current(self, call_control_id: str) -> Optional[str]:
+        """The call's state as last written by any worker."""
+        record = await self._load(call_control_id)
+        return record.state
+
+    async def transition(self, call_control_id: str, to_state: str, reason: str = "") -> bool:
+        """Move the call to `to_state` if allowed from its current state; returns whether it moved."""
+        lock = self._locks.setdefault(call_control_id, asyncio.Lock())
+        self._lock_users[call_control_id] = self._lock_users.get(call_control_id, 0) + 1
+        try:
+            async with lock:
+                return await self._transition(call_control_id, to_state, reason)
+        finally:
+            remaining = self._lock_users[call_control_id] - 1
+            if remaining:
+                self._lock_users[call_control_id] = remaining
+            else:
+                del self._lock_users[call_control_id]
+                del self._locks[call_control_id]
+
+    async def _transition(self, call_control_id: str, to_state: str, reason: str) -> bool:
+        record = await self._load(call_control_id)
+        from_state = record.state
+        if to_state != CallPhase.ENDED and to_state not in TRANSITIONS[from_state]:
+            key = f"{from_state}->{to_state}"
+            self.rejected[key] = self.rejected.get(key, 0) + 1
+            logger.info(f"[FSM] Call {call_control_id}: ignoring {reason or to_state} while {from_state}")
+            return False
+
+        now = time.time()
+        if from_state in self.dwell:
+            self.dwell[from_state].record((now - record.entered_at) * 1000)
+        record.state, record.entered_at = to_state, now
+        self.transitions += 1
+        logger.info(f"[FSM] Call {call_control_id}: {from_state} -> {to_state}" + (f" ({reason})" if reason else ""))
+
+        if to_state == CallPhase.ENDED:
+            self._calls.pop(call_control_id, None)
+        else:
+            self._calls[call_control_id] = record
+        await call_state.update(call_control_id, fsm_state=to_state, fsm_entered_at=now)
+        return True
+
+    async def _load(self, call_control_id: str) -> _CallRecord:
+        """Fresh state from call_state (no shared state: a call not started, or ended and cleaned up)."""
+        shared = await call_state.get(call_control_id) or {}
+        record = _CallRecord(shared.get("fsm_state"), shared.get("fsm_entered_at") or time.time())
+        if record.state in (None, CallPhase.ENDED):
+            self._calls.pop(call_control_id, None)
+        else:
+            self._calls[call_control_id] = record
+        return record
+
+    def get_stats(self) -> Dict[str, Any]:
+        current = {state: 0 for state in STATES if state != CallPhase.ENDED}
+        for record in self._calls.values():
+            if record.state in current:
+                current[record.state] += 1
+        return {
+            "active_calls": len(self._calls),
+            "calls_by_state": current,
+            "transitions": self.transitions,
+            "rejected": self.rejected,
+            "dwell": {state: histogram.snapshot() for state, histogram in self.dwell.items()}
+        }
+
+
+call_fsm = CallStateMachine()
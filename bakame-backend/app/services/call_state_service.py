@@ -0,0 +1,327 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, AsyncIterator
+from app.config import settings
+from app.services.metrics_service import LatencyHistogram, elapsed_ms
+
+logger = logging.getLogger(__name__)
+
+
+class CallStateStore:
+    """
+    Per-call state shared by every worker process, plus per-call locks.
+
+    State is a flat dict of JSON-serializable fields per call, expiring `ttl_seconds`
+    after its last write. `lock(call_id)` serializes work on one call across workers;
+    it yields False instead of raising if the lock can't be had within `lock_wait_seconds`,
+    so callers can choose to carry on unlocked rather than drop the event. Stores whose
+    locks are leases renew them every third of `lock_lease_seconds` while the block runs,
+    so a handler awaiting a slow LLM completion keeps the call to itself; the lease only
+    runs out if the holding worker dies.
+    """
+
+    backend = "base"
+    # Whether held locks expire unless renewed
+    leased_locks = False
+
+    def __init__(self, ttl_seconds: float = 14400, lock_lease_seconds: float = 10.0,
+                 lock_wait_seconds: float = 5.0):
+        self.ttl_seconds = ttl_seconds
+        self.lock_lease_seconds = lock_lease_seconds
+        self.lock_wait_seconds = lock_wait_seconds
+
+        self.read_time = LatencyHistogram()
+        self.write_time = LatencyHistogram()
+        self.lock_wait = LatencyHistogram()
+        self.lock_acquired = 0
+        self.lock_contended = 0
+        self.lock_timeouts = 0
+        self.lock_renewals = 0
+        self.locks_lost = 0
+        self.errors = 0
+
+    async def get(self, call_id: str) -> Optional[Dict[str, Any]]:
+        """Current state of the call, or None if there is none."""
+        start = time.perf_counter()
+        ok = True
+        try:
+            return await self._get(call_id)
+        except Exception as e:
+            ok = False
+            self.errors += 1
+            logger.error(f"[CallState] Read failed for {call_id}: {str(e)}")
+            return None
+        finally:
+            self.read_time.record(elapsed_ms(start), ok=ok)
+
+    async def update(self, call_id: str, **fields: Any):
+        """Set the given fields on the call's state, creating it if needed."""
+        await self._write(call_id, self._update, fields)
+
+    async def delete(self, call_id: str):
+        await self._write(call_id, self._delete)
+
+    async def _write(self, call_id: str, operation, *args):
+        start = time.perf_counter()
+        ok = True
+        try:
+            await operation(call_id, *args)
+        except Exception as e:
+            ok = False
+            self.errors += 1
+            logger.error(f"[CallState] Write failed for {call_id}: {str(e)}")
+        finally:
+            self.write_time.record(elapsed_ms(start), ok=ok)
+
+    @asynccontextmanager
+    async def lock(self, call_id: str) -> AsyncIterator[bool]:
+        """Hold the call's lock for the duration of the block; yields whether it was acquired."""
+        start = time.perf_counter()
+        token = None
+        try:
+            token = await self._acquire(call_id)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"[CallState] Lock acquire failed for {call_id}: {str(e)}")
+        self.lock_wait.record(elapsed_ms(start), ok=token is not None)
+
+        if token is None:
+            self.lock_timeouts += 1
+            logger.warning(f"[CallState] Could not lock call {call_id} within {self.lock_wait_seconds}s")
+        else:
+            self.lock_acquired += 1
+
+        renewer = None
+        if token is not None and self.leased_locks:
+            renewer = asyncio.create_task(self._keep_lease(call_id, token))
+        try:
+            yield token is not None
+        finally:
+            if renewer is not None:
+                renewer.cancel()
+                await asyncio.gather(renewer, return_exceptions=True)
+            if token is not None:
+                try:
+                    await self._release(call_id, token)
+                except Exception as e:
+                    self.errors += 1
+                    logger.error(f"[CallState] Lock release failed for {call_id}: {str(e)}")
+
+    async def _keep_lease(self, call_id: str, token: str):
+        interval = self.lock_lease_seconds / 3
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                renewed = await self._renew(call_id, token)
+            except Exception as e:
+                # Try again next interval - the lease still has two thirds left
+                self.errors += 1
+                logger.error(f"[CallState] Lock renewal failed for {call_id}: {str(e)}")
+                continue
+            if not renewed:
+                self.locks_lost += 1
+                logger.warning(f"[CallState] Lost the lock on call {call_id} (lease expired before renewal)")
+                return
+            self.lock_renewals += 1
+
+    async def close(self):
+        pass
+
+    async def _get(self, call_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def _update(self, call_id: str, fields: Dict[str, Any]):
+        raise NotImplementedError
+
+    async def _delete(self, call_id: str):
+        raise NotImplementedError
+
+    async def _acquire(self, call_id: str) -> Optional[str]:
+        raise NotImplementedError
+
+    async def _release(self, call_id: str, token: str):
+        raise NotImplementedError
+
+    async def _renew(self, call_id: str, token: str) -> bool:
+        """Extend a held lease; False if the lock is no longer ours."""
+        raise NotImplementedError
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "lock_acquired": self.lock_acquired,
+            "lock_contended": self.lock_contended,
+            "lock_timeouts": self.lock_timeouts,
+            "lock_renewals": self.lock_renewals,
+            "locks_lost": self.locks_lost,
+            "errors": self.errors,
+            "lock_wait": self.lock_wait.snapshot(),
+            "read_time": self.read_time.snapshot(),
+            "write_time": self.write_time.snapshot()
+        }
+
+
+class InMemoryCallStateStore(CallStateStore):
+    """Single-process store for tests and one-worker deployments."""
+
+    backend = "memory"
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # call_id -> (expires_at, state)
+        self._states: Dict[str, tuple] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._lock_users: Dict[str, int] = {}
+
+    async def _get(self, call_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._states.get(call_id)
+        if entry is None:
+            return None
+        expires_at, state = entry
+        if expires_at < time.monotonic():
+            del self._states[call_id]
+            return None
+        return dict(state)
+
+    async def _update(self, call_id: str, fields: Dict[str, Any]):
+        state = await self._get(call_id) or {}
+        state.update(fields)
+        self._states[call_id] = (time.monotonic() + self.ttl_seconds, state)
+
+    async def _delete(self, call_id: str):
+        self._states.pop(call_id, None)
+
+    async def _acquire(self, call_id: str) -> Optional[str]:
+        lock = self._locks.setdefault(call_id, asyncio.Lock())
+        users = self._lock_users.get(call_id, 0)
+        if users:
+            self.lock_contended += 1
+        self._lock_users[call_id] = users + 1
+        try:
+            await asyncio.wait_for(lock.acquire(), timeout=self.lock_wait_seconds)
+        except asyncio.TimeoutError:
+            self._forget_lock(call_id)
+            return None
+        return call_id
+
+    async def _release(self, call_id: str, token: str):
+        self._locks[call_id].release()
+        self._forget_lock(call_id)
+
+    def _forget_lock(self, call_id: str):
+        remaining = self._lock_users[call_id] - 1
+        if remaining:
+            self._lock_users[call_id] = remaining
+        else:
+            del self._lock_users[call_id]
+            del self._locks[call_id]
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = super().get_stats()
+        stats["calls"] = len(self._states)
+        return stats
+
+
+class RedisCallStateStore(CallStateStore):
+    """
+    Redis-backed store so every uvicorn worker sees the same call state.
+
+    Each call is a hash of JSON-encoded fields under `call_state:{id}`, so field updates
+    are atomic without a read-modify-write. Locks are `SET NX PX` leases with a random
+    token, renewed and released only by their owner.
+    """
+
+    backend = "redis"
+    leased_locks = True
+
+    _RENEW_SCRIPT = """
+    if redis.call("get", KEYS[1]) == ARGV[1] then
+        return redis.call("pexpire", KEYS[1], ARGV[2])
+    end
+    return 0
+    """
+
+    _RELEASE_SCRIPT = """
+    if redis.call("get", KEYS[1]) == ARGV[1] then
+        return redis.call("del", KEYS[1])
+    end
+    return 0
+    """
+
+    def __init__(self, redis_url: str, **kwargs):
+        super().__init__(**kwargs)
+        import redis.asyncio as redis_asyncio
+        self.client = redis_asyncio.from_url(redis_url, decode_responses=True)
+
+    @staticmethod
+    def _state_key(call_id: str) -> str:
+        return f"call_state:{call_id}"
+
+    @staticmethod
+    def _lock_key(call_id: str) -> str:
+        return f"call_lock:{call_id}"
+
+    async def _get(self, call_id: str) -> Optional[Dict[str, Any]]:
+        fields = await self.client.hgetall(self._state_key(call_id))
+        if not fields:
+            return None
+        return {name: json.loads(value) for name, value in fields.items()}
+
+    async def _update(self, call_id: str, fields: Dict[str, Any]):
+        key = self._state_key(call_id)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping={name: json.dumps(value) for name, value in fields.items()})
+            pipe.expire(key, int(self.ttl_seconds))
+            await pipe.execute()
+
+    async def _delete(self, call_id: str):
+        await self.client.delete(self._state_key(call_id))
+
+    async def _acquire(self, call_id: str) -> Optional[str]:
+        key = self._lock_key(call_id)
+        token = uuid.uuid4().hex
+        lease_ms = int(self.lock_lease_seconds * 1000)
+        deadline = time.monotonic() + self.lock_wait_seconds
+        delay = 0.005
+        contended = False
+
+        while True:
+            if await self.client.set(key, token, nx=True, px=lease_ms):
+                return token
+            if not contended:
+                contended = True
+                self.lock_contended += 1
+            if time.monotonic() + delay > deadline:
+                return None
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.1)
+
+    async def _release(self, call_id: str, token: str):
+        await self.client.eval(self._RELEASE_SCRIPT, 1, self._lock_key(call_id), token)
+
+    async def _renew(self, call_id: str, token: str) -> bool:
+        lease_ms = int(self.lock_lease_seconds * 1000)
+        return bool(await self.client.eval(self._RENEW_SCRIPT, 1, self._lock_key(call_id), token, lease_ms))
+
+    async def close(self):
+        await self.client.aclose()
+
+
+def create_call_state_store(backend: Optional[str] = None) -> CallStateStore:
+    """Build the store selected by settings.call_state_backend."""
+    backend = backend or settings.call_state_backend
+    options = dict(
+        ttl_seconds=settings.call_state_ttl_seconds,
+        lock_lease_seconds=settings.call_lock_lease_seconds,
+        lock_wait_seconds=settings.call_lock_wait_seconds
+    )
+    if backend == "redis":
+        return RedisCallStateStore(settings.redis_url, **options)
+    return InMemoryCallStateStore(**options)
+
+
+call_state = create_call_state_store()
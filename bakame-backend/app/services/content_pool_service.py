@@ -0,0 +1,242 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Dict, Any, Callable, Awaitable, Deque, List, Optional, Tuple
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# (module, difficulty, theme)
+BucketKey = Tuple[str, str, str]
+# Returns a validated item, or None when the LLM output didn't parse/validate
+ContentGenerator = Callable[[str, str], Awaitable[Optional[Dict[str, Any]]]]
+
+
+class ContentPool:
+    """
+    Pre-generated lesson content (math problems, comprehension stories) keyed by
+    (module, difficulty, theme).
+
+    Modules register a generator that asks the LLM for one item and returns it only if
+    it parsed and validated. Background workers keep every bucket at `depth` items,
+    filling the emptiest bucket first and generating at most `refill_per_minute` items
+    between them. `take()` pops a ready item in O(1); `get()` falls back to generating
+    inline only when the bucket is cold. The workers start on first use, so content is
+    only generated for modules that are actually taught on this deployment.
+
+    A module whose generator has never produced a valid item after `reject_limit`
+    attempts in a row (prompt/schema mismatch, truncated output) is disabled: it is no
+    longer refilled or generated inline, and its module falls back to static content.
+    """
+
+    def __init__(self, depth: int = 2, refill_per_minute: float = 20.0, workers: int = 2, reject_limit: int = 10):
+        self.depth = depth
+        self.refill_interval = 60.0 / refill_per_minute if refill_per_minute > 0 else 0.0
+        self.worker_count = max(1, workers)
+        self.reject_limit = reject_limit
+
+        self._generators: Dict[str, ContentGenerator] = {}
+        self._themes: Dict[Tuple[str, str], List[str]] = {}
+        self._buckets: Dict[BucketKey, Deque[Dict[str, Any]]] = {}
+        self._filling: Dict[BucketKey, int] = {}
+        self._workers: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._next_slot = 0.0
+        self._consecutive_failures = 0
+        self._consecutive_rejects: Dict[str, int] = {}
+        self._validated: set = set()
+        self.disabled: set = set()
+
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        self.inline_failures: Dict[str, int] = {}
+        self.generated: Dict[str, int] = {}
+        self.rejected: Dict[str, int] = {}
+        self.generation_failures = 0
+        self._bucket_misses: Dict[BucketKey, int] = {}
+        self._generated_at: Deque[float] = deque(maxlen=1000)
+
+    def register(self, module: str, difficulties: List[str], themes: List[str], generator: ContentGenerator):
+        """Declare a module's buckets (every difficulty x theme) and how to generate one item."""
+        self._generators[module] = generator
+        for difficulty in difficulties:
+            self._themes[(module, difficulty)] = list(themes)
+            for theme in themes:
+                self._buckets[(module, difficulty, theme)] = deque()
+                self._filling[(module, difficulty, theme)] = 0
+                self._bucket_misses[(module, difficulty, theme)] = 0
+        for counter in (self.hits, self.misses, self.inline_failures, self.generated, self.rejected,
+                        self._consecutive_rejects):
+            counter.setdefault(module, 0)
+
+    def start(self):
+        """Launch the refill workers (idempotent; needs a running event loop)."""
+        if self.depth <= 0 or not self._buckets or len(self.disabled) == len(self._generators):
+            return
+        if self._workers and not all(worker.done() for worker in self._workers):
+            return
+        self._wakeup = asyncio.Event()
+        self._workers = [asyncio.create_task(self._refill_worker()) for _ in range(self.worker_count)]
+        logger.info(f"Content pool started: {len(self._buckets)} buckets x {self.depth}, {self.worker_count} workers")
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def take(self, module: str, difficulty: str, theme: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Pop a ready item, or None on a cold miss. Without a theme, the first non-empty
+        bucket of that difficulty (in random theme order) is used.
+        """
+        self.start()
+        themes = [theme] if theme is not None else random.sample(self._themes[(module, difficulty)],
+                                                                 len(self._themes[(module, difficulty)]))
+        item = None
+        for candidate in themes:
+            bucket = self._buckets[(module, difficulty, candidate)]
+            if bucket:
+                item = bucket.popleft()
+                break
+
+        if item is None:
+            self.misses[module] += 1
+            self._bucket_misses[(module, difficulty, themes[0])] += 1
+        else:
+            self.hits[module] += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return item
+
+    async def get(self, module: str, difficulty: str, theme: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """A pooled item, generated inline on a cold miss; None if that fails too."""
+        item = self.take(module, difficulty, theme)
+        if item is not None or module in self.disabled:
+            return item
+        if theme is None:
+            theme = random.choice(self._themes[(module, difficulty)])
+        try:
+            item = await self._generators[module](difficulty, theme)
+        except Exception as e:
+            logger.error(f"Inline {module} generation failed: {str(e)}")
+            item = None
+        if item is None:
+            self.inline_failures[module] += 1
+        self._record_outcome(module, item is not None)
+        return item
+
+    def _record_outcome(self, module: str, valid: bool):
+        """Disable a module whose generator hasn't produced one valid item in `reject_limit` tries."""
+        if valid:
+            self._consecutive_rejects[module] = 0
+            self._validated.add(module)
+            return
+        self._consecutive_rejects[module] += 1
+        if (self.reject_limit > 0 and module not in self.disabled and module not in self._validated
+                and self._consecutive_rejects[module] >= self.reject_limit):
+            self.disabled.add(module)
+            logger.error(f"Content pool disabled for {module}: {self._consecutive_rejects[module]} generations "
+                         f"in a row were rejected and none has ever validated - check its prompt and max_tokens")
+
+    def _next_bucket_to_fill(self) -> Optional[BucketKey]:
+        """The emptiest bucket below `depth` (counting items being generated), most-missed first on ties."""
+        best = None
+        best_rank = None
+        for key, bucket in self._buckets.items():
+            if key[0] in self.disabled:
+                continue
+            level = len(bucket) + self._filling[key]
+            if level >= self.depth:
+                continue
+            rank = (level, -self._bucket_misses[key])
+            if best_rank is None or rank < best_rank:
+                best, best_rank = key, rank
+        return best
+
+    async def _wait_for_slot(self):
+        """Space generations `refill_interval` apart across all workers."""
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.refill_interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _refill_worker(self):
+        while True:
+            key = self._next_bucket_to_fill()
+            if key is None and len(self.disabled) == len(self._generators):
+                logger.warning("Content pool refill worker stopping: every module is disabled")
+                return
+            if key is None:
+                # Every bucket full - sleep until something is taken
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            module, difficulty, theme = key
+            self._filling[key] += 1
+            ok = False
+            try:
+                await self._wait_for_slot()
+                item = await self._generators[module](difficulty, theme)
+                if item is None:
+                    self.rejected[module] += 1
+                else:
+                    self._buckets[key].append(item)
+                    self.generated[module] += 1
+                    self._generated_at.append(time.monotonic())
+                    ok = True
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Content pool generation failed for {module}/{difficulty}: {str(e)}")
+            finally:
+                self._filling[key] -= 1
+            self._record_outcome(module, ok)
+
+            if ok:
+                self._consecutive_failures = 0
+            else:
+                # Back off while the LLM is down or returning junk; modules fall back to static content
+                self.generation_failures += 1
+                self._consecutive_failures += 1
+                backoff = max(self.refill_interval, 1.0) * 2 ** min(self._consecutive_failures - 1, 6)
+                await asyncio.sleep(min(backoff, 300.0))
+
+    def get_stats(self) -> Dict[str, Any]:
+        cutoff = time.monotonic() - 60.0
+        modules = {}
+        for module in self._generators:
+            served = self.hits[module] + self.misses[module]
+            modules[module] = {
+                "depth": {
+                    difficulty: sum(len(self._buckets[(module, difficulty, theme)]) for theme in themes)
+                    for (owner, difficulty), themes in self._themes.items() if owner == module
+                },
+                "target_depth": self.depth * sum(1 for key in self._buckets if key[0] == module),
+                "hits": self.hits[module],
+                "misses": self.misses[module],
+                "hit_rate": round(self.hits[module] / served, 3) if served else None,
+                "inline_failures": self.inline_failures[module],
+                "generated": self.generated[module],
+                "rejected": self.rejected[module],
+                "disabled": module in self.disabled
+            }
+        return {
+            "depth_per_bucket": self.depth,
+            "workers": sum(1 for worker in self._workers if not worker.done()),
+            "refilled_last_minute": sum(1 for at in self._generated_at if at >= cutoff),
+            "generation_failures": self.generation_failures,
+            "modules": modules
+        }
+
+
+content_pool = ContentPool(
+    depth=settings.content_pool_depth,
+    refill_per_minute=settings.content_pool_refill_per_minute,
+    workers=settings.content_pool_workers,
+    reject_limit=settings.content_pool_reject_limit
+)
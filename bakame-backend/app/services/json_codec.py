@@ -0,0 +1,34 @@
+"""
+JSON encode/decode for the media hot paths: orjson when installed, stdlib json otherwise.
+Callers use `json_codec.loads` / `json_codec.dumps` so the backend can be swapped at runtime
+(the voice bridge benchmark compares both).
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _orjson_dumps(obj) -> str:
+    return orjson.dumps(obj).decode()
+
+
+def _stdlib_dumps(obj) -> str:
+    return json.dumps(obj, separators=(",", ":"))
+
+
+def use_backend(name: str):
+    """Select "orjson" or "json" for loads/dumps."""
+    global BACKEND, loads, dumps
+    if name == "orjson" and orjson is not None:
+        BACKEND, loads, dumps = "orjson", orjson.loads, _orjson_dumps
+    else:
+        BACKEND, loads, dumps = "json", json.loads, _stdlib_dumps
+
+
+BACKEND = "json"
+loads = json.loads
+dumps = _stdlib_dumps
+use_backend("orjson")
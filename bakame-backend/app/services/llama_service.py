@@ -1,7 +1,11 @@
-import requests
-import json
+import httpx
 from typing import List, Dict, Any, Optional
 from app.config import settings
+from app.services.openai_service import openai_service
+from app.services.llm_router_service import LLMProviderRouter, LLMProvider, CircuitBreaker
+
+# Header variants the Llama API has accepted at different times
+AUTH_SCHEMES = ("bearer", "x-api-key", "llama-api-key")
 
 class LlamaService:
     def __init__(self):
@@ -10,9 +14,23 @@ class LlamaService:
             "https://api.llama.com/v1/chat/completions"
         ]
         self.working_url = None
+        self.working_auth_scheme: Optional[str] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        
+        # Llama first; OpenAI if Llama fails, is circuit-broken, or is slower than the hedge delay
+        self.router = LLMProviderRouter(
+            LLMProvider("llama", self._call_llama_api,
+                        CircuitBreaker(settings.llm_breaker_failures, settings.llm_breaker_reset_seconds),
+                        enabled=bool(self.api_key)),
+            LLMProvider("openai", self._call_openai,
+                        CircuitBreaker(settings.llm_breaker_failures, settings.llm_breaker_reset_seconds),
+                        enabled=openai_service.enabled),
+            hedge_ms=settings.llm_hedge_ms
+        )
         
-    async def generate_response(self, messages: List[Dict[str, str]], module_name: str = "general") -> str:
-        """Generate response using Llama API with Rwandan cultural context"""
+    async def generate_response(self, messages: List[Dict[str, str]], module_name: str = "general",
+                                max_tokens: int = 100) -> str:
+        """Generate response using Llama API with Rwandan cultural context (max_tokens: raise for structured output)"""
         try:
             system_prompts = {
                 "english": "You are Bakame, a warm and patient voice-based AI tutor. Speak slowly, clearly, and gently. Use short, plain English. Be encouraging, even if the user gets things wrong. Correct grammar simply. Give pronunciation help (e.g., 'The th sound is soft—put your tongue behind your teeth.'). Use repetition when needed. Encourage mistakes: 'Making mistakes is how we learn.' Always end with warmth: 'Thanks for learning with me—you're doing great.'",
@@ -30,57 +48,96 @@ class LlamaService:
             
             full_messages = [{"role": "system", "content": system_prompt}] + messages
             
-            response = await self._call_llama_api(full_messages, module_name)
+            response = await self.router.complete(full_messages, max_tokens)
             return response.strip()
             
         except Exception as e:
             print(f"Error in Llama generation: {e}")
             return "Ndabwira ko nfite ikibazo gito. (I'm having a small issue.) Please try again, and I'll do my best to help you learn!"
     
-    async def _call_llama_api(self, messages: List[Dict[str, str]], module_name: str = "general") -> str:
-        """Call Llama API with multiple endpoint fallback, then OpenAI with Rwanda context"""
-        
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the shared Llama API client, creating it on first use."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(settings.llama_timeout_seconds, connect=3.0),
+                limits=httpx.Limits(max_connections=50, max_keepalive_connections=10, keepalive_expiry=30.0)
+            )
+        return self._client
+    
+    def _auth_headers(self, scheme: str) -> Dict[str, str]:
+        if scheme == "bearer":
+            return {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+        if scheme == "x-api-key":
+            return {"X-API-Key": self.api_key, "Content-Type": "application/json"}
+        return {"llama-api-key": self.api_key, "Content-Type": "application/json"}
+    
+    async def _call_llama_api(self, messages: List[Dict[str, str]], max_tokens: int) -> str:
+        """
+        One Llama completion; raises on failure so the router can fail over.
+        The endpoint and auth scheme that last worked are tried first, and another auth
+        scheme is only tried when the API rejects the credentials (401/403) - a timeout
+        or server error isn't going to be fixed by different headers.
+        """
         if self.working_url:
             urls_to_try = [self.working_url] + [url for url in self.base_urls if url != self.working_url]
         else:
             urls_to_try = self.base_urls
-        
-        headers_variants = [
-            {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"},
-            {"X-API-Key": self.api_key, "Content-Type": "application/json"},
-            {"llama-api-key": self.api_key, "Content-Type": "application/json"}
-        ]
+        if self.working_auth_scheme:
+            schemes = [self.working_auth_scheme] + [s for s in AUTH_SCHEMES if s != self.working_auth_scheme]
+        else:
+            schemes = list(AUTH_SCHEMES)
         
         payload = {
             "model": "Llama-4-Maverick-17B-128E-Instruct-FP8",
             "messages": messages,
-            "max_tokens": 100,
+            "max_tokens": max_tokens,
             "temperature": 0.7,
             "top_p": 0.9
         }
         
+        last_error: Exception = RuntimeError("No Llama endpoints configured")
+        client = self._get_client()
         for url in urls_to_try:
-            for headers in headers_variants:
+            for scheme in schemes:
                 try:
-                    response = requests.post(url, headers=headers, json=payload, timeout=30)
-                    
-                    if response.status_code == 200:
-                        data = response.json()
-                        if 'completion_message' in data and 'content' in data['completion_message']:
-                            self.working_url = url
-                            return data['completion_message']['content']['text']
-                    
-                except Exception as e:
+                    response = await client.post(url, headers=self._auth_headers(scheme), json=payload)
+                except httpx.HTTPError as e:
+                    last_error = e
                     print(f"Llama API error with {url}: {e}")
+                    break
+                
+                if response.status_code in (401, 403):
+                    last_error = RuntimeError(f"Llama API rejected {scheme} auth ({response.status_code})")
                     continue
+                if response.status_code != 200:
+                    last_error = RuntimeError(f"Llama API returned {response.status_code}")
+                    break
+                
+                data = response.json()
+                if 'completion_message' in data and 'content' in data['completion_message']:
+                    self.working_url = url
+                    self.working_auth_scheme = scheme
+                    return data['completion_message']['content']['text']
+                last_error = RuntimeError("Unexpected Llama API response format")
+                break
         
-        print("Llama API failed, falling back to OpenAI with Rwanda context")
-        try:
-            from app.services.openai_service import openai_service
-            return await openai_service.generate_response(messages, module_name)
-        except Exception as e:
-            print(f"OpenAI fallback error: {e}")
-            return "Ndabwira ko nfite ikibazo. (I have an issue.) Let me try to help you another way."
+        raise last_error
+    
+    async def _call_openai(self, messages: List[Dict[str, str]], max_tokens: int) -> str:
+        """OpenAI with the same (Rwanda context) system prompt, for failover and hedging"""
+        return await openai_service.complete(messages, max_tokens=max_tokens, temperature=0.7)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "working_url": self.working_url,
+            "working_auth_scheme": self.working_auth_scheme,
+            **self.router.get_stats()
+        }
+    
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
     
     async def transcribe_audio(self, audio_data: bytes, audio_format: str = "wav") -> str:
         """Keep using OpenAI Whisper for transcription"""
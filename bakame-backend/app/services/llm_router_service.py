@@ -0,0 +1,236 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Any, Callable, Awaitable, List, Optional
+from app.services.metrics_service import LatencyHistogram, elapsed_ms
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderUnavailable(Exception):
+    """No provider could be asked (not configured or circuit open)."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure breaker for one provider.
+
+    After `failure_threshold` failures in a row the circuit opens and the provider is
+    skipped for `reset_seconds`. Then one trial request is let through (half-open): success
+    closes the circuit, failure opens it for another `reset_seconds`.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 3, reset_seconds: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        """Whether a request may go to the provider now (claims the trial slot when half-open)."""
+        if self.state == self.OPEN and self._clock() - self.opened_at >= self.reset_seconds:
+            self.state = self.HALF_OPEN
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self._trial_in_flight = False
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+                logger.warning(f"Circuit opened after {self.consecutive_failures} consecutive failures")
+            self.state = self.OPEN
+            self.opened_at = self._clock()
+
+    def release(self):
+        """A request was abandoned (lost a hedge race) - neither success nor failure."""
+        self._trial_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "retry_in_seconds": round(max(0.0, self.opened_at + self.reset_seconds - self._clock()), 1)
+            if self.state == self.OPEN else None
+        }
+
+
+class LLMProvider:
+    """A chat completion backend: `call(messages, max_tokens)` returns the reply text or raises."""
+
+    def __init__(self, name: str, call: Callable[[List[Dict[str, str]], int], Awaitable[str]],
+                 breaker: CircuitBreaker, enabled: bool = True):
+        self.name = name
+        self.call = call
+        self.breaker = breaker
+        self.enabled = enabled
+
+        self.latency = LatencyHistogram()
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.wins = 0
+        self.cancelled = 0
+        self.short_circuited = 0
+
+    def available(self) -> bool:
+        if not self.enabled:
+            return False
+        if not self.breaker.allow():
+            self.short_circuited += 1
+            return False
+        return True
+
+    async def run(self, messages: List[Dict[str, str]], max_tokens: int) -> str:
+        self.requests += 1
+        start = time.perf_counter()
+        try:
+            result = await self.call(messages, max_tokens)
+            if not result or not result.strip():
+                raise ValueError(f"{self.name} returned an empty response")
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            self.breaker.release()
+            raise
+        except Exception:
+            self.failures += 1
+            self.latency.record(elapsed_ms(start), ok=False)
+            self.breaker.record_failure()
+            raise
+        self.successes += 1
+        self.latency.record(elapsed_ms(start))
+        self.breaker.record_success()
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "requests": self.requests,
+            "successes": self.successes,
+            "failures": self.failures,
+            "success_rate": round(self.successes / (self.successes + self.failures), 3)
+            if self.successes + self.failures else None,
+            "wins": self.wins,
+            "cancelled": self.cancelled,
+            "short_circuited": self.short_circuited,
+            "circuit": self.breaker.snapshot(),
+            "latency": self.latency.snapshot()
+        }
+
+
+class LLMProviderRouter:
+    """
+    Primary provider with a hedged fallback.
+
+    The primary is asked first. If it hasn't answered within `hedge_ms`, the fallback is
+    asked too and whichever succeeds first wins (the other request is cancelled). If the
+    primary fails outright, or its circuit is open, the fallback is asked straight away.
+    """
+
+    def __init__(self, primary: LLMProvider, fallback: LLMProvider, hedge_ms: float = 1500):
+        self.primary = primary
+        self.fallback = fallback
+        self.hedge_ms = hedge_ms
+
+        self.requests = 0
+        self.hedged = 0
+        self.failovers = 0
+        self.exhausted = 0
+        self.latency = LatencyHistogram()
+
+    async def complete(self, messages: List[Dict[str, str]], max_tokens: int = 100) -> str:
+        self.requests += 1
+        start = time.perf_counter()
+        try:
+            result = await self._route(messages, max_tokens)
+        except Exception:
+            self.exhausted += 1
+            self.latency.record(elapsed_ms(start), ok=False)
+            raise
+        self.latency.record(elapsed_ms(start))
+        return result
+
+    async def _route(self, messages: List[Dict[str, str]], max_tokens: int) -> str:
+        if not self.primary.available():
+            if not self.fallback.available():
+                raise ProviderUnavailable(f"{self.primary.name} and {self.fallback.name} both unavailable")
+            self.failovers += 1
+            return await self._collect({asyncio.create_task(self.fallback.run(messages, max_tokens)): self.fallback})
+
+        primary = asyncio.create_task(self.primary.run(messages, max_tokens))
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=self.hedge_ms / 1000.0)
+        except asyncio.CancelledError:
+            primary.cancel()
+            raise
+        if done:
+            if primary.exception() is None:
+                self.primary.wins += 1
+                return primary.result()
+            # The primary failed outright - the fallback alone decides the outcome
+            logger.warning(f"{self.primary.name} failed: {str(primary.exception())}")
+            if not self.fallback.available():
+                raise primary.exception()
+            self.failovers += 1
+            return await self._collect({asyncio.create_task(self.fallback.run(messages, max_tokens)): self.fallback})
+
+        if self.fallback.available():
+            self.hedged += 1
+            logger.info(f"{self.primary.name} slower than {self.hedge_ms:.0f}ms, also asking {self.fallback.name}")
+            fallback = asyncio.create_task(self.fallback.run(messages, max_tokens))
+            return await self._collect({primary: self.primary, fallback: self.fallback})
+        return await self._collect({primary: self.primary})
+
+    async def _collect(self, tasks: Dict[asyncio.Task, LLMProvider]) -> str:
+        """
+        First successful result wins; the rest are cancelled. Tasks finishing together are
+        read in provider order (`tasks` order), so if all fail the last provider's error is raised.
+        """
+        pending = set(tasks)
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in (task for task in tasks if task in done):
+                    if task.exception() is None:
+                        tasks[task].wins += 1
+                        return task.result()
+                    error = task.exception()
+                    logger.warning(f"{tasks[task].name} failed: {str(error)}")
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        raise error
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "hedge_ms": self.hedge_ms,
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "failovers": self.failovers,
+            "exhausted": self.exhausted,
+            "latency": self.latency.snapshot(),
+            "providers": {p.name: p.snapshot() for p in (self.primary, self.fallback)}
+        }
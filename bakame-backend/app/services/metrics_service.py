@@ -0,0 +1,66 @@
+import time
+from collections import deque
+from typing import Dict, Any, Optional, Sequence
+
+# Bucket upper bounds in milliseconds, roughly log-spaced for telephony latencies
+DEFAULT_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class LatencyHistogram:
+    """
+    Lightweight in-process latency recorder.
+    Keeps cumulative bucket counts plus a bounded window of recent samples for percentiles.
+    """
+
+    def __init__(self, buckets_ms: Sequence[float] = DEFAULT_BUCKETS_MS, window: int = 1000):
+        self.buckets_ms = tuple(buckets_ms)
+        self.bucket_counts = [0] * (len(self.buckets_ms) + 1)
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, elapsed_ms: float, ok: bool = True):
+        """Record one observation in milliseconds."""
+        self.count += 1
+        if not ok:
+            self.errors += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.samples.append(elapsed_ms)
+
+        for index, bound in enumerate(self.buckets_ms):
+            if elapsed_ms <= bound:
+                self.bucket_counts[index] += 1
+                break
+        else:
+            self.bucket_counts[-1] += 1
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Percentile over the recent sample window (None when empty)."""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+        return round(ordered[index], 2)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Serializable view for metrics endpoints."""
+        buckets = {f"le_{bound}": count for bound, count in zip(self.buckets_ms, self.bucket_counts)}
+        buckets["le_inf"] = self.bucket_counts[-1]
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else None,
+            "max_ms": round(self.max_ms, 2),
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "buckets": buckets
+        }
+
+
+def elapsed_ms(start: float) -> float:
+    """Milliseconds since a time.perf_counter() timestamp."""
+    return (time.perf_counter() - start) * 1000.0
@@ -5,9 +5,14 @@ import logging
 from typing import Optional, Dict, Any, Callable
 import websockets
 from app.config import settings
+from app.services import json_codec
 
 logger = logging.getLogger(__name__)
 
+# Pre-serialized envelope for input_audio_buffer.append - base64 never needs JSON escaping
+_APPEND_PREFIX = '{"type":"input_audio_buffer.append","audio":"'
+_APPEND_SUFFIX = '"}'
+
 class OpenAIRealtimeService:
     """
     Service to handle OpenAI Realtime API WebSocket connections for voice-to-voice conversations.
@@ -19,18 +24,33 @@ class OpenAIRealtimeService:
         if not self.api_key:
             raise ValueError("OpenAI API key not configured")
         
-        self.url = "wss://api.openai.com/v1/realtime?model=gpt-realtime"
+        self.url = settings.openai_realtime_url
         self.ws: Optional[Any] = None
         self.is_connected = False
         
         # Audio configuration
         self.input_audio_format = "g711_ulaw"  # Compatible with Telnyx 8kHz µ-law
         self.output_audio_format = "g711_ulaw"
+        # What the session was last configured with (lets a pooled session skip a redundant session.update)
+        self.instructions: Optional[str] = None
+        self.voice: Optional[str] = None
+        
+        # Response being generated (response.created -> response.done) and the assistant
+        # item its audio belongs to, so a barge-in can cancel and truncate it
+        self.response_active = False
+        self.current_item_id: Optional[str] = None
+        self.current_content_index = 0
         
         # Event handlers
         self.on_audio_delta: Optional[Callable] = None
+        # Receives output audio still base64-encoded (codec passthrough); takes precedence over on_audio_delta
+        self.on_audio_delta_base64: Optional[Callable] = None
         self.on_transcript: Optional[Callable] = None
         self.on_error: Optional[Callable] = None
+        # Server VAD notification (input_audio_buffer.speech_started)
+        self.on_speech_started: Optional[Callable] = None
+        # All audio for the current item has been sent (response.output_audio.done)
+        self.on_audio_done: Optional[Callable] = None
     
     async def connect(self, instructions: str = "You are a helpful AI assistant.", voice: str = "alloy"):
         """
@@ -88,41 +108,50 @@ class OpenAIRealtimeService:
             }
             
             await self.send_event(session_config)
+            self.instructions, self.voice = instructions, voice
             logger.info(f"Session configured with voice: {voice}, audio format: {self.input_audio_format}")
             
         except Exception as e:
             logger.error(f"Error configuring session: {str(e)}")
             raise
     
+    @property
+    def is_open(self) -> bool:
+        """Connected and the socket hasn't been closed by either side."""
+        return self.is_connected and self.ws is not None and getattr(self.ws, "close_code", None) is None
+    
     async def send_event(self, event: Dict[str, Any]):
         """Send a JSON event to the Realtime API."""
         if not self.is_connected or not self.ws:
             raise RuntimeError("Not connected to OpenAI Realtime API")
         
         try:
-            await self.ws.send(json.dumps(event))
+            await self.ws.send(json_codec.dumps(event))
         except Exception as e:
             logger.error(f"Error sending event: {str(e)}")
             raise
     
-    async def send_audio(self, audio_bytes: bytes):
+    async def send_audio(self, audio_bytes: bytes) -> int:
         """
         Send audio chunk to OpenAI Realtime API.
         
         Args:
             audio_bytes: Raw audio bytes in g711_ulaw format
         """
+        return await self.send_audio_base64(base64.b64encode(audio_bytes).decode('utf-8'))
+    
+    async def send_audio_base64(self, audio_base64: str) -> int:
+        """
+        Send an already base64-encoded g711_ulaw chunk (e.g. a Telnyx media payload) as-is.
+        Returns the size of the websocket message sent.
+        """
+        if not self.is_connected or not self.ws:
+            raise RuntimeError("Not connected to OpenAI Realtime API")
+        
         try:
-            # Encode audio as base64
-            audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
-            
-            event = {
-                "type": "input_audio_buffer.append",
-                "audio": audio_base64
-            }
-            
-            await self.send_event(event)
-            
+            message = _APPEND_PREFIX + audio_base64 + _APPEND_SUFFIX
+            await self.ws.send(message)
+            return len(message)
         except Exception as e:
             logger.error(f"Error sending audio: {str(e)}")
             raise
@@ -135,7 +164,7 @@ class OpenAIRealtimeService:
         try:
             async for message in self.ws:
                 try:
-                    event = json.loads(message)
+                    event = json_codec.loads(message)
                     await self.handle_event(event)
                 except json.JSONDecodeError as e:
                     logger.error(f"Error parsing event: {str(e)}")
@@ -159,15 +188,29 @@ class OpenAIRealtimeService:
             elif event_type == "session.updated":
                 logger.info("Session updated successfully")
             
-            elif event_type == "response.output_audio.delta":
-                # Audio chunk received from AI
-                audio_base64 = event.get("delta", {}).get("audio", "")
-                if audio_base64 and self.on_audio_delta:
-                    audio_bytes = base64.b64decode(audio_base64)
-                    await self.on_audio_delta(audio_bytes)
+            elif event_type == "response.created":
+                self.response_active = True
+            
+            elif event_type in ("response.output_audio.delta", "response.audio.delta"):
+                # Audio chunk received from AI (delta is the base64 string; older payloads nest it)
+                self.current_item_id = event.get("item_id", self.current_item_id)
+                self.current_content_index = event.get("content_index", 0)
+                delta = event.get("delta", "")
+                audio_base64 = delta.get("audio", "") if isinstance(delta, dict) else delta
+                if audio_base64:
+                    if self.on_audio_delta_base64:
+                        await self.on_audio_delta_base64(audio_base64)
+                    elif self.on_audio_delta:
+                        await self.on_audio_delta(base64.b64decode(audio_base64))
+            
+            elif event_type == "input_audio_buffer.speech_started":
+                if self.on_speech_started:
+                    await self.on_speech_started(event)
             
-            elif event_type == "response.output_audio.done":
+            elif event_type in ("response.output_audio.done", "response.audio.done"):
                 logger.info("Audio response completed")
+                if self.on_audio_done:
+                    await self.on_audio_done(event)
             
             elif event_type == "response.audio_transcript.delta":
                 # Live transcript of AI response
@@ -182,6 +225,7 @@ class OpenAIRealtimeService:
                     await self.on_transcript(transcript, "user")
             
             elif event_type == "response.done":
+                self.response_active = False
                 logger.info("Response completed")
             
             elif event_type == "error":
@@ -232,6 +276,24 @@ class OpenAIRealtimeService:
             logger.error(f"Error cancelling response: {str(e)}")
             raise
     
+    async def truncate_item(self, item_id: str, audio_end_ms: int, content_index: int = 0):
+        """
+        Cut an assistant audio item at what the caller actually heard, so the model's
+        conversation history doesn't include speech that was interrupted.
+        """
+        try:
+            event = {
+                "type": "conversation.item.truncate",
+                "item_id": item_id,
+                "content_index": content_index,
+                "audio_end_ms": max(0, int(audio_end_ms))
+            }
+            await self.send_event(event)
+            logger.info(f"Truncated item {item_id} at {audio_end_ms}ms")
+        except Exception as e:
+            logger.error(f"Error truncating item: {str(e)}")
+            raise
+    
     async def disconnect(self):
         """Close the WebSocket connection."""
         if self.ws:
@@ -1,55 +1,241 @@
 import openai
+import httpx
+import asyncio
+import hashlib
+import json
 import os
-from typing import Dict, Any
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, AsyncIterator, Optional, Tuple, Union
+from app.config import settings
+from app.services.metrics_service import LatencyHistogram, elapsed_ms
+
+CHAT_MODEL = "gpt-4o-mini"
+
+SYSTEM_PROMPT = "You are an English teacher helping someone learn English through natural conversation. Start fresh with each interaction. Correct mistakes gently and keep the conversation engaging. Do not reference any previous calls or conversations."
+
+
+def create_async_client(api_key: str) -> openai.AsyncOpenAI:
+    """
+    One pooled AsyncOpenAI client per process: keep-alive connections are reused across turns,
+    every request has a timeout, and the SDK retries connection errors, 408/409/429 and 5xx
+    with exponential backoff.
+    """
+    return openai.AsyncOpenAI(
+        api_key=api_key,
+        base_url=settings.openai_base_url,
+        timeout=httpx.Timeout(settings.openai_timeout_seconds, connect=5.0),
+        max_retries=settings.openai_max_retries,
+        http_client=openai.DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=settings.openai_http_max_connections,
+                max_keepalive_connections=settings.openai_http_max_keepalive,
+                keepalive_expiry=30.0
+            )
+        )
+    )
+
 
 class OpenAIService:
     def __init__(self, api_key: str = None):
         if api_key is None:
             api_key = os.getenv("OPENAIAPI", "")
         
+        # Completion latency (full response) and time to first token (streaming)
+        self.completion_time = LatencyHistogram()
+        self.first_token_time = LatencyHistogram()
+        
+        # Single-flight: identical concurrent requests share one API call
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[str, int] = {}
+        # Short-lived results of deterministic (temperature 0) requests, least recently used evicted first
+        self._cache: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self.cache_ttl_seconds = settings.openai_cache_ttl_seconds
+        self.cache_max_entries = settings.openai_cache_max_entries
+        self.requests = 0
+        self.api_calls = 0
+        self.coalesced = 0
+        self.cache_hits = 0
+        
         if not api_key:
             print("[OpenAI] Warning: OPENAIAPI not set - service disabled")
-            self.client = None
+            self.client: Optional[openai.AsyncOpenAI] = None
             self.enabled = False
         else:
-            self.client = openai.OpenAI(api_key=api_key)
+            # Async so a 1-3 s completion doesn't block the event loop for every other call
+            self.client = create_async_client(api_key)
             self.enabled = True
             print(f"[OpenAI] Initialized with key: {api_key[:20]}...")
     
-    async def generate_response(self, user_input: str, user_context: Dict[str, Any]) -> str:
-        """Generate response using GPT-4 - completely fresh each time, no history"""
+    def _build_messages(self, user_input: Union[str, List[Dict[str, str]]]) -> List[Dict[str, str]]:
+        """System prompt + the user turn (modules pass their own message list instead of a string)"""
+        if isinstance(user_input, list):
+            return [{"role": "system", "content": SYSTEM_PROMPT}] + user_input
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": user_input}
+        ]
+    
+    async def generate_response(self, user_input: Union[str, List[Dict[str, str]]], user_context: Dict[str, Any],
+                                temperature: float = 0.9, max_tokens: int = 300) -> str:
+        """Generate response using GPT-4 - completely fresh each time, no history (temperature 0 results are cached briefly)"""
         if not self.enabled or self.client is None:
             return "OpenAI service is not configured. Please set OPENAIAPI environment variable."
         
         try:
             # Fresh call every time - no conversation history
-            messages = [
-                {
-                    "role": "system", 
-                    "content": "You are an English teacher helping someone learn English through natural conversation. Start fresh with each interaction. Correct mistakes gently and keep the conversation engaging. Do not reference any previous calls or conversations."
-                },
-                {"role": "user", "content": user_input}
-            ]
+            messages = self._build_messages(user_input)
             
             print(f"[OpenAI] Making fresh API call")
             print(f"[OpenAI] User input: {user_input}")
             
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=messages,
-                max_tokens=300,
-                temperature=0.9
-            )
-            
-            result = response.choices[0].message.content.strip()
+            result = await self.complete(messages, max_tokens=max_tokens, temperature=temperature)
             print(f"[OpenAI] API Response received: {result[:100]}...")
             
             return result
-            
+        
         except Exception as e:
             print(f"[OpenAI] ERROR calling API: {e}")
             return f"Error: {str(e)}"
+    
+    async def complete(self, messages: List[Dict[str, str]], max_tokens: int = 300, temperature: float = 0.9) -> str:
+        """
+        One chat completion for a ready-made message list; raises on failure (for callers with a fallback).
+        Joins an identical request already in flight instead of sending another, and serves
+        temperature 0 requests from the cache while fresh.
+        """
+        if not self.enabled or self.client is None:
+            raise RuntimeError("OpenAI service is not configured")
+        
+        self.requests += 1
+        key = self._request_key(messages, max_tokens, temperature)
+        cacheable = temperature == 0 and self.cache_ttl_seconds > 0
+        if cacheable:
+            cached = self._cache_get(key)
+            if cached is not None:
+                self.cache_hits += 1
+                return cached
+        
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._create(messages, max_tokens, temperature))
+            self._in_flight[key] = task
+            self._waiters[key] = 0
+            task.add_done_callback(lambda done: self._finish(key, done, cacheable))
+        else:
+            self.coalesced += 1
+        
+        self._waiters[key] += 1
+        try:
+            # Shielded so one caller giving up (e.g. losing a hedge race) doesn't cancel the others' answer
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if key in self._waiters and self._in_flight.get(key) is task:
+                self._waiters[key] -= 1
+                if self._waiters[key] == 0:
+                    task.cancel()
+            raise
+    
+    @staticmethod
+    def _request_key(messages: List[Dict[str, str]], max_tokens: int, temperature: float) -> str:
+        payload = json.dumps([CHAT_MODEL, messages, max_tokens, temperature], sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(payload.encode()).hexdigest()
+    
+    async def _create(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float) -> str:
+        self.api_calls += 1
+        start = time.perf_counter()
+        try:
+            response = await self.client.chat.completions.create(
+                model=CHAT_MODEL,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.completion_time.record(elapsed_ms(start), ok=False)
+            raise
+        self.completion_time.record(elapsed_ms(start))
+        return response.choices[0].message.content.strip()
+    
+    def _finish(self, key: str, task: asyncio.Task, cacheable: bool):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+            del self._waiters[key]
+        if task.cancelled():
+            return
+        # Retrieved even when nobody is waiting any more, so a failure isn't logged as unhandled
+        if cacheable and task.exception() is None and task.result():
+            self._cache[key] = (time.monotonic() + self.cache_ttl_seconds, task.result())
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_max_entries:
+                self._cache.popitem(last=False)
+    
+    def _cache_get(self, key: str) -> Optional[str]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        expires_at, text = entry
+        if expires_at <= time.monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return text
+    
+    async def stream_response(self, user_input: str, user_context: Dict[str, Any]) -> AsyncIterator[str]:
+        """Same prompt as generate_response, but yields text deltas as GPT produces them"""
+        if not self.enabled or self.client is None:
+            yield "OpenAI service is not configured. Please set OPENAIAPI environment variable."
+            return
+        
+        start = time.perf_counter()
+        first_token = True
+        try:
+            print(f"[OpenAI] Making fresh streaming API call")
+            print(f"[OpenAI] User input: {user_input}")
+            
+            stream = await self.client.chat.completions.create(
+                model=CHAT_MODEL,
+                messages=self._build_messages(user_input),
+                max_tokens=300,
+                temperature=0.9,
+                stream=True
+            )
+            
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if first_token:
+                        self.first_token_time.record(elapsed_ms(start))
+                        first_token = False
+                    yield chunk.choices[0].delta.content
+        
+        except Exception as e:
+            if first_token:
+                self.first_token_time.record(elapsed_ms(start), ok=False)
+            print(f"[OpenAI] ERROR streaming from API: {e}")
+            yield f"Error: {str(e)}"
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "timeout_seconds": settings.openai_timeout_seconds,
+            "max_retries": settings.openai_max_retries,
+            "requests": self.requests,
+            "api_calls": self.api_calls,
+            "coalesced": self.coalesced,
+            "cache_hits": self.cache_hits,
+            "cache_entries": len(self._cache),
+            "in_flight": len(self._in_flight),
+            "completion_time": self.completion_time.snapshot(),
+            "first_token_time": self.first_token_time.snapshot()
+        }
+    
+    async def close(self):
+        """Close the pooled HTTP connections."""
+        if self.client is not None:
+            await self.client.close()
 
 # Module-level instance - safe to import even if OPENAIAPI is not set
 # Service will be disabled but won't crash the app
-openai_service = OpenAIService()
\ No newline at end of file
+openai_service = OpenAIService()
@@ -0,0 +1,196 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, Any, Callable, Awaitable, Deque, List, Tuple, Optional
+from app.services.openai_realtime_service import OpenAIRealtimeService
+from app.services.metrics_service import LatencyHistogram, elapsed_ms
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INSTRUCTIONS = "You are a helpful AI assistant. Have natural, friendly conversations with callers."
+
+
+async def _connect_realtime(instructions: str, voice: str) -> OpenAIRealtimeService:
+    service = OpenAIRealtimeService()
+    await service.connect(instructions=instructions, voice=voice)
+    return service
+
+
+class RealtimeSessionPool:
+    """
+    Warm OpenAI Realtime sessions handed out on call start.
+
+    Connecting means a TLS + websocket handshake plus a session.update round trip, all in
+    front of the caller's first word. The pool keeps `size` sessions connected and
+    configured with the default instructions. `acquire()` hands one over and re-applies the
+    call's own instructions with a session.update on the open socket when they differ. A
+    background task refills the pool and recycles sessions idle longer than
+    `max_idle_seconds`, since the provider caps how long a session may live.
+    """
+
+    def __init__(self, size: int = 2, max_idle_seconds: float = 300.0,
+                 instructions: str = DEFAULT_INSTRUCTIONS, voice: str = "alloy",
+                 connect: Callable[[str, str], Awaitable[OpenAIRealtimeService]] = _connect_realtime):
+        self.size = size
+        self.max_idle_seconds = max_idle_seconds
+        self.instructions = instructions
+        self.voice = voice
+        self._connect = connect
+
+        self._idle: Deque[Tuple[float, OpenAIRealtimeService]] = deque()
+        self._retired: List[OpenAIRealtimeService] = []
+        self._refill_task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._consecutive_failures = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.reconfigured = 0
+        self.recycled = 0
+        self.dead = 0
+        self.connect_failures = 0
+        self.connect_time = LatencyHistogram()
+        self.acquire_time = LatencyHistogram()
+
+    def start(self):
+        """Launch the background refill loop (idempotent; a no-op without an API key or with size 0)."""
+        if self.size <= 0 or not settings.openai_api_key:
+            return
+        if self._refill_task is None or self._refill_task.done():
+            self._wakeup = asyncio.Event()
+            self._refill_task = asyncio.create_task(self._refill_loop())
+            logger.info(f"Realtime session pool started, keeping {self.size} sessions warm")
+
+    async def stop(self):
+        if self._refill_task is not None:
+            self._refill_task.cancel()
+            await asyncio.gather(self._refill_task, return_exceptions=True)
+            self._refill_task = None
+        while self._idle:
+            _, service = self._idle.popleft()
+            await self._discard(service)
+        while self._retired:
+            await self._discard(self._retired.pop())
+
+    async def acquire(self, instructions: str = DEFAULT_INSTRUCTIONS, voice: str = "alloy") -> OpenAIRealtimeService:
+        """A connected session configured with `instructions`/`voice` - warm if one is ready, fresh otherwise."""
+        start = time.perf_counter()
+        service = self._pop_warm()
+        if service is not None and (service.instructions, service.voice) != (instructions, voice):
+            try:
+                await service.configure_session(instructions, voice)
+                self.reconfigured += 1
+            except Exception as e:
+                logger.warning(f"Warm Realtime session failed to reconfigure, connecting a new one: {str(e)}")
+                await self._discard(service)
+                service = None
+
+        if service is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            service = await self._connect_timed(instructions, voice)
+
+        self.acquire_time.record(elapsed_ms(start))
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return service
+
+    def _pop_warm(self) -> Optional[OpenAIRealtimeService]:
+        """Newest usable session, so the call gets as much of the provider's session lifetime as possible."""
+        cutoff = time.monotonic() - self.max_idle_seconds
+        while self._idle:
+            warmed_at, service = self._idle.pop()
+            if service.is_open and warmed_at >= cutoff:
+                return service
+            self._retire(service, stale=service.is_open)
+        return None
+
+    def _retire(self, service: OpenAIRealtimeService, stale: bool):
+        """Take a session out of rotation; the refill loop disconnects it."""
+        if stale:
+            self.recycled += 1
+        else:
+            self.dead += 1
+        self._retired.append(service)
+
+    async def _connect_timed(self, instructions: str, voice: str) -> OpenAIRealtimeService:
+        start = time.perf_counter()
+        try:
+            service = await self._connect(instructions, voice)
+        except Exception:
+            self.connect_failures += 1
+            self.connect_time.record(elapsed_ms(start), ok=False)
+            raise
+        self.connect_time.record(elapsed_ms(start))
+        return service
+
+    async def _discard(self, service: OpenAIRealtimeService):
+        try:
+            await service.disconnect()
+        except Exception as e:
+            logger.debug(f"Error closing pooled Realtime session: {str(e)}")
+
+    async def _recycle(self):
+        """Disconnect idle sessions past max_idle_seconds or closed by the server."""
+        cutoff = time.monotonic() - self.max_idle_seconds
+        kept: Deque[Tuple[float, OpenAIRealtimeService]] = deque()
+        for warmed_at, service in self._idle:
+            if service.is_open and warmed_at >= cutoff:
+                kept.append((warmed_at, service))
+            else:
+                self._retire(service, stale=service.is_open)
+        self._idle = kept
+        while self._retired:
+            await self._discard(self._retired.pop())
+
+    async def _refill_loop(self):
+        while True:
+            await self._recycle()
+            if len(self._idle) >= self.size:
+                # Full - sleep until a session is taken or the oldest one needs recycling
+                oldest = self._idle[0][0] if self._idle else time.monotonic()
+                timeout = max(1.0, oldest + self.max_idle_seconds - time.monotonic())
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=min(timeout, 60.0))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                service = await self._connect_timed(self.instructions, self.voice)
+                self._idle.append((time.monotonic(), service))
+                self._consecutive_failures = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Back off while the API is unreachable; calls connect on demand meanwhile
+                self._consecutive_failures += 1
+                logger.error(f"Realtime pool failed to warm a session: {str(e)}")
+                await asyncio.sleep(min(2 ** min(self._consecutive_failures - 1, 8), 300.0))
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "max_idle_seconds": self.max_idle_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else None,
+            "reconfigured": self.reconfigured,
+            "recycled": self.recycled,
+            "dead": self.dead,
+            "connect_failures": self.connect_failures,
+            "connect_time": self.connect_time.snapshot(),
+            "acquire_time": self.acquire_time.snapshot()
+        }
+
+
+realtime_pool = RealtimeSessionPool(
+    size=settings.realtime_pool_size,
+    max_idle_seconds=settings.realtime_pool_max_idle_seconds
+)
@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import re
+import time
+from typing import Dict, Any, List, Optional, AsyncIterator
+from app.services.telnyx_service import telnyx_service
+from app.services.metrics_service import LatencyHistogram, elapsed_ms
+
+logger = logging.getLogger(__name__)
+
+
+class SentenceSegmenter:
+    """
+    Splits a stream of LLM text deltas into speakable sentences.
+    Avoids breaking on common abbreviations and decimals, and merges fragments
+    shorter than `min_chars` into the following sentence.
+    """
+
+    ABBREVIATIONS = {"mr", "mrs", "ms", "dr", "prof", "st", "sr", "jr", "vs", "etc", "e.g", "i.e"}
+    # Abbreviations only when a number follows ("No. 5"); otherwise ordinary words ("The answer is no.")
+    NUMBER_ABBREVIATIONS = {"no"}
+    # Terminal punctuation (plus closing quotes/brackets) followed by whitespace, or a line break
+    _BOUNDARY = re.compile(r'([.!?]+["\')\]]*)\s+|\n+')
+
+    def __init__(self, min_chars: int = 12):
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def push(self, text: str) -> List[str]:
+        """Add a text delta; return any sentences completed by it."""
+        self._buffer += text
+        sentences = []
+        start = 0
+
+        for match in self._BOUNDARY.finditer(self._buffer):
+            end = match.end(1) if match.group(1) else match.start()
+            candidate = self._buffer[start:end].strip()
+            if not candidate:
+                start = match.end()
+                continue
+            if match.group(1) and self._ends_with_abbreviation(candidate, self._buffer[match.end():match.end() + 1]):
+                continue
+            if len(candidate) < self.min_chars:
+                continue
+            sentences.append(candidate)
+            start = match.end()
+
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> Optional[str]:
+        """Return whatever is left once the stream has finished."""
+        remainder, self._buffer = self._buffer.strip(), ""
+        return remainder or None
+
+    def _ends_with_abbreviation(self, candidate: str, next_char: str) -> bool:
+        last_word = candidate.rsplit(None, 1)[-1].lower()
+        if last_word.rstrip('.!?"\')]') in self.ABBREVIATIONS:
+            return True
+        if last_word.endswith(".") and last_word[:-1] in self.NUMBER_ABBREVIATIONS:
+            # Hold the sentence until the next delta shows whether a number follows
+            return not next_char or next_char.isdigit()
+        return False
+
+
+class ResponseStreamer:
+    """
+    Speaks an LLM token stream on a Telnyx call one sentence at a time.
+
+    Each completed sentence is queued as a speak command on the call's ordered
+    command queue, so the first sentence plays while later ones are still generating.
+    Records time-to-first-audio and total turn time per call.
+    """
+
+    # client_state tag on streamed speak commands, echoed back in call.speak.ended
+    CLIENT_STATE = "streamed_sentence"
+
+    def __init__(self, turns_kept_per_call: int = 50):
+        self.turns_kept_per_call = turns_kept_per_call
+        # Streamed speak commands whose call.speak.ended has not arrived yet, per call
+        self._outstanding: Dict[str, int] = {}
+        # Calls whose response is still being generated
+        self._generating: set = set()
+
+        self.call_turns: Dict[str, List[Dict[str, Any]]] = {}
+        self.time_to_first_audio = LatencyHistogram()
+        self.turn_time = LatencyHistogram()
+
+    async def speak_stream(self, call_control_id: str, tokens: AsyncIterator[str],
+                           voice: str = "male", language: str = "en-US") -> str:
+        """
+        Consume `tokens`, queueing a speak per sentence. Returns the full response text.
+        Turn time is measured from the call to this method (transcript in hand).
+        """
+        start = time.perf_counter()
+        segmenter = SentenceSegmenter()
+        dispatched: List[asyncio.Future] = []
+        first_audio_ms: Optional[float] = None
+        parts: List[str] = []
+
+        def on_dispatched(future: asyncio.Future):
+            nonlocal first_audio_ms
+            if future.cancelled() or future.exception() is not None:
+                # No call.speak.ended will arrive for a failed command
+                self._speak_finished(call_control_id)
+                return
+            if first_audio_ms is None:
+                first_audio_ms = elapsed_ms(start)
+                self.time_to_first_audio.record(first_audio_ms)
+
+        def dispatch(sentence: str):
+            self._outstanding[call_control_id] = self._outstanding.get(call_control_id, 0) + 1
+            future = telnyx_service.enqueue_speak(call_control_id, sentence, voice=voice, language=language,
+                                                  client_state=self.CLIENT_STATE)
+            future.add_done_callback(on_dispatched)
+            dispatched.append(future)
+
+        self._generating.add(call_control_id)
+        try:
+            async for token in tokens:
+                parts.append(token)
+                for sentence in segmenter.push(token):
+                    dispatch(sentence)
+            tail = segmenter.flush()
+            if tail:
+                dispatch(tail)
+
+            # Surface the first failed speak to the caller's error handling
+            results = await asyncio.gather(*dispatched, return_exceptions=True)
+            errors = [r for r in results if isinstance(r, BaseException)]
+            if errors:
+                raise errors[0]
+        finally:
+            self._generating.discard(call_control_id)
+            total_ms = elapsed_ms(start)
+            self.turn_time.record(total_ms, ok=bool(dispatched))
+            turns = self.call_turns.setdefault(call_control_id, [])
+            turns.append({
+                "time_to_first_audio_ms": round(first_audio_ms, 2) if first_audio_ms is not None else None,
+                "turn_time_ms": round(total_ms, 2),
+                "sentences": len(dispatched)
+            })
+            del turns[:-self.turns_kept_per_call]
+
+        response = "".join(parts)
+        logger.info(f"[Stream] Spoke {len(dispatched)} sentences in {total_ms:.0f}ms "
+                    f"(first audio at {first_audio_ms}ms) for call {call_control_id}")
+        return response
+
+    def on_speak_ended(self, call_control_id: str, client_state: Optional[str] = None) -> bool:
+        """
+        Account for a call.speak.ended event (client_state as received, base64).
+        Returns True while streamed sentences are still queued or being generated,
+        i.e. the caller's turn should not start yet.
+        """
+        if telnyx_service.decode_client_state(client_state) == self.CLIENT_STATE:
+            self._speak_finished(call_control_id)
+        return call_control_id in self._generating or self.is_speaking(call_control_id)
+
+    def is_speaking(self, call_control_id: str) -> bool:
+        """True while streamed sentences for the call are queued or playing."""
+        return self._outstanding.get(call_control_id, 0) > 0
+
+    def _speak_finished(self, call_control_id: str):
+        remaining = self._outstanding.get(call_control_id, 0) - 1
+        if remaining > 0:
+            self._outstanding[call_control_id] = remaining
+        else:
+            self._outstanding.pop(call_control_id, None)
+
+    def release_call(self, call_control_id: str):
+        """Forget per-call state once the call has ended."""
+        self._outstanding.pop(call_control_id, None)
+        self._generating.discard(call_control_id)
+        self.call_turns.pop(call_control_id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "time_to_first_audio": self.time_to_first_audio.snapshot(),
+            "turn_time": self.turn_time.snapshot(),
+            "calls": self.call_turns
+        }
+
+
+response_streamer = ResponseStreamer()
@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, Any, Optional, Callable, Awaitable, List
+from app.config import settings
+from app.services.audio_utils import EnergyVAD, FRAME_MS, ulaw_to_wav
+from app.services.metrics_service import LatencyHistogram, elapsed_ms
+
+logger = logging.getLogger(__name__)
+
+
+class StreamingTranscriber:
+    """
+    Base class for incremental transcribers fed 20 ms µ-law 8 kHz frames.
+
+    finalize() must take ownership of the buffered utterance before its first await,
+    so the next utterance can be fed while the previous one is still being transcribed.
+    """
+
+    name = "base"
+
+    async def feed(self, frame: bytes):
+        raise NotImplementedError
+
+    async def finalize(self) -> Optional[str]:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class WhisperUtteranceTranscriber(StreamingTranscriber):
+    """
+    Buffers one utterance in memory and sends it to Whisper at end of speech.
+    Skips the record_start -> recording.saved -> download round trips of the recording flow.
+    """
+
+    name = "whisper"
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    async def feed(self, frame: bytes):
+        self._buffer += frame
+
+    async def finalize(self) -> Optional[str]:
+        audio, self._buffer = bytes(self._buffer), bytearray()
+        if not audio:
+            return None
+        from app.services.stt_service import stt_service
+        return await stt_service.transcribe_audio(ulaw_to_wav(audio), audio_format="wav")
+
+
+class LocalStandInTranscriber(StreamingTranscriber):
+    """
+    Offline stand-in used to benchmark turn latency without any network calls.
+    Returns scripted transcripts (or a description of the utterance) after a fixed delay.
+    """
+
+    name = "local"
+
+    def __init__(self, transcripts: Optional[List[str]] = None, finalize_latency_ms: float = 50.0):
+        self.transcripts = deque(transcripts or [])
+        self.finalize_latency_ms = finalize_latency_ms
+        self._frames = 0
+
+    async def feed(self, frame: bytes):
+        self._frames += 1
+
+    async def finalize(self) -> Optional[str]:
+        frames, self._frames = self._frames, 0
+        if self.finalize_latency_ms:
+            await asyncio.sleep(self.finalize_latency_ms / 1000.0)
+        if self.transcripts:
+            return self.transcripts.popleft()
+        return f"utterance of {frames * FRAME_MS} milliseconds"
+
+
+def create_transcriber(provider: Optional[str] = None) -> StreamingTranscriber:
+    """Build the transcriber selected by settings.stt_streaming_provider."""
+    provider = provider or settings.stt_streaming_provider
+    if provider == "local":
+        return LocalStandInTranscriber()
+    return WhisperUtteranceTranscriber()
+
+
+class StreamingSTTSession:
+    """
+    Feeds a call's inbound media frames to a transcriber and hands each
+    completed utterance to `on_utterance` as soon as end of speech is detected.
+    """
+
+    def __init__(self, call_control_id: str,
+                 transcriber: StreamingTranscriber,
+                 on_utterance: Callable[[str, str], Awaitable[Any]],
+                 vad: Optional[EnergyVAD] = None,
+                 preroll_ms: int = 200):
+        self.call_control_id = call_control_id
+        self.transcriber = transcriber
+        self.on_utterance = on_utterance
+        self.vad = vad or EnergyVAD(
+            threshold=settings.stt_vad_threshold,
+            silence_ms=settings.stt_silence_ms
+        )
+        # Frames kept from before speech onset so the first syllable isn't clipped
+        self._preroll = deque(maxlen=max(1, preroll_ms // FRAME_MS))
+        self._last_voice_at: Optional[float] = None
+        self._pending: set = set()
+
+    async def handle_frame(self, frame: bytes):
+        """Process one inbound audio frame."""
+        event = self.vad.process(frame)
+
+        if event == "speech_start":
+            for buffered in self._preroll:
+                await self.transcriber.feed(buffered)
+            self._preroll.clear()
+
+        if self.vad.in_speech or event == "speech_end":
+            await self.transcriber.feed(frame)
+            if self.vad.last_frame_voiced:
+                self._last_voice_at = time.perf_counter()
+        else:
+            self._preroll.append(frame)
+
+        if event == "speech_end":
+            task = asyncio.create_task(self._finish_utterance(self._last_voice_at or time.perf_counter()))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+    async def _finish_utterance(self, speech_ended_at: float):
+        """Finalize the transcript and pass it to the module."""
+        start = time.perf_counter()
+        transcript = None
+        try:
+            transcript = await self.transcriber.finalize()
+        finally:
+            streaming_stt_stats.record(elapsed_ms(start), elapsed_ms(speech_ended_at), bool(transcript))
+
+        if not transcript or not transcript.strip():
+            logger.info(f"[STT Stream] Empty utterance for call {self.call_control_id}")
+            return
+
+        logger.info(f"[STT Stream] Utterance for call {self.call_control_id}: {transcript}")
+        try:
+            await self.on_utterance(self.call_control_id, transcript.strip())
+        except Exception as e:
+            logger.error(f"[STT Stream] Error handling utterance for call {self.call_control_id}: {str(e)}")
+
+    async def close(self):
+        """Wait for in-flight transcriptions and release the transcriber."""
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        await self.transcriber.close()
+
+
+class StreamingSTTStats:
+    """Aggregate counters for streamed speech recognition."""
+
+    def __init__(self):
+        self.finalize_time = LatencyHistogram()
+        # Last voiced frame -> transcript ready (includes the VAD silence hangover)
+        self.end_of_speech_to_transcript = LatencyHistogram()
+        self.utterances = 0
+        self.empty_utterances = 0
+
+    def record(self, finalize_ms: float, eos_ms: float, has_text: bool):
+        self.utterances += 1
+        if not has_text:
+            self.empty_utterances += 1
+        self.finalize_time.record(finalize_ms, ok=has_text)
+        self.end_of_speech_to_transcript.record(eos_ms, ok=has_text)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "utterances": self.utterances,
+            "empty_utterances": self.empty_utterances,
+            "finalize_time": self.finalize_time.snapshot(),
+            "end_of_speech_to_transcript": self.end_of_speech_to_transcript.snapshot()
+        }
+
+
+streaming_stt_stats = StreamingSTTStats()
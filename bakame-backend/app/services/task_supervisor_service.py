@@ -0,0 +1,113 @@
+import asyncio
+import logging
+from typing import Dict, Any, Optional, Set, Coroutine
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CallTaskSupervisor:
+    """
+    Owns background tasks spawned on behalf of a call (recording pipelines, streamed turns).
+
+    Tasks are tracked per call so a hangup can cancel them, at most `max_concurrent` run at
+    once per worker (the rest wait their turn), and `drain()` lets in-flight work finish on
+    shutdown before cancelling what's left.
+    """
+
+    def __init__(self, max_concurrent: int = 20):
+        self.max_concurrent = max_concurrent
+        self._tasks: Dict[str, Set[asyncio.Task]] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._draining = False
+        self._waiting = 0
+
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        # Still running when the shutdown drain timed out
+        self.orphaned = 0
+
+    def spawn(self, call_control_id: str, coro: Coroutine, name: str = "task") -> asyncio.Task:
+        """Run `coro` in the background on behalf of the call."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+
+        task = asyncio.create_task(self._run(coro), name=f"{name}:{call_control_id}")
+        self._tasks.setdefault(call_control_id, set()).add(task)
+        task.add_done_callback(lambda finished: self._on_done(call_control_id, finished))
+        self.started += 1
+        return task
+
+    async def _run(self, coro: Coroutine):
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        except BaseException:
+            coro.close()
+            raise
+        finally:
+            self._waiting -= 1
+        try:
+            return await coro
+        finally:
+            self._semaphore.release()
+
+    def _on_done(self, call_control_id: str, task: asyncio.Task):
+        tasks = self._tasks.get(call_control_id)
+        if tasks is not None:
+            tasks.discard(task)
+            if not tasks:
+                del self._tasks[call_control_id]
+
+        if task.cancelled():
+            if self._draining:
+                self.orphaned += 1
+            else:
+                self.cancelled += 1
+        elif task.exception() is not None:
+            self.failed += 1
+            logger.error(f"[Tasks] {task.get_name()} failed: {str(task.exception())}")
+        else:
+            self.completed += 1
+
+    def cancel_call(self, call_control_id: str) -> int:
+        """Cancel every background task of a call (e.g. on hangup); returns how many were cancelled."""
+        tasks = self._tasks.get(call_control_id, set())
+        for task in list(tasks):
+            task.cancel()
+        if tasks:
+            logger.info(f"[Tasks] Cancelled {len(tasks)} background tasks for call {call_control_id}")
+        return len(tasks)
+
+    async def drain(self, timeout: float = 10.0):
+        """Wait up to `timeout` for running tasks, then cancel the rest."""
+        pending = [task for tasks in self._tasks.values() for task in tasks]
+        if not pending:
+            return
+        logger.info(f"[Tasks] Draining {len(pending)} background tasks")
+        _, still_running = await asyncio.wait(pending, timeout=timeout)
+        if still_running:
+            self._draining = True
+            logger.warning(f"[Tasks] Cancelling {len(still_running)} tasks still running after {timeout}s")
+            for task in still_running:
+                task.cancel()
+            await asyncio.gather(*still_running, return_exceptions=True)
+            self._draining = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "running": sum(len(tasks) for tasks in self._tasks.values()) - self._waiting,
+            "waiting": self._waiting,
+            "calls": len(self._tasks),
+            "started": self.started,
+            "completed": self.completed,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "orphaned": self.orphaned
+        }
+
+
+call_tasks = CallTaskSupervisor(max_concurrent=settings.max_concurrent_pipelines)
@@ -1,15 +1,91 @@
 import telnyx
-import requests
+import httpx
 import json
 import logging
 import asyncio
+import base64
+import time
 import urllib.parse
 from typing import Optional, Dict, Any
-from functools import partial
 from app.config import settings
+from app.services.metrics_service import LatencyHistogram, elapsed_ms
 
 logger = logging.getLogger(__name__)
 
+
+class CallCommandQueue:
+    """
+    FIFO of Call Control commands for a single call.
+    Commands for one call_control_id run strictly one after another (e.g. record_stop
+    before speak), while queues for different calls drain concurrently.
+    """
+    
+    def __init__(self, call_control_id: str, service: "TelnyxService", idle_timeout: float):
+        self.call_control_id = call_control_id
+        self.service = service
+        self.idle_timeout = idle_timeout
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.worker: Optional[asyncio.Task] = None
+        # Future of the command the worker is executing right now
+        self.current: Optional[asyncio.Future] = None
+    
+    def submit(self, action: str, payload: Dict[str, Any]) -> asyncio.Future:
+        """Enqueue a command and return a future resolving to the Telnyx response."""
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((action, payload, future))
+        if self.worker is None or self.worker.done():
+            self.worker = asyncio.create_task(self._drain())
+        return future
+    
+    async def _drain(self):
+        """Execute queued commands in order; exit after sitting idle."""
+        while True:
+            try:
+                action, payload, future = await asyncio.wait_for(self.queue.get(), timeout=self.idle_timeout)
+            except asyncio.TimeoutError:
+                if self.queue.empty():
+                    self.service._release_queue(self.call_control_id, self)
+                    return
+                continue
+            
+            if future.done():
+                continue
+            self.current = future
+            try:
+                result = await self.service._post_action(self.call_control_id, action, payload)
+                if not future.done():
+                    future.set_result(result)
+            except asyncio.CancelledError:
+                self._fail(future, RuntimeError("call released"))
+                raise
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self.current = None
+    
+    @staticmethod
+    def _fail(future: asyncio.Future, error: Exception):
+        if not future.done():
+            future.set_exception(error)
+            # Expected on hangup - don't log "exception never retrieved" for fire-and-forget commands
+            future.exception()
+    
+    def close(self):
+        """
+        Stop the worker and fail the in-flight and queued commands with RuntimeError -
+        not cancel(), whose CancelledError would slip past callers' `except Exception`.
+        """
+        error = RuntimeError("call released")
+        if self.current is not None:
+            self._fail(self.current, error)
+        if self.worker and not self.worker.done():
+            self.worker.cancel()
+        while not self.queue.empty():
+            _, _, future = self.queue.get_nowait()
+            self._fail(future, error)
+
+
 class TelnyxService:
     """
     Service to handle Telnyx Call Control API interactions.
@@ -28,6 +104,84 @@ class TelnyxService:
             "Content-Type": "application/json",
             "Accept": "application/json"
         }
+        
+        # Shared keep-alive HTTP/2 client, created lazily inside the running event loop
+        self._client: Optional[httpx.AsyncClient] = None
+        
+        # Per-call ordered command queues and per-action latency counters
+        self._call_queues: Dict[str, CallCommandQueue] = {}
+        self.action_stats: Dict[str, LatencyHistogram] = {}
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the shared Call Control client, creating it on first use."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.api_url,
+                headers=self.headers,
+                http2=True,
+                limits=httpx.Limits(
+                    max_connections=settings.telnyx_http_max_connections,
+                    max_keepalive_connections=settings.telnyx_http_max_keepalive,
+                    keepalive_expiry=30.0
+                ),
+                timeout=httpx.Timeout(settings.telnyx_http_timeout, connect=5.0)
+            )
+        return self._client
+    
+    async def _post_action(self, call_control_id: str, action: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """POST a Call Control action over the shared client and record its latency."""
+        encoded_id = urllib.parse.quote(call_control_id, safe='')
+        start = time.perf_counter()
+        ok = False
+        try:
+            response = await self._get_client().post(f"/calls/{encoded_id}/actions/{action}", json=payload)
+            response.raise_for_status()
+            ok = True
+            return response.json()
+        finally:
+            self.action_stats.setdefault(action, LatencyHistogram()).record(elapsed_ms(start), ok=ok)
+    
+    async def _send_command(self, call_control_id: str, action: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a command behind earlier commands for the same call and wait for its result."""
+        return await self.enqueue_command(call_control_id, action, payload)
+    
+    def enqueue_command(self, call_control_id: str, action: str, payload: Dict[str, Any]) -> asyncio.Future:
+        """
+        Queue a command without waiting for it.
+        The returned future resolves with the Telnyx response once earlier commands for the call finish.
+        """
+        queue = self._call_queues.get(call_control_id)
+        if queue is None:
+            queue = CallCommandQueue(call_control_id, self, settings.telnyx_queue_idle_seconds)
+            self._call_queues[call_control_id] = queue
+        return queue.submit(action, payload)
+    
+    def _release_queue(self, call_control_id: str, queue: CallCommandQueue):
+        """Forget an idle queue (only if it is still the registered one)."""
+        if self._call_queues.get(call_control_id) is queue:
+            del self._call_queues[call_control_id]
+    
+    def release_call(self, call_control_id: str):
+        """Drop the command queue for a finished call, failing anything still pending."""
+        queue = self._call_queues.pop(call_control_id, None)
+        if queue:
+            queue.close()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-action latency counters and queue gauges."""
+        return {
+            "active_call_queues": len(self._call_queues),
+            "pending_commands": sum(q.queue.qsize() for q in self._call_queues.values()),
+            "actions": {action: stats.snapshot() for action, stats in self.action_stats.items()}
+        }
+    
+    async def close(self):
+        """Cancel pending command queues and close the shared HTTP client."""
+        for call_control_id in list(self._call_queues):
+            self.release_call(call_control_id)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
     
     async def handle_incoming_call(self, webhook_data: Dict[str, Any]) -> Dict[str, str]:
         """
@@ -54,7 +208,39 @@ class TelnyxService:
             logger.error(f"Error handling incoming call: {str(e)}")
             return {"status": "error", "message": str(e)}
     
-    async def speak(self, call_control_id: str, text: str, voice: str = "male", language: str = "en-US") -> Dict[str, Any]:
+    def _speak_payload(self, text: str, voice: str, language: str, client_state: Optional[str] = None) -> Dict[str, Any]:
+        payload = {
+            "payload": text,
+            "voice": voice,
+            "language": language,
+            "payload_type": "text"
+        }
+        if client_state:
+            # Echoed back on call.speak.started / call.speak.ended
+            payload["client_state"] = base64.b64encode(client_state.encode()).decode()
+        return payload
+    
+    @staticmethod
+    def decode_client_state(client_state: Optional[str]) -> Optional[str]:
+        """Decode the base64 client_state echoed back on webhook events"""
+        if not client_state:
+            return None
+        try:
+            return base64.b64decode(client_state).decode()
+        except Exception:
+            return None
+    
+    def enqueue_speak(self, call_control_id: str, text: str, voice: str = "male", language: str = "en-US",
+                      client_state: Optional[str] = None) -> asyncio.Future:
+        """
+        Queue a speak command behind earlier commands for the call without waiting for it.
+        Used for sentence-by-sentence streaming where later sentences are still being generated.
+        """
+        logger.info(f"Queueing speak command: {text[:80]}")
+        return self.enqueue_command(call_control_id, "speak", self._speak_payload(text, voice, language, client_state))
+    
+    async def speak(self, call_control_id: str, text: str, voice: str = "male", language: str = "en-US",
+                    client_state: Optional[str] = None) -> Dict[str, Any]:
         """
         Send speak command to Telnyx Call Control API
         Equivalent to Twilio's <Say> verb
@@ -64,35 +250,21 @@ class TelnyxService:
             text: Text to speak
             voice: Voice to use (male/female)
             language: Language code (e.g., 'en-US')
+            client_state: Optional tag echoed back on call.speak.ended
         """
         try:
-            encoded_id = urllib.parse.quote(call_control_id, safe='')
-            url = f"{self.api_url}/calls/{encoded_id}/actions/speak"
-            
-            payload = {
-                "payload": text,
-                "voice": voice,
-                "language": language,
-                "payload_type": "text"
-            }
+            payload = self._speak_payload(text, voice, language, client_state)
             
             logger.info(f"Sending speak command: {payload}")
             
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                partial(requests.post, url, json=payload, headers=self.headers)
-            )
-            response.raise_for_status()
-            
-            result = response.json()
+            result = await self._send_command(call_control_id, "speak", payload)
             logger.info(f"Speak command response: {result}")
             
             return result
             
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Error sending speak command: {str(e)}")
-            if hasattr(e, 'response') and e.response:
+            if isinstance(e, httpx.HTTPStatusError):
                 logger.error(f"Response: {e.response.text}")
             raise
     
@@ -120,9 +292,6 @@ class TelnyxService:
             await self.speak(call_control_id, prompt_text)
             
             # Then send gather command
-            encoded_id = urllib.parse.quote(call_control_id, safe='')
-            url = f"{self.api_url}/calls/{encoded_id}/actions/gather"
-            
             payload = {
                 "timeout_millis": timeout_millis,
                 "inter_digit_timeout_millis": inter_digit_timeout_millis,
@@ -133,17 +302,14 @@ class TelnyxService:
             
             logger.info(f"Sending gather command: {payload}")
             
-            response = requests.post(url, json=payload, headers=self.headers)
-            response.raise_for_status()
-            
-            result = response.json()
+            result = await self._send_command(call_control_id, "gather", payload)
             logger.info(f"Gather command response: {result}")
             
             return result
             
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Error sending gather command: {str(e)}")
-            if hasattr(e, 'response') and e.response:
+            if isinstance(e, httpx.HTTPStatusError):
                 logger.error(f"Response: {e.response.text}")
             raise
     
@@ -156,9 +322,6 @@ class TelnyxService:
         This uses the gather_using_speak endpoint which combines both actions
         """
         try:
-            encoded_id = urllib.parse.quote(call_control_id, safe='')
-            url = f"{self.api_url}/calls/{encoded_id}/actions/gather_using_speak"
-            
             payload = {
                 "payload": prompt_text,
                 "voice": voice,
@@ -173,17 +336,14 @@ class TelnyxService:
             
             logger.info(f"Sending gather_using_speak command: {payload}")
             
-            response = requests.post(url, json=payload, headers=self.headers)
-            response.raise_for_status()
-            
-            result = response.json()
+            result = await self._send_command(call_control_id, "gather_using_speak", payload)
             logger.info(f"Gather using speak command response: {result}")
             
             return result
             
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Error sending gather_using_speak command: {str(e)}")
-            if hasattr(e, 'response') and e.response:
+            if isinstance(e, httpx.HTTPStatusError):
                 logger.error(f"Response: {e.response.text}")
             raise
     
@@ -192,22 +352,16 @@ class TelnyxService:
         Answer an incoming call
         """
         try:
-            encoded_id = urllib.parse.quote(call_control_id, safe='')
-            url = f"{self.api_url}/calls/{encoded_id}/actions/answer"
-            
             logger.info(f"Answering call: {call_control_id}")
             
-            response = requests.post(url, json={}, headers=self.headers)
-            response.raise_for_status()
-            
-            result = response.json()
+            result = await self._send_command(call_control_id, "answer", {})
             logger.info(f"Answer call response: {result}")
             
             return result
             
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Error answering call: {str(e)}")
-            if hasattr(e, 'response') and e.response:
+            if isinstance(e, httpx.HTTPStatusError):
                 logger.error(f"Response: {e.response.text}")
             raise
     
@@ -217,22 +371,16 @@ class TelnyxService:
         Equivalent to Twilio's <Hangup> verb
         """
         try:
-            encoded_id = urllib.parse.quote(call_control_id, safe='')
-            url = f"{self.api_url}/calls/{encoded_id}/actions/hangup"
-            
             logger.info(f"Hanging up call: {call_control_id}")
             
-            response = requests.post(url, json={}, headers=self.headers)
-            response.raise_for_status()
-            
-            result = response.json()
+            result = await self._send_command(call_control_id, "hangup", {})
             logger.info(f"Hangup response: {result}")
             
             return result
             
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Error hanging up call: {str(e)}")
-            if hasattr(e, 'response') and e.response:
+            if isinstance(e, httpx.HTTPStatusError):
                 logger.error(f"Response: {e.response.text}")
             raise
     
@@ -241,26 +389,20 @@ class TelnyxService:
         Transfer a call to another number
         """
         try:
-            encoded_id = urllib.parse.quote(call_control_id, safe='')
-            url = f"{self.api_url}/calls/{encoded_id}/actions/transfer"
-            
             payload = {
                 "to": to
             }
             
             logger.info(f"Transferring call to: {to}")
             
-            response = requests.post(url, json=payload, headers=self.headers)
-            response.raise_for_status()
-            
-            result = response.json()
+            result = await self._send_command(call_control_id, "transfer", payload)
             logger.info(f"Transfer response: {result}")
             
             return result
             
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Error transferring call: {str(e)}")
-            if hasattr(e, 'response') and e.response:
+            if isinstance(e, httpx.HTTPStatusError):
                 logger.error(f"Response: {e.response.text}")
             raise
     
@@ -277,9 +419,6 @@ class TelnyxService:
             codec: Audio codec - 'PCMU' (G.711 µ-law), 'PCMA', 'OPUS', 'L16', etc. (case-sensitive!)
         """
         try:
-            encoded_id = urllib.parse.quote(call_control_id, safe='')
-            url = f"{self.api_url}/calls/{encoded_id}/actions/streaming_start"
-            
             payload = {
                 "stream_url": stream_url,
                 "stream_track": track,
@@ -290,17 +429,14 @@ class TelnyxService:
             logger.info(f"Starting media stream to {stream_url} with codec {codec}")
             logger.info(f"Streaming payload: {payload}")
             
-            response = requests.post(url, json=payload, headers=self.headers)
-            response.raise_for_status()
-            
-            result = response.json()
+            result = await self._send_command(call_control_id, "streaming_start", payload)
             logger.info(f"Streaming started: {result}")
             
             return result
             
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Error starting streaming: {str(e)}")
-            if hasattr(e, 'response') and e.response:
+            if isinstance(e, httpx.HTTPStatusError):
                 logger.error(f"Response: {e.response.text}")
             raise
     
@@ -309,22 +445,16 @@ class TelnyxService:
         Stop media streaming for a call.
         """
         try:
-            encoded_id = urllib.parse.quote(call_control_id, safe='')
-            url = f"{self.api_url}/calls/{encoded_id}/actions/streaming_stop"
-            
             logger.info(f"Stopping media stream for call: {call_control_id}")
             
-            response = requests.post(url, json={}, headers=self.headers)
-            response.raise_for_status()
-            
-            result = response.json()
+            result = await self._send_command(call_control_id, "streaming_stop", {})
             logger.info(f"Streaming stopped: {result}")
             
             return result
             
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Error stopping streaming: {str(e)}")
-            if hasattr(e, 'response') and e.response:
+            if isinstance(e, httpx.HTTPStatusError):
                 logger.error(f"Response: {e.response.text}")
             raise
     
@@ -339,9 +469,6 @@ class TelnyxService:
             max_length: Maximum recording length in seconds
         """
         try:
-            encoded_id = urllib.parse.quote(call_control_id, safe='')
-            url = f"{self.api_url}/calls/{encoded_id}/actions/record_start"
-            
             payload = {
                 "format": format,
                 "channels": channels,
@@ -350,21 +477,14 @@ class TelnyxService:
             
             logger.info(f"Starting recording for call: {call_control_id}")
             
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                partial(requests.post, url, json=payload, headers=self.headers)
-            )
-            response.raise_for_status()
-            
-            result = response.json()
+            result = await self._send_command(call_control_id, "record_start", payload)
             logger.info(f"Recording started: {result}")
             
             return result
             
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Error starting recording: {str(e)}")
-            if hasattr(e, 'response') and e.response:
+            if isinstance(e, httpx.HTTPStatusError):
                 logger.error(f"Response: {e.response.text}")
             raise
     
@@ -373,26 +493,16 @@ class TelnyxService:
         Stop recording the call audio.
         """
         try:
-            encoded_id = urllib.parse.quote(call_control_id, safe='')
-            url = f"{self.api_url}/calls/{encoded_id}/actions/record_stop"
-            
             logger.info(f"Stopping recording for call: {call_control_id}")
             
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                partial(requests.post, url, json={}, headers=self.headers)
-            )
-            response.raise_for_status()
-            
-            result = response.json()
+            result = await self._send_command(call_control_id, "record_stop", {})
             logger.info(f"Recording stopped: {result}")
             
             return result
             
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Error stopping recording: {str(e)}")
-            if hasattr(e, 'response') and e.response:
+            if isinstance(e, httpx.HTTPStatusError):
                 logger.error(f"Response: {e.response.text}")
             raise
     
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, Any, Callable, Awaitable, Deque, Tuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# Strings the OpenAI service returns instead of raising - never worth pooling
+_FAILED_PREFIXES = ("Error:", "OpenAI service is not configured")
+
+
+class UtterancePool:
+    """
+    Pools of pre-generated utterances (greetings, error lines) drawn from instantly.
+
+    Each kind has an async generator function and a static fallback. A background
+    task keeps every pool topped up to `size`, generating at most `refill_per_minute`
+    utterances, and discards entries older than `ttl_seconds` so callers keep hearing
+    fresh wording.
+    """
+
+    def __init__(self, generators: Dict[str, Callable[[], Awaitable[str]]],
+                 fallbacks: Dict[str, str],
+                 size: int = 5,
+                 refill_per_minute: float = 30.0,
+                 ttl_seconds: float = 3600.0):
+        self.generators = generators
+        self.fallbacks = fallbacks
+        self.size = size
+        self.refill_interval = 60.0 / refill_per_minute if refill_per_minute > 0 else 0.0
+        self.ttl_seconds = ttl_seconds
+
+        self._pools: Dict[str, Deque[Tuple[float, str]]] = {kind: deque() for kind in generators}
+        self._refill_task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._cursor = -1
+        self._consecutive_failures = 0
+
+        self.hits = {kind: 0 for kind in generators}
+        self.misses = {kind: 0 for kind in generators}
+        self.generated = {kind: 0 for kind in generators}
+        self.expired = {kind: 0 for kind in generators}
+        self.generation_failures = 0
+
+    def start(self):
+        """Launch the background refill loop (idempotent)."""
+        if self._refill_task is None or self._refill_task.done():
+            self._wakeup = asyncio.Event()
+            self._refill_task = asyncio.create_task(self._refill_loop())
+
+    async def stop(self):
+        if self._refill_task is not None:
+            self._refill_task.cancel()
+            await asyncio.gather(self._refill_task, return_exceptions=True)
+            self._refill_task = None
+
+    def take(self, kind: str) -> str:
+        """Pop a fresh pre-generated utterance, or the static fallback if the pool is empty."""
+        pool = self._pools[kind]
+        self._expire(kind)
+
+        if pool:
+            self.hits[kind] += 1
+            _, text = pool.popleft()
+        else:
+            self.misses[kind] += 1
+            text = self.fallbacks[kind]
+
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return text
+
+    def _expire(self, kind: str):
+        pool = self._pools[kind]
+        cutoff = time.monotonic() - self.ttl_seconds
+        while pool and pool[0][0] < cutoff:
+            pool.popleft()
+            self.expired[kind] += 1
+
+    def _next_kind_to_fill(self) -> Optional[str]:
+        """Next pool below target size, round-robin so one failing kind can't starve the rest."""
+        kinds = list(self._pools)
+        for offset in range(1, len(kinds) + 1):
+            kind = kinds[(self._cursor + offset) % len(kinds)]
+            self._expire(kind)
+            if len(self._pools[kind]) < self.size:
+                self._cursor = kinds.index(kind)
+                return kind
+        return None
+
+    async def _refill_loop(self):
+        while True:
+            kind = self._next_kind_to_fill()
+            if kind is None:
+                # Everything full - sleep until something is taken or the oldest entry goes stale
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=min(self.ttl_seconds, 60.0))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            ok = False
+            try:
+                text = (await self.generators[kind]()).strip()
+                if text and not text.startswith(_FAILED_PREFIXES):
+                    self._pools[kind].append((time.monotonic(), text))
+                    self.generated[kind] += 1
+                    ok = True
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Utterance pool generation failed for {kind}: {str(e)}")
+
+            if ok:
+                self._consecutive_failures = 0
+                await asyncio.sleep(self.refill_interval)
+            else:
+                # Back off while the LLM is down; handlers keep using the static fallbacks
+                self.generation_failures += 1
+                self._consecutive_failures += 1
+                backoff = max(self.refill_interval, 1.0) * 2 ** min(self._consecutive_failures - 1, 6)
+                await asyncio.sleep(min(backoff, 300.0))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "size": self.size,
+            "ttl_seconds": self.ttl_seconds,
+            "generation_failures": self.generation_failures,
+            "pools": {
+                kind: {
+                    "depth": len(pool),
+                    "hits": self.hits[kind],
+                    "misses": self.misses[kind],
+                    "generated": self.generated[kind],
+                    "expired": self.expired[kind]
+                }
+                for kind, pool in self._pools.items()
+            }
+        }
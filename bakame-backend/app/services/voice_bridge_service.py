@@ -1,14 +1,45 @@
 import asyncio
-import json
 import base64
+import binascii
 import logging
+import os
+import time
+from collections import deque
 from typing import Dict, Any, Optional
 from fastapi import WebSocket
 from app.services.openai_realtime_service import OpenAIRealtimeService
+from app.services.realtime_pool_service import realtime_pool, DEFAULT_INSTRUCTIONS
 from app.services.telnyx_service import telnyx_service
+from app.services.call_state_service import call_state
+from app.services.bridge_audio_service import AudioPipe, OutboundPacer, BridgeCallStats, playout_clock
+from app.services.audio_utils import EnergyVAD, FRAME_BYTES, FRAME_MS
+from app.services.metrics_service import LatencyHistogram, elapsed_ms
+from app.services import json_codec
+from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Telnyx media stream encodings that are byte-identical to OpenAI's g711_ulaw
+_ULAW_ENCODINGS = {"PCMU", "audio/x-mulaw", "g711_ulaw"}
+_MEDIA_SUFFIX = '"}}'
+# How long a closing session waits for queued caller audio to reach OpenAI
+_UPSTREAM_DRAIN_SECONDS = 1.0
+_ULAW_BYTES_PER_MS = FRAME_BYTES // FRAME_MS
+
+# Realtime instructions per learning module; applied to a warm pooled session with one session.update
+MODULE_INSTRUCTIONS = {
+    "general": DEFAULT_INSTRUCTIONS,
+    "english": "You are an English teacher helping the caller learn English through natural conversation. "
+               "Correct mistakes gently and keep the conversation engaging.",
+    "math": "You are a patient math tutor on a phone call. Ask one problem at a time, wait for the answer, "
+            "and give short hints rather than solutions.",
+    "comprehension": "You are a reading tutor on a phone call. Tell a short story, then ask simple questions "
+                     "about it one at a time.",
+    "debate": "You are a friendly debate partner on a phone call. Take the opposite side, keep turns short, "
+              "and encourage the caller to give reasons."
+}
+
+
 class VoiceBridgeService:
     """
     Bridge service that connects Telnyx media streams to OpenAI Realtime API.
@@ -16,42 +47,41 @@ class VoiceBridgeService:
     """
     
     def __init__(self):
+        # Live connections for calls bridged by this worker. Websockets can't leave the
+        # process, so only the serializable fields (stream_id, owning worker) are also
+        # written to call_state for other workers to see.
         self.active_sessions: Dict[str, Dict[str, Any]] = {}
+        # Rate summaries of recently ended calls, for /telnyx/metrics
+        self.recent_calls = deque(maxlen=50)
+        
+        # Barge-in: detection lag is how much caller audio went by before speech was
+        # detected, reaction is detection -> Telnyx clear sent, and their sum is the
+        # interruption-to-silence latency we control
+        self.barge_in_detection = LatencyHistogram()
+        self.barge_in_reaction = LatencyHistogram()
+        self.barge_in_to_silence = LatencyHistogram()
+        self.barge_ins: Dict[str, int] = {}
+        self.barge_ins_ignored = 0
     
-    async def start_session(self, call_control_id: str, telnyx_ws: WebSocket):
+    async def start_session(self, call_control_id: str, telnyx_ws: WebSocket, module: str = "general"):
         """
         Start a voice AI session for a phone call.
         
         Args:
             call_control_id: Telnyx call control ID
             telnyx_ws: WebSocket connection from Telnyx media stream
+            module: Learning module whose instructions the AI follows
         """
         try:
             logger.info(f"Starting voice AI session for call: {call_control_id}")
             
-            # Create OpenAI Realtime service instance
-            openai_service = OpenAIRealtimeService()
-            
-            # Connect to OpenAI Realtime API
-            await openai_service.connect(
-                instructions="You are a helpful AI assistant. Have natural, friendly conversations with callers.",
+            # Take a warm, already-configured Realtime session (connects a new one if the pool is empty)
+            openai_service = await realtime_pool.acquire(
+                instructions=MODULE_INSTRUCTIONS.get(module, DEFAULT_INSTRUCTIONS),
                 voice="alloy"
             )
             
-            # Store session info
-            self.active_sessions[call_control_id] = {
-                "openai_service": openai_service,
-                "telnyx_ws": telnyx_ws,
-                "stream_id": None
-            }
-            
-            # Set up audio handlers
-            openai_service.on_audio_delta = lambda audio: self.send_audio_to_telnyx(
-                call_control_id, audio
-            )
-            openai_service.on_transcript = lambda text, role: self.log_transcript(
-                call_control_id, text, role
-            )
+            await self.attach_session(call_control_id, openai_service, telnyx_ws)
             
             # Start listening tasks
             await asyncio.gather(
@@ -64,12 +94,100 @@ class VoiceBridgeService:
             await self.end_session(call_control_id)
             raise
     
+    async def attach_session(self, call_control_id: str, openai_service: OpenAIRealtimeService, telnyx_ws: WebSocket):
+        """Register a connected call/OpenAI pair and wire the audio handlers."""
+        # Store session info
+        session = self.active_sessions[call_control_id] = {
+            "openai_service": openai_service,
+            "telnyx_ws": telnyx_ws,
+            "stream_id": None,
+            # Pre-serialized start of the outbound media envelope, set once stream_id is known
+            "media_prefix": None,
+            # Forward inbound base64 payloads untouched once the stream's codec is known to match
+            "passthrough": False,
+            # Each direction gets its own queue and sender task, so a congested leg only backs up itself
+            "upstream": AudioPipe(
+                f"upstream:{call_control_id}",
+                lambda audio_base64: self._send_upstream(session, audio_base64),
+                max_messages=settings.voice_bridge_upstream_queue_messages,
+                overflow=settings.voice_bridge_upstream_overflow
+            ),
+            "downstream": AudioPipe(
+                f"downstream:{call_control_id}",
+                lambda message: self._send_downstream(session, message),
+                max_messages=settings.voice_bridge_downstream_queue_messages,
+                overflow=settings.voice_bridge_downstream_overflow
+            ),
+            # Optional local energy VAD so barge-in doesn't wait for the server to detect speech
+            "vad": EnergyVAD(threshold=settings.stt_vad_threshold, silence_ms=settings.stt_silence_ms)
+            if settings.voice_bridge_local_vad else None,
+            # Assistant audio item currently playing to the caller, when it started and how much was sent
+            "playback_item_id": None,
+            "playback_started_at": 0.0,
+            "playback_sent_ms": 0.0,
+            # Item cut off by a barge-in; its remaining deltas are dropped
+            "interrupted_item_id": None,
+            # Stream offset in the pacer where the playing item began (paced output only)
+            "playback_offset": 0,
+            "stats": BridgeCallStats()
+        }
+        # Re-chunks AI audio into 20 ms frames sent at wall-clock rate, feeding the downstream queue
+        session["pacer"] = OutboundPacer(
+            lambda frame: self._queue_frame(session, frame),
+            jitter_ms=settings.voice_bridge_jitter_ms,
+            max_buffer_ms=settings.voice_bridge_max_playout_buffer_ms
+        ) if settings.voice_bridge_paced_output else None
+        session["upstream"].start()
+        session["downstream"].start()
+        await call_state.update(
+            call_control_id,
+            bridge_worker=os.getpid(),
+            bridge_started_at=time.time(),
+            stream_id=None
+        )
+        
+        # Set up audio handlers
+        openai_service.on_audio_delta = lambda audio: self.send_audio_to_telnyx(
+            call_control_id, audio
+        )
+        if settings.voice_bridge_passthrough:
+            # Both legs are µ-law 8 kHz, so OpenAI's base64 output goes to Telnyx as-is
+            openai_service.on_audio_delta_base64 = lambda audio_base64: self.send_audio_base64_to_telnyx(
+                call_control_id, audio_base64
+            )
+        openai_service.on_transcript = lambda text, role: self.log_transcript(
+            call_control_id, text, role
+        )
+        openai_service.on_speech_started = lambda event: self._on_speech_started(call_control_id, event)
+        openai_service.on_audio_done = lambda event: self._on_audio_done(call_control_id)
+    
+    async def _on_speech_started(self, call_control_id: str, event: Dict[str, Any]):
+        session = self.active_sessions.get(call_control_id)
+        if not session:
+            return
+        # audio_start_ms is on the input buffer timeline, which starts with the stream
+        detection_lag_ms = None
+        audio_start_ms = event.get("audio_start_ms")
+        if audio_start_ms is not None:
+            detection_lag_ms = max(0.0, session["stats"].inbound_frames * FRAME_MS - audio_start_ms)
+        await self.interrupt(call_control_id, "server_vad", detection_lag_ms)
+    
+    def _codecs_match(self, media_format: Dict[str, Any], openai_service: OpenAIRealtimeService) -> bool:
+        encoding = media_format.get("encoding", "PCMU")
+        sample_rate = int(media_format.get("sample_rate", 8000) or 8000)
+        return (
+            settings.voice_bridge_passthrough
+            and encoding in _ULAW_ENCODINGS
+            and sample_rate == 8000
+            and openai_service.input_audio_format == "g711_ulaw"
+        )
+    
     async def listen_to_telnyx(self, call_control_id: str, websocket: WebSocket):
         """Listen for audio and events from Telnyx media stream."""
         try:
             while True:
                 data = await websocket.receive_text()
-                event = json.loads(data)
+                event = json_codec.loads(data)
                 
                 await self.handle_telnyx_event(call_control_id, event)
                 
@@ -91,22 +209,25 @@ class VoiceBridgeService:
                 # Stream started
                 stream_id = event.get("stream_id")
                 session["stream_id"] = stream_id
+                session["media_prefix"] = '{"event":"media","stream_id":' + json_codec.dumps(stream_id) + ',"media":{"payload":"'
+                await call_state.update(call_control_id, stream_id=stream_id)
                 logger.info(f"Telnyx stream started: {stream_id}")
                 
                 # Log media format
                 media_format = event.get("start", {}).get("media_format", {})
-                logger.info(f"Media format: {media_format}")
+                session["passthrough"] = self._codecs_match(media_format, session["openai_service"])
+                logger.info(f"Media format: {media_format} (passthrough: {session['passthrough']})")
             
             elif event_type == "media":
                 # Audio chunk received from Telnyx
                 payload = event.get("media", {}).get("payload", "")
                 if payload:
-                    # Decode base64 audio
-                    audio_bytes = base64.b64decode(payload)
-                    
-                    # Forward to OpenAI
-                    openai_service = session["openai_service"]
-                    await openai_service.send_audio(audio_bytes)
+                    session["stats"].inbound_frames += 1
+                    vad_event = session["vad"].process(base64.b64decode(payload)) if session["vad"] is not None else None
+                    if vad_event == "speech_start":
+                        # The VAD needs start_frames voiced frames before it fires
+                        await self.interrupt(call_control_id, "local_vad", session["vad"].start_frames * FRAME_MS)
+                    await session["upstream"].put(payload)
             
             elif event_type == "stop":
                 # Stream ended
@@ -130,39 +251,124 @@ class VoiceBridgeService:
         except Exception as e:
             logger.error(f"Error handling Telnyx event: {str(e)}")
     
+    async def _send_upstream(self, session: Dict[str, Any], audio_base64: str):
+        """Append one base64 Telnyx frame to the OpenAI input buffer (upstream sender task)."""
+        openai_service = session["openai_service"]
+        if session["passthrough"]:
+            # Same codec on both legs - forward the base64 string untouched
+            sent = await openai_service.send_audio_base64(audio_base64)
+        else:
+            sent = await openai_service.send_audio(base64.b64decode(audio_base64))
+        session["stats"].record_upstream(sent)
+    
+    async def _send_downstream(self, session: Dict[str, Any], message: str):
+        """Write one media message to the Telnyx socket (downstream sender task)."""
+        await session["telnyx_ws"].send_text(message)
+        session["stats"].record_downstream(len(message))
+    
     async def send_audio_to_telnyx(self, call_control_id: str, audio_bytes: bytes):
         """Send audio response from OpenAI back to Telnyx."""
+        await self.send_audio_base64_to_telnyx(call_control_id, base64.b64encode(audio_bytes).decode('utf-8'))
+    
+    async def send_audio_base64_to_telnyx(self, call_control_id: str, audio_base64: str):
+        """Queue base64 µ-law audio for Telnyx in a pre-serialized media envelope."""
         try:
             session = self.active_sessions.get(call_control_id)
             if not session:
                 logger.warning(f"No session found for call: {call_control_id}")
                 return
             
-            stream_id = session.get("stream_id")
-            if not stream_id:
+            media_prefix = session.get("media_prefix")
+            if not media_prefix:
                 logger.warning(f"No stream_id available for call: {call_control_id}")
                 return
             
-            telnyx_ws = session["telnyx_ws"]
-            
-            # Encode audio as base64
-            audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
-            
-            # Send to Telnyx in their expected format with stream_id
-            message = {
-                "event": "media",
-                "stream_id": stream_id,
-                "media": {
-                    "payload": audio_base64
-                }
-            }
+            item_id = session["openai_service"].current_item_id
+            if item_id is not None and item_id == session["interrupted_item_id"]:
+                # Still arriving for a response the caller talked over
+                session["stats"].stale_deltas_dropped += 1
+                return
+            pacer = session["pacer"]
+            if item_id != session["playback_item_id"]:
+                session["playback_item_id"] = item_id
+                session["playback_started_at"] = time.monotonic()
+                session["playback_sent_ms"] = 0.0
+                session["playback_offset"] = pacer.written if pacer is not None else 0
+            session["playback_sent_ms"] += len(audio_base64) * 3 / 4 / _ULAW_BYTES_PER_MS
             
-            await telnyx_ws.send_text(json.dumps(message))
-            logger.debug(f"Sent {len(audio_bytes)} bytes of audio to Telnyx for call: {call_control_id}")
+            if pacer is not None:
+                pacer.write(binascii.a2b_base64(audio_base64))
+            else:
+                # Send to Telnyx in their expected format with stream_id
+                await session["downstream"].put(media_prefix + audio_base64 + _MEDIA_SUFFIX)
             
         except Exception as e:
             logger.error(f"Error sending audio to Telnyx: {str(e)}")
     
+    def _queue_frame(self, session: Dict[str, Any], frame: bytes):
+        """Wrap one paced 20 ms frame in a media message for the downstream queue (called on the playout tick)."""
+        audio_base64 = binascii.b2a_base64(frame, newline=False).decode()
+        session["downstream"].put_nowait(session["media_prefix"] + audio_base64 + _MEDIA_SUFFIX)
+    
+    async def _on_audio_done(self, call_control_id: str):
+        session = self.active_sessions.get(call_control_id)
+        if session and session["pacer"] is not None:
+            session["pacer"].end_of_audio()
+    
+    def _played_ms(self, session: Dict[str, Any]) -> float:
+        """Assistant audio the caller has heard so far: playback runs in real time, capped by what was sent."""
+        if session["playback_item_id"] is None:
+            return 0.0
+        pacer = session["pacer"]
+        if pacer is not None:
+            # Frames handed to Telnyx for this item, less the cushion it hasn't played yet
+            sent_ms = (pacer.position - session["playback_offset"]) / _ULAW_BYTES_PER_MS
+            return min(max(0.0, sent_ms - pacer.jitter_ms), session["playback_sent_ms"])
+        elapsed = (time.monotonic() - session["playback_started_at"]) * 1000
+        return min(elapsed, session["playback_sent_ms"])
+    
+    async def interrupt(self, call_control_id: str, source: str, detection_lag_ms: Optional[float] = None) -> bool:
+        """
+        Barge-in: the caller started talking, so silence the AI.
+        
+        Clears Telnyx playback first (that's what the caller hears), then cancels the
+        response if it's still generating and truncates the assistant item at what was
+        actually played. Returns False when the AI wasn't speaking.
+        """
+        session = self.active_sessions.get(call_control_id)
+        if not session or not settings.voice_bridge_barge_in:
+            return False
+        
+        openai_service = session["openai_service"]
+        item_id = session["playback_item_id"]
+        played_ms = self._played_ms(session)
+        if item_id is None or not (openai_service.response_active or played_ms < session["playback_sent_ms"]):
+            self.barge_ins_ignored += 1
+            return False
+        
+        start = time.perf_counter()
+        session["interrupted_item_id"] = item_id
+        session["playback_item_id"] = None
+        await self.clear_audio_queue(call_control_id)
+        reaction_ms = elapsed_ms(start)
+        
+        try:
+            if openai_service.response_active:
+                await openai_service.cancel_response()
+            await openai_service.truncate_item(item_id, played_ms, openai_service.current_content_index)
+        except Exception as e:
+            logger.error(f"Error interrupting response for call {call_control_id}: {str(e)}")
+        
+        self.barge_ins[source] = self.barge_ins.get(source, 0) + 1
+        session["stats"].barge_ins += 1
+        self.barge_in_reaction.record(reaction_ms)
+        if detection_lag_ms is not None:
+            self.barge_in_detection.record(detection_lag_ms)
+            self.barge_in_to_silence.record(detection_lag_ms + reaction_ms)
+        logger.info(f"Barge-in on call {call_control_id} ({source}): cut item {item_id} at {played_ms:.0f}ms, "
+                    f"silenced in {reaction_ms:.1f}ms")
+        return True
+    
     async def log_transcript(self, call_control_id: str, text: str, role: str):
         """Log transcripts from the conversation."""
         logger.info(f"[{call_control_id}] {role.upper()}: {text}")
@@ -176,12 +382,21 @@ class VoiceBridgeService:
             
             logger.info(f"Ending voice session for call: {call_control_id}")
             
+            # Let queued caller audio go out before the socket goes away.
+            # Playback audio for a call that's ending is dropped.
+            await session["upstream"].close(drain_timeout=_UPSTREAM_DRAIN_SECONDS)
+            if session["pacer"] is not None:
+                session["pacer"].close()
+            await session["downstream"].close()
+            
             # Disconnect OpenAI
             openai_service = session["openai_service"]
             await openai_service.disconnect()
             
             # Remove session
             del self.active_sessions[call_control_id]
+            self.recent_calls.append({"call_control_id": call_control_id, **self._session_snapshot(session)})
+            await call_state.update(call_control_id, bridge_worker=None, stream_id=None)
             
         except Exception as e:
             logger.error(f"Error ending session: {str(e)}")
@@ -199,17 +414,49 @@ class VoiceBridgeService:
                 return
             
             telnyx_ws = session["telnyx_ws"]
+            # Drop playback still waiting in our queues, then tell Telnyx to flush its own
+            if session["pacer"] is not None:
+                session["pacer"].clear()
+            session["downstream"].clear()
             
             clear_message = {
                 "event": "clear",
                 "stream_id": stream_id
             }
             
-            await telnyx_ws.send_text(json.dumps(clear_message))
+            await telnyx_ws.send_text(json_codec.dumps(clear_message))
             logger.info(f"Cleared audio queue for call: {call_control_id}")
             
         except Exception as e:
             logger.error(f"Error clearing audio queue: {str(e)}")
 
+    def _session_snapshot(self, session: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            **session["stats"].snapshot(),
+            "upstream_queue": session["upstream"].snapshot(),
+            "downstream_queue": session["downstream"].snapshot(),
+            "playout": session["pacer"].snapshot() if session["pacer"] is not None else None
+        }
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-call message/byte rates and queue gauges for live and recently ended calls."""
+        return {
+            "local_vad": settings.voice_bridge_local_vad,
+            "playout_clock": playout_clock.get_stats(),
+            "barge_in": {
+                "enabled": settings.voice_bridge_barge_in,
+                "interruptions": self.barge_ins,
+                "ignored": self.barge_ins_ignored,
+                "detection_lag": self.barge_in_detection.snapshot(),
+                "reaction": self.barge_in_reaction.snapshot(),
+                "interruption_to_silence": self.barge_in_to_silence.snapshot()
+            },
+            "active_calls": {
+                call_control_id: self._session_snapshot(session)
+                for call_control_id, session in self.active_sessions.items()
+            },
+            "recent_calls": list(self.recent_calls)
+        }
+
 # Create singleton instance
 voice_bridge_service = VoiceBridgeService()
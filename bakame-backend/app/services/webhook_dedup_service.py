@@ -0,0 +1,136 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class EventDeduplicator:
+    """
+    Remembers webhook event IDs for `window_seconds` so provider retries are dropped
+    before any work is scheduled. Errors in the backing store fail open - a duplicate
+    slipping through is better than losing a first delivery.
+    """
+
+    backend = "base"
+
+    def __init__(self, window_seconds: float = 600):
+        self.window_seconds = window_seconds
+        self.checked = 0
+        self.duplicates_suppressed = 0
+        self.errors = 0
+
+    async def first_seen(self, event_id: str) -> bool:
+        """Record the event; True the first time an ID is seen within the window."""
+        self.checked += 1
+        try:
+            first = await self._claim(event_id)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"[Dedup] Lookup failed for event {event_id}: {str(e)}")
+            return True
+        if not first:
+            self.duplicates_suppressed += 1
+        return first
+
+    async def forget(self, event_id: str):
+        """Un-record an event that was not accepted, so the provider's retry is processed."""
+        try:
+            await self._release(event_id)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"[Dedup] Failed to forget event {event_id}: {str(e)}")
+
+    async def close(self):
+        pass
+
+    async def _claim(self, event_id: str) -> bool:
+        raise NotImplementedError
+
+    async def _release(self, event_id: str):
+        raise NotImplementedError
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "window_seconds": self.window_seconds,
+            "checked": self.checked,
+            "duplicates_suppressed": self.duplicates_suppressed,
+            "errors": self.errors
+        }
+
+
+class InMemoryEventDeduplicator(EventDeduplicator):
+    """Seen-set bounded by both the time window and `max_events` (oldest dropped first)."""
+
+    backend = "memory"
+
+    def __init__(self, window_seconds: float = 600, max_events: int = 10000):
+        super().__init__(window_seconds)
+        self.max_events = max_events
+        # event_id -> first seen (monotonic), oldest first
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+
+    async def _claim(self, event_id: str) -> bool:
+        now = time.monotonic()
+        cutoff = now - self.window_seconds
+        while self._seen:
+            oldest_id, seen_at = next(iter(self._seen.items()))
+            if seen_at >= cutoff:
+                break
+            del self._seen[oldest_id]
+
+        if event_id in self._seen:
+            return False
+        self._seen[event_id] = now
+        while len(self._seen) > self.max_events:
+            self._seen.popitem(last=False)
+        return True
+
+    async def _release(self, event_id: str):
+        self._seen.pop(event_id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = super().get_stats()
+        stats["tracked_events"] = len(self._seen)
+        return stats
+
+
+class RedisEventDeduplicator(EventDeduplicator):
+    """Seen-set shared by all workers: one `SET NX EX` key per event ID."""
+
+    backend = "redis"
+
+    def __init__(self, redis_url: str, window_seconds: float = 600):
+        super().__init__(window_seconds)
+        import redis.asyncio as redis_asyncio
+        self.client = redis_asyncio.from_url(redis_url, decode_responses=True)
+
+    @staticmethod
+    def _key(event_id: str) -> str:
+        return f"webhook_event:{event_id}"
+
+    async def _claim(self, event_id: str) -> bool:
+        return bool(await self.client.set(self._key(event_id), 1, nx=True, ex=int(self.window_seconds)))
+
+    async def _release(self, event_id: str):
+        await self.client.delete(self._key(event_id))
+
+    async def close(self):
+        await self.client.aclose()
+
+
+def create_event_deduplicator(backend: Optional[str] = None) -> EventDeduplicator:
+    """Build the deduplicator selected by settings.webhook_dedup_backend."""
+    backend = backend or settings.webhook_dedup_backend
+    if backend == "redis":
+        return RedisEventDeduplicator(settings.redis_url, window_seconds=settings.webhook_dedup_window_seconds)
+    return InMemoryEventDeduplicator(
+        window_seconds=settings.webhook_dedup_window_seconds,
+        max_events=settings.webhook_dedup_max_events
+    )
+
+
+webhook_deduplicator = create_event_deduplicator()
@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, Any, Optional, Callable, Awaitable, Deque, Tuple, List
+from app.services.metrics_service import LatencyHistogram, elapsed_ms
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionQueueFull(Exception):
+    """Raised when the ingestion queue is at its configured depth."""
+
+
+class WebhookIngestionQueue:
+    """
+    In-process stage between the webhook endpoint and the event handlers.
+
+    The endpoint validates and enqueues an event, then acks immediately. A fixed pool
+    of workers drains the queue. Events sharing a call key are handled one at a time
+    in arrival order, while different calls are handled in parallel.
+    """
+
+    def __init__(self, handler: Callable[[Dict[str, Any]], Awaitable[Any]],
+                 max_depth: int = 1000, num_workers: int = 8):
+        self.handler = handler
+        self.max_depth = max_depth
+        self.num_workers = num_workers
+
+        # Per-call pending events, plus a queue of call keys ready to be drained
+        self._pending: Dict[str, Deque[Tuple[float, Dict[str, Any]]]] = {}
+        self._ready: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._depth = 0
+
+        self.queue_time = LatencyHistogram()
+        self.handler_time = LatencyHistogram()
+        self.enqueued = 0
+        self.rejected = 0
+        self.failed = 0
+
+    def start(self):
+        """Spawn the worker pool (idempotent)."""
+        if self._workers:
+            return
+        self._ready = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._worker(index)) for index in range(self.num_workers)
+        ]
+        logger.info(f"Webhook ingestion started with {self.num_workers} workers, max depth {self.max_depth}")
+
+    def submit(self, call_key: str, event: Dict[str, Any]):
+        """
+        Enqueue an event for background handling.
+
+        Raises:
+            IngestionQueueFull: when max_depth events are already waiting
+        """
+        if self._depth >= self.max_depth:
+            self.rejected += 1
+            raise IngestionQueueFull(f"Webhook queue full ({self.max_depth} events pending)")
+
+        self.start()
+        self._depth += 1
+        self.enqueued += 1
+
+        pending = self._pending.get(call_key)
+        if pending is None:
+            # Call is idle - make it ready for a worker
+            self._pending[call_key] = deque([(time.perf_counter(), event)])
+            self._ready.put_nowait(call_key)
+        else:
+            # A worker already owns this call and will pick the event up in order
+            pending.append((time.perf_counter(), event))
+
+    async def _worker(self, index: int):
+        """Drain one call at a time until its pending events are exhausted."""
+        while True:
+            call_key = await self._ready.get()
+            pending = self._pending[call_key]
+            try:
+                while pending:
+                    enqueued_at, event = pending.popleft()
+                    self._depth -= 1
+                    self.queue_time.record(elapsed_ms(enqueued_at))
+
+                    start = time.perf_counter()
+                    ok = True
+                    try:
+                        await self.handler(event)
+                    except asyncio.CancelledError:
+                        if asyncio.current_task().cancelling():
+                            # The worker itself is being stopped
+                            raise
+                        # Raised inside the handler (e.g. an awaited future was cancelled) - the
+                        # worker must survive it, or the pool silently shrinks
+                        ok = False
+                        self.failed += 1
+                        logger.error(f"[Ingestion worker {index}] Handler cancelled for {call_key}")
+                    except Exception as e:
+                        ok = False
+                        self.failed += 1
+                        logger.error(f"[Ingestion worker {index}] Handler error for {call_key}: {str(e)}")
+                    finally:
+                        self.handler_time.record(elapsed_ms(start), ok=ok)
+            finally:
+                del self._pending[call_key]
+                self._ready.task_done()
+
+    async def stop(self, timeout: float = 10.0):
+        """Let queued events finish (up to timeout), then cancel the workers."""
+        if not self._workers:
+            return
+        try:
+            await asyncio.wait_for(self._ready.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Webhook ingestion stopped with {self._depth} events still pending")
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth, counters and queue/handler time histograms."""
+        return {
+            "depth": self._depth,
+            "max_depth": self.max_depth,
+            "active_calls": len(self._pending),
+            "workers": len(self._workers),
+            "enqueued": self.enqueued,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "queue_time": self.queue_time.snapshot(),
+            "handler_time": self.handler_time.snapshot()
+        }
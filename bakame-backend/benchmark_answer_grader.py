@@ -0,0 +1,165 @@
+"""
+Calibration benchmark for the local comprehension answer grader.
+
+Grades a labelled set of spoken-style answers (as Deepgram transcribes them:
+lowercase, misspelt names, paraphrases, partial and wrong answers) to the
+ComprehensionModule sample-story questions with AnswerGrader, and reports:
+
+  coverage     share of answers graded locally (the rest go to the LLM)
+  accuracy     share of local verdicts that match the label
+  false accept wrong answers graded correct locally
+  false reject right answers graded wrong locally
+
+then sweeps accept/reject thresholds so answer_grader_accept / _reject can be
+set from the trade-off (every escalated answer costs one LLM round trip).
+
+    python benchmark_answer_grader.py
+    python benchmark_answer_grader.py --accept 0.55 --reject 0.15 --show-errors
+"""
+import argparse
+import logging
+import sys
+import time
+
+sys.path.append('.')
+
+from app.services.answer_grader_service import AnswerGrader
+
+# (story index, question index, spoken answer, correct?)
+LABELLED_ANSWERS = [
+    # The Community Garden in Kigali
+    (0, 0, "many families could not afford fresh vegetables", True),
+    (0, 0, "families struggled to afford vegetables", True),
+    (0, 0, "people couldn't afford fresh vegetables", True),
+    (0, 0, "vegetables were too expensive for the families", True),
+    (0, 0, "there was no food", False),
+    (0, 0, "she wanted to start a garden", False),
+    (0, 0, "the roads were bad", False),
+    (0, 0, "i don't know", False),
+    (0, 1, "starting a community garden", True),
+    (0, 1, "a community garden where everyone grows vegetables together", True),
+    (0, 1, "she said they should start a garden together", True),
+    (0, 1, "to grow vegetables together in a garden", True),
+    (0, 1, "buying vegetables at the market", False),
+    (0, 1, "she moved to butare", False),
+    (0, 1, "selling tomatoes", False),
+    (0, 2, "children learned about farming and neighbors got closer", True),
+    (0, 2, "it became a place where children learned farming and neighbors strengthened their bonds", True),
+    (0, 2, "it brought the neighbors together through ubuntu", True),
+    (0, 2, "kids learned farming", True),
+    (0, 2, "it made money for uwimana", False),
+    (0, 2, "they sold the harvest", False),
+    (0, 2, "it gave them food", False),
+    # The Mobile Money Innovation
+    (1, 0, "people in rural areas had difficulty accessing banking services", True),
+    (1, 0, "rural people couldn't get to banks", True),
+    (1, 0, "people in the villages had no banking services", True),
+    (1, 0, "it was hard for rural areas to access banks", True),
+    (1, 0, "there were no phones", False),
+    (1, 0, "farmers had no crops", False),
+    (1, 0, "no idea", False),
+    (1, 1, "farmers could sell crops to buyers in kigali without travelling", True),
+    (1, 1, "they sold their crops to kigali buyers without traveling long distances", True),
+    (1, 1, "they didn't have to travel far to sell their crops", True),
+    (1, 1, "it let farmers sell to buyers in kigali", True),
+    (1, 1, "it gave them new phones", False),
+    (1, 1, "they got loans from the bank", False),
+    (1, 1, "they moved to kigali", False),
+    (1, 2, "technology can bridge gaps and connect communities", True),
+    (1, 2, "that technology connects communities", True),
+    (1, 2, "technology helps connect people and bridge gaps", True),
+    (1, 2, "technology is bad", False),
+    (1, 2, "that banks are important", False),
+    (1, 2, "jean baptiste got rich", False),
+    # The Helpful Neighbor
+    (2, 0, "mr johnson", True),
+    (2, 0, "mister johnson", True),
+    (2, 0, "the elderly man", True),
+    (2, 0, "an old man", True),
+    (2, 0, "she helped johnson her neighbor", True),
+    (2, 0, "her mother", False),
+    (2, 0, "maria", False),
+    (2, 0, "a little boy", False),
+    (2, 1, "carrying his groceries and organizing his kitchen", True),
+    (2, 1, "she carried his groceries up the stairs", True),
+    (2, 1, "groceries and the kitchen", True),
+    (2, 1, "organizing the kitchen", True),
+    (2, 1, "she cooked dinner for him", False),
+    (2, 1, "cleaning his car", False),
+    (2, 1, "she did his homework", False),
+    (2, 2, "he baked her favorite cookies", True),
+    (2, 2, "he baked cookies for her", True),
+    (2, 2, "by baking cookies", True),
+    (2, 2, "he made her favourite cookies", True),
+    (2, 2, "he gave her money", False),
+    (2, 2, "he said thank you", False),
+    (2, 2, "he baked a cake", False),
+    (2, 2, "he did not bake her cookies", False),
+]
+
+
+def load_references():
+    from app.modules.comprehension_module import comprehension_module
+    return [story["answers"] for story in comprehension_module.sample_stories]
+
+
+def evaluate(grader: AnswerGrader, references, show_errors: bool = False):
+    """Returns (coverage, accuracy, false accepts, false rejects, local count)."""
+    local = correct = false_accept = false_reject = 0
+    for story, question, answer, label in LABELLED_ANSWERS:
+        result = grader.grade(answer, references[story][question])
+        if result.verdict is None:
+            continue
+        local += 1
+        if result.verdict == label:
+            correct += 1
+        elif result.verdict:
+            false_accept += 1
+        else:
+            false_reject += 1
+        if show_errors and result.verdict != label:
+            print(f"    {'FALSE ACCEPT' if result.verdict else 'FALSE REJECT'} score={result.score:.2f} "
+                  f"'{answer}' vs '{references[story][question]}'")
+    total = len(LABELLED_ANSWERS)
+    return local / total, (correct / local if local else 0.0), false_accept, false_reject, local
+
+
+def main(args):
+    references = load_references()
+    total = len(LABELLED_ANSWERS)
+    positives = sum(1 for *_, label in LABELLED_ANSWERS if label)
+    print(f"{total} labelled answers ({positives} correct, {total - positives} wrong)\n")
+
+    grader = AnswerGrader(accept=args.accept, reject=args.reject)
+    start = time.perf_counter()
+    coverage, accuracy, false_accept, false_reject, local = evaluate(grader, references, args.show_errors)
+    per_answer_ms = (time.perf_counter() - start) * 1000 / total
+    print(f"accept >= {args.accept}, reject <= {args.reject}")
+    print(f"  coverage {coverage:.0%} ({local}/{total} graded locally, {total - local} sent to the LLM)")
+    print(f"  accuracy {accuracy:.1%} of local verdicts, {false_accept} false accepts, {false_reject} false rejects")
+    print(f"  {per_answer_ms:.2f} ms per answer locally (vs one LLM round trip each)\n")
+
+    print("Threshold sweep")
+    print(f"  {'accept':>6} {'reject':>6} {'coverage':>9} {'accuracy':>9} {'f.acc':>6} {'f.rej':>6}")
+    for accept in (0.4, 0.45, 0.5, 0.55, 0.6, 0.7):
+        for reject in (0.1, 0.15, 0.2, 0.25, 0.3):
+            if reject >= accept:
+                continue
+            coverage, accuracy, false_accept, false_reject, _ = evaluate(AnswerGrader(accept, reject), references)
+            print(f"  {accept:>6.2f} {reject:>6.2f} {coverage:>9.0%} {accuracy:>9.1%} {false_accept:>6} {false_reject:>6}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--accept", type=float, default=None, help="accept threshold (default: settings)")
+    parser.add_argument("--reject", type=float, default=None, help="reject threshold (default: settings)")
+    parser.add_argument("--show-errors", action="store_true", help="print every wrong local verdict")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    from app.config import settings
+    if args.accept is None:
+        args.accept = settings.answer_grader_accept
+    if args.reject is None:
+        args.reject = settings.answer_grader_reject
+    main(args)
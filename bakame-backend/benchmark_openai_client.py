@@ -0,0 +1,172 @@
+"""
+Concurrent-turn throughput of chat completions: blocking client vs pooled async client.
+
+Starts a local fake OpenAI server (separate process) whose
+/v1/chat/completions answers after --latency-ms, then runs --turns
+completions at each --concurrency level through:
+
+  blocking  the synchronous openai.OpenAI client called inside an async def,
+            as OpenAIService.generate_response used to - every call stalls
+            the event loop, so concurrent turns run one after another
+  async     OpenAIService.generate_response on the shared AsyncOpenAI client
+            (pooled keep-alive connections, timeout, retries)
+
+Reports turns per second, per-turn latency and event-loop lag (how late a
+20 ms timer fires while the turns run - what a live call's audio tasks see).
+
+    python benchmark_openai_client.py --latency-ms 800 --concurrency 1,10,50
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import multiprocessing
+import sys
+import time
+
+sys.path.append('.')
+
+from app.config import settings
+from app.services.metrics_service import LatencyHistogram, elapsed_ms
+
+
+def run_fake_openai_server(port: int, latency_ms: float, ready):
+    """Process entry point: a minimal chat completions endpoint."""
+    import uvicorn
+    from fastapi import FastAPI, Request
+
+    app = FastAPI()
+
+    @app.post("/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        await asyncio.sleep(latency_ms / 1000.0)
+        return {
+            "id": "chatcmpl-bench",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o-mini"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "Great question! Let's think about it together."},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 60, "completion_tokens": 12, "total_tokens": 72}
+        }
+
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+    server = uvicorn.Server(config)
+
+    async def serve():
+        task = asyncio.create_task(server.serve())
+        while not server.started:
+            await asyncio.sleep(0.05)
+        ready.set()
+        await task
+
+    asyncio.run(serve())
+
+
+async def blocking_turn(client, user_input: str) -> str:
+    """The old generate_response: a synchronous HTTP call inside a coroutine."""
+    response = client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[{"role": "user", "content": user_input}],
+        max_tokens=300,
+        temperature=0.9
+    )
+    return response.choices[0].message.content.strip()
+
+
+async def monitor_loop_lag(histogram: LatencyHistogram, interval: float = 0.02):
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        histogram.record(max(0.0, (loop.time() - start - interval) * 1000))
+
+
+async def run_level(turn, concurrency: int, turns: int):
+    """Run `turns` completions, `concurrency` at a time; returns (turns/s, latency, loop lag, failures)."""
+    latency = LatencyHistogram(window=turns)
+    lag = LatencyHistogram(window=100000)
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = 0
+
+    async def one(index: int):
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            result = await turn(f"What is {index} plus {index}?")
+            latency.record(elapsed_ms(start))
+            if result.startswith("Error"):
+                failures += 1
+
+    monitor = asyncio.create_task(monitor_loop_lag(lag))
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(turns)))
+    wall = time.perf_counter() - start
+    # Let the monitor see its overdue timer - a blocked loop never gave it the chance
+    await asyncio.sleep(0.05)
+    monitor.cancel()
+    return turns / wall, latency, lag, failures
+
+
+async def main(args):
+    import openai
+    from app.services.openai_service import OpenAIService
+
+    base_url = f"http://127.0.0.1:{args.port}/v1"
+    blocking_client = openai.OpenAI(api_key="benchmark", base_url=base_url, max_retries=0)
+    settings.openai_base_url = base_url
+    async_service = OpenAIService(api_key="benchmark")
+    modes = [("blocking", lambda text: blocking_turn(blocking_client, text)),
+             ("async", lambda text: async_service.generate_response(text, {}))]
+
+    # Warm both clients' connections so the first level doesn't pay the handshakes
+    # (the service prints every call; keep that out of the report)
+    for _, turn in modes:
+        with contextlib.redirect_stdout(io.StringIO()):
+            await turn("warm up")
+
+    print(f"Fake server latency {args.latency_ms:.0f}ms, {args.turns} turns per level")
+    print(f"  {'mode':<9} {'conc':>5} {'turns/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'lag p95':>8} {'lag max':>8} {'fail':>5}")
+    results = {}
+    for concurrency in args.concurrency:
+        for label, turn in modes:
+            with contextlib.redirect_stdout(io.StringIO()):
+                rate, latency, lag, failures = await run_level(turn, concurrency, args.turns)
+            results[(label, concurrency)] = rate
+            print(f"  {label:<9} {concurrency:>5} {rate:>8.1f} {latency.percentile(50):>8.0f} "
+                  f"{latency.percentile(95):>8.0f} {lag.percentile(95) or 0:>8.1f} {lag.max_ms:>8.1f} {failures:>5}")
+    print()
+    for concurrency in args.concurrency:
+        speedup = results[("async", concurrency)] / results[("blocking", concurrency)]
+        print(f"  {concurrency:>3} concurrent turns: async client {speedup:.1f}x the throughput")
+
+    blocking_client.close()
+    await async_service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="fake completion latency")
+    parser.add_argument("--concurrency", default="1,10,50", help="comma-separated concurrent turn counts")
+    parser.add_argument("--turns", type=int, default=50, help="completions per level")
+    parser.add_argument("--port", type=int, default=8792, help="fake server port")
+    args = parser.parse_args()
+    args.concurrency = [int(level) for level in args.concurrency.split(",")]
+
+    logging.disable(logging.WARNING)
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(target=run_fake_openai_server, args=(args.port, args.latency_ms, ready), daemon=True)
+    server.start()
+    if not ready.wait(15):
+        server.terminate()
+        raise SystemExit("fake OpenAI server did not start")
+    try:
+        asyncio.run(main(args))
+    finally:
+        server.terminate()
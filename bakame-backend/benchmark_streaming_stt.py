@@ -0,0 +1,80 @@
+"""
+Offline turn-latency benchmark for the streaming STT path.
+
+Plays synthetic caller turns (tone = speech, digital silence = pause) as 20 ms
+µ-law frames into StreamingSTTSession with the LocalStandInTranscriber, and reports
+how long after the caller stops speaking the transcript reaches the module.
+
+    python benchmark_streaming_stt.py --turns 20 --calls 10 --silence-ms 700
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+sys.path.append('.')
+
+from app.services.audio_utils import EnergyVAD, FRAME_BYTES, FRAME_MS, synth_ulaw_tone, ulaw_silence
+from app.services.metrics_service import LatencyHistogram, elapsed_ms
+from app.services.streaming_stt_service import LocalStandInTranscriber, StreamingSTTSession
+
+
+async def run_call(call_id: str, args, turn_latency: LatencyHistogram):
+    speech = synth_ulaw_tone(args.speech_ms)
+    pause = ulaw_silence(args.pause_ms)
+    speech_ended_at = {}
+
+    async def on_utterance(call_control_id: str, transcript: str):
+        turn_latency.record(elapsed_ms(speech_ended_at["t"]))
+
+    session = StreamingSTTSession(
+        call_control_id=call_id,
+        transcriber=LocalStandInTranscriber(finalize_latency_ms=args.finalize_ms),
+        on_utterance=on_utterance,
+        vad=EnergyVAD(silence_ms=args.silence_ms)
+    )
+
+    frame_interval = FRAME_MS / 1000.0 / args.speedup
+    next_send = time.perf_counter()
+    for _ in range(args.turns):
+        for audio, is_speech in ((speech, True), (pause, False)):
+            for offset in range(0, len(audio), FRAME_BYTES):
+                await session.handle_frame(audio[offset:offset + FRAME_BYTES])
+                if is_speech:
+                    speech_ended_at["t"] = time.perf_counter()
+                next_send += frame_interval
+                delay = next_send - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+    await session.close()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=5, help="concurrent simulated calls")
+    parser.add_argument("--turns", type=int, default=10, help="caller turns per call")
+    parser.add_argument("--speech-ms", type=int, default=1500)
+    parser.add_argument("--pause-ms", type=int, default=2000)
+    parser.add_argument("--silence-ms", type=int, default=700, help="VAD end-of-utterance hangover")
+    parser.add_argument("--finalize-ms", type=float, default=50.0, help="stand-in transcriber latency")
+    parser.add_argument("--speedup", type=float, default=1.0, help="play audio faster than real time")
+    args = parser.parse_args()
+
+    if args.pause_ms <= args.silence_ms:
+        parser.error("--pause-ms must be longer than --silence-ms or utterances never end")
+
+    turn_latency = LatencyHistogram()
+    start = time.perf_counter()
+    await asyncio.gather(*[run_call(f"bench-{i}", args, turn_latency) for i in range(args.calls)])
+
+    stats = turn_latency.snapshot()
+    print(f"Simulated {args.calls} calls x {args.turns} turns in {elapsed_ms(start) / 1000:.1f}s "
+          f"(speedup {args.speedup}x)")
+    print(f"End of speech -> transcript at module: p50={stats['p50_ms']}ms "
+          f"p95={stats['p95_ms']}ms p99={stats['p99_ms']}ms max={stats['max_ms']}ms "
+          f"({stats['count']} turns)")
+    print(f"Expected floor: VAD hangover {args.silence_ms}ms / speedup + transcriber {args.finalize_ms}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
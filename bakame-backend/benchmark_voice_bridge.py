@@ -0,0 +1,183 @@
+"""
+CPU cost of the Telnyx <-> OpenAI Realtime voice bridge, per call-second of audio.
+
+Feeds one call's worth of pre-serialized Telnyx media messages through
+VoiceBridgeService.handle_telnyx_event and OpenAI audio deltas through
+OpenAIRealtimeService.listen_for_events, with in-memory fake websockets on
+both sides (full duplex, so an upper bound), then reports process CPU time
+per second of audio and how many calls one core could bridge. The fake
+sockets build real websocket frames (masked on the OpenAI client leg) and
+yield to the event loop per message like a real read, so per-message framing
+and task hand-off costs are counted; the socket write itself is not.
+
+Compares the legacy path (decode/re-encode, stdlib json, one append per
+20 ms frame) against base64 passthrough with pre-serialized envelopes on the
+fast JSON codec.
+
+    python benchmark_voice_bridge.py --seconds 60
+"""
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import sys
+import time
+
+sys.path.append('.')
+
+from app.config import settings
+from app.services import json_codec
+from app.services.audio_utils import FRAME_BYTES, FRAME_MS, synth_ulaw_tone
+from websockets.frames import Frame, Opcode
+
+
+class FakeTelnyxSocket:
+    """Replays pre-serialized media stream messages, collects what the bridge sends back."""
+
+    def __init__(self, messages):
+        self._messages = iter(messages)
+        self.sent = 0
+
+    async def receive_text(self) -> str:
+        # A real socket read suspends, letting the bridge's sender tasks run
+        await asyncio.sleep(0)
+        try:
+            return next(self._messages)
+        except StopIteration:
+            raise ConnectionError("stream finished")
+
+    async def send_text(self, text: str):
+        Frame(Opcode.TEXT, text.encode()).serialize(mask=False, extensions=[])
+        self.sent += 1
+
+
+class FakeOpenAISocket:
+    """Async-iterable OpenAI Realtime socket that replays server events."""
+
+    def __init__(self, messages=()):
+        self._messages = list(messages)
+        self.sent = 0
+
+    async def send(self, text: str):
+        Frame(Opcode.TEXT, text.encode()).serialize(mask=True, extensions=[])
+        self.sent += 1
+
+    async def close(self):
+        pass
+
+    def __aiter__(self):
+        return self._replay()
+
+    async def _replay(self):
+        for message in self._messages:
+            await asyncio.sleep(0)
+            yield message
+
+
+def build_traffic(seconds: float, outbound_chunk_ms: int):
+    frame = base64.b64encode(synth_ulaw_tone(FRAME_MS)[:FRAME_BYTES]).decode()
+    frames = int(seconds * 1000 / FRAME_MS)
+    inbound = [json.dumps({
+        "event": "start",
+        "stream_id": "bench-stream",
+        "start": {"media_format": {"encoding": "PCMU", "sample_rate": 8000, "channels": 1}}
+    })]
+    inbound += [json.dumps({
+        "event": "media",
+        "stream_id": "bench-stream",
+        "media": {"track": "inbound", "chunk": str(i), "timestamp": str(i * FRAME_MS), "payload": frame}
+    }) for i in range(frames)]
+
+    chunk = base64.b64encode(synth_ulaw_tone(outbound_chunk_ms)).decode()
+    chunks = int(seconds * 1000 / outbound_chunk_ms)
+    outbound = [json.dumps({
+        "type": "response.audio.delta",
+        "event_id": f"event_{i}",
+        "response_id": "resp_bench",
+        "item_id": "item_bench",
+        "output_index": 0,
+        "content_index": 0,
+        "delta": chunk
+    }) for i in range(chunks)]
+    return inbound, outbound
+
+
+async def run_mode(passthrough: bool, backend: str, inbound, outbound):
+    """Bridge one call's traffic; returns CPU seconds used and upstream messages sent."""
+    from app.services.openai_realtime_service import OpenAIRealtimeService
+    from app.services.voice_bridge_service import VoiceBridgeService
+
+    settings.voice_bridge_passthrough = passthrough
+    # Pacing sends at wall-clock rate; this measures forwarding cost, so deltas go straight out
+    settings.voice_bridge_paced_output = False
+    json_codec.use_backend(backend)
+
+    bridge = VoiceBridgeService()
+    openai_service = OpenAIRealtimeService()
+    openai_service.ws = FakeOpenAISocket(outbound)
+    openai_service.is_connected = True
+    telnyx_ws = FakeTelnyxSocket(inbound)
+    await bridge.attach_session("bench-call", openai_service, telnyx_ws)
+
+    start = time.process_time()
+    # Inbound first so the stream_id is known before the outbound deltas arrive
+    await _drain_inbound(bridge, telnyx_ws)
+    await openai_service.listen_for_events()
+    session = bridge.active_sessions["bench-call"]
+    await session["upstream"].close(drain_timeout=5.0)
+    await session["downstream"].close(drain_timeout=5.0)
+    cpu = time.process_time() - start
+
+    stats = session["stats"]
+    if stats.inbound_frames != len(inbound) - 1 or telnyx_ws.sent != len(outbound):
+        raise RuntimeError(f"bridge forwarded {stats.inbound_frames}/{len(inbound) - 1} inbound frames, "
+                           f"{telnyx_ws.sent}/{len(outbound)} outbound chunks")
+    return cpu, openai_service.ws.sent
+
+
+async def _drain_inbound(bridge, telnyx_ws):
+    """listen_to_telnyx minus the session teardown at end of input."""
+    while True:
+        try:
+            data = await telnyx_ws.receive_text()
+        except ConnectionError:
+            return
+        await bridge.handle_telnyx_event("bench-call", json_codec.loads(data))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=60.0, help="seconds of call audio to bridge")
+    parser.add_argument("--outbound-chunk-ms", type=int, default=20,
+                        help="audio per OpenAI delta (smaller = more messages)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per mode (best is reported)")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    settings.openai_api_key = settings.openai_api_key or "benchmark"
+
+    inbound, outbound = build_traffic(args.seconds, args.outbound_chunk_ms)
+    codec = 'orjson' if json_codec.orjson else 'json'
+    modes = [("legacy (decode/re-encode, json)", False, "json"),
+             (f"passthrough ({codec})", True, "orjson")]
+
+    print(f"{args.seconds:.0f}s of full-duplex audio: {len(inbound) - 1} inbound frames, "
+          f"{len(outbound)} outbound deltas of {args.outbound_chunk_ms}ms")
+    results = {}
+    for label, passthrough, backend in modes:
+        runs = [await run_mode(passthrough, backend, inbound, outbound) for _ in range(args.repeat)]
+        cpu, upstream = min(runs)
+        per_call_second_us = cpu / args.seconds * 1e6
+        results[label] = per_call_second_us
+        print(f"  {label:<50} {per_call_second_us:8.1f} µs CPU per call-second "
+              f"-> ~{1e6 / per_call_second_us:,.0f} calls per core, "
+              f"{upstream / args.seconds:.0f} upstream msgs/s")
+
+    legacy = results[modes[0][0]]
+    for label, per_call_second_us in list(results.items())[1:]:
+        print(f"  speedup vs legacy, {label}: {legacy / per_call_second_us:.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
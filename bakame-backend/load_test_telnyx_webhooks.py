@@ -0,0 +1,399 @@
+"""
+Webhook replay load test for the record-based Telnyx call flow (/telnyx/incoming).
+
+Plays simulated callers against a running app: each call goes
+call.initiated -> call.answered -> call.speak.ended -> call.recording.saved
+-> ... -> call.hangup, started at --cps calls per second. The app's Call
+Control commands go to a local stand-in for api.telnyx.com/v2 that logs
+every command's timing and drives the call forward the way Telnyx would:
+
+  answer        -> call.answered after --answer-ms
+  speak         -> call.speak.ended once the text would have been spoken
+                   (--speak-chars-per-second), client_state echoed back
+  record_start  -> call.recording.saved after --utterance-ms, with a WAV
+                   served by the stand-in; hangup after the last turn
+
+Reports webhook ack time (POST -> 200), turn latency (recording.saved
+sent -> the AI's answer arriving as a speak command, skipping the
+"thinking" filler) and the Telnyx commands issued per turn, p50/p95/p99.
+
+Turn latency includes whatever the app does for STT and the AI reply
+with the keys it has; without keys it measures the error-line path,
+which is reported separately. Streaming STT mode (media streams) is not
+simulated - run the app with STT_MODE=recording.
+
+    # spawn the app on a free port, wired to the stand-in
+    python load_test_telnyx_webhooks.py --spawn-app --cps 2 --duration 30
+
+    # or against an app started with TELNYX_API_URL=http://127.0.0.1:8790/v2
+    python load_test_telnyx_webhooks.py --target http://127.0.0.1:8000 --cps 5
+"""
+import argparse
+import asyncio
+import base64
+import logging
+import os
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+sys.path.append('.')
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request, Response
+
+from app.services.audio_utils import synth_ulaw_tone, ulaw_to_wav
+from app.services.metrics_service import LatencyHistogram, elapsed_ms
+
+# The router's fixed lines, to tell an AI answer from an error line (kept in sync by import)
+from app.routers.telnyx_webhooks import FILLER_STATE, ERROR_REQUEST, ERROR_MESSAGE, ERROR_NOT_CAUGHT, \
+    ERROR_RECORDING_ACCESS, ERROR_RECORDING_MISSING
+
+ERROR_LINES = {ERROR_REQUEST, ERROR_MESSAGE, ERROR_NOT_CAUGHT, ERROR_RECORDING_ACCESS, ERROR_RECORDING_MISSING}
+# Wide enough to keep every sample of a run for exact percentiles
+WINDOW = 1_000_000
+
+
+class SimulatedCall:
+    """One caller's progress through the flow, plus what the app did on its behalf."""
+
+    def __init__(self, turns: int):
+        self.call_control_id = f"v3:load-{uuid.uuid4().hex}"
+        self.call_session_id = str(uuid.uuid4())
+        self.from_number = f"+1555{uuid.uuid4().int % 10_000_000:07d}"
+        self.turns_left = turns
+        self.turn = 0
+        self.turn_started_at: Optional[float] = None
+        self.turn_answered = False
+        self.turn_commands: Counter = Counter()
+        # perf_counter of the last webhook sent for the call - commands are timed from it
+        self.last_webhook_at = time.perf_counter()
+        self.last_activity = time.monotonic()
+        self.done = asyncio.Event()
+        self.stalled = False
+
+
+class LoadReport:
+    def __init__(self):
+        self.ack = LatencyHistogram(window=WINDOW)
+        self.ack_by_event: Dict[str, LatencyHistogram] = defaultdict(lambda: LatencyHistogram(window=WINDOW))
+        self.ack_status: Counter = Counter()
+        self.turn_latency = LatencyHistogram(window=WINDOW)
+        self.error_turn_latency = LatencyHistogram(window=WINDOW)
+        self.unanswered_turns = 0
+        self.commands_per_turn: List[int] = []
+        self.turn_actions: Counter = Counter()
+        # Webhook sent -> command arrival, per action (how long the app took to react)
+        self.command_reaction: Dict[str, LatencyHistogram] = defaultdict(lambda: LatencyHistogram(window=WINDOW))
+        self.calls_started = 0
+        self.calls_completed = 0
+        self.calls_stalled = 0
+
+
+class TelnyxStandIn:
+    """
+    Local stand-in for the Call Control API. Answers every command with 200 after
+    --api-latency-ms and schedules the webhooks Telnyx would send in response.
+    """
+
+    def __init__(self, args, report: LoadReport, sender: "WebhookSender"):
+        self.args = args
+        self.report = report
+        self.sender = sender
+        self.calls: Dict[str, SimulatedCall] = {}
+        self.unknown_commands = 0
+        self.pending = set()
+        self.recording = ulaw_to_wav(synth_ulaw_tone(args.utterance_ms, frequency=180.0))
+
+        self.app = FastAPI()
+        self.app.post("/v2/calls/{call_control_id}/actions/{action}")(self.handle_command)
+        self.app.get("/recordings/{name}")(self.serve_recording)
+
+    async def handle_command(self, call_control_id: str, action: str, request: Request):
+        payload = await request.json()
+        call = self.calls.get(call_control_id)
+        if call is None:
+            self.unknown_commands += 1
+        else:
+            self.on_command(call, action, payload)
+        if self.args.api_latency_ms:
+            await asyncio.sleep(self.args.api_latency_ms / 1000.0)
+        return {"data": {"call_control_id": call_control_id, "result": "ok"}}
+
+    async def serve_recording(self, name: str):
+        return Response(content=self.recording, media_type="audio/wav")
+
+    def on_command(self, call: SimulatedCall, action: str, payload: dict):
+        now = time.perf_counter()
+        call.last_activity = time.monotonic()
+        self.report.command_reaction[action].record((now - call.last_webhook_at) * 1000)
+        if call.turn_started_at is not None:
+            call.turn_commands[action] += 1
+
+        if action == "answer":
+            self.later(self.args.answer_ms, call, "call.answered")
+        elif action in ("speak", "gather_using_speak"):
+            text = payload.get("payload") or payload.get("prompt_text") or ""
+            state = _decode_state(payload.get("client_state"))
+            if call.turn_started_at is not None and not call.turn_answered and state != FILLER_STATE:
+                call.turn_answered = True
+                latency = (now - call.turn_started_at) * 1000
+                (self.report.error_turn_latency if text in ERROR_LINES else self.report.turn_latency).record(latency)
+            spoken_ms = 1000.0 * len(text) / self.args.speak_chars_per_second
+            self.later(spoken_ms, call, "call.speak.ended", client_state=payload.get("client_state"))
+        elif action == "record_start":
+            if call.turns_left > 0:
+                self.later(self.args.utterance_ms, call, "call.recording.saved")
+            else:
+                self.later(self.args.utterance_ms, call, "call.hangup")
+
+    def later(self, delay_ms: float, call: SimulatedCall, event_type: str, **payload):
+        asyncio.get_running_loop().call_later(delay_ms / 1000.0, self._deliver, call, event_type, payload)
+
+    def _deliver(self, call: SimulatedCall, event_type: str, payload: dict):
+        task = asyncio.create_task(self.sender.deliver(call, event_type, **payload))
+        # Hold a reference until it finishes so the task isn't garbage collected mid-flight
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+
+
+class WebhookSender:
+    """POSTs webhooks to the app and times each acknowledgement."""
+
+    def __init__(self, args, report: LoadReport):
+        self.args = args
+        self.report = report
+        self.standin: Optional[TelnyxStandIn] = None
+        self.client = httpx.AsyncClient(
+            base_url=args.target,
+            limits=httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections),
+            timeout=30.0
+        )
+
+    async def deliver(self, call: SimulatedCall, event_type: str, **extra):
+        if call.done.is_set():
+            return
+        if event_type in ("call.recording.saved", "call.hangup"):
+            self.close_turn(call)
+        if event_type == "call.recording.saved":
+            call.turns_left -= 1
+            call.turn += 1
+            extra["recording_urls"] = {
+                "wav": f"{self.args.standin_url}/recordings/{call.call_session_id}-{call.turn}.wav"
+            }
+
+        payload = {
+            "call_control_id": call.call_control_id,
+            "call_leg_id": call.call_session_id,
+            "call_session_id": call.call_session_id,
+            "connection_id": "load-test",
+            "from": call.from_number,
+            "to": "+15550000000",
+            "direction": "incoming",
+            **{key: value for key, value in extra.items() if value is not None}
+        }
+        body = {
+            "data": {
+                "record_type": "event",
+                "event_type": event_type,
+                "id": str(uuid.uuid4()),
+                "occurred_at": datetime.now(timezone.utc).isoformat(),
+                "payload": payload
+            },
+            "meta": {"attempt": 1, "delivered_to": f"{self.args.target}/telnyx/incoming"}
+        }
+
+        start = time.perf_counter()
+        # Commands are timed from the webhook POST; the app may act on it before the ack returns
+        call.last_webhook_at = start
+        call.last_activity = time.monotonic()
+        if event_type == "call.recording.saved":
+            call.turn_started_at = start
+        status = "error"
+        try:
+            response = await self.client.post("/telnyx/incoming", json=body)
+            status = response.status_code
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        ack_ms = elapsed_ms(start)
+        ok = status == 200
+        self.report.ack.record(ack_ms, ok=ok)
+        self.report.ack_by_event[event_type].record(ack_ms, ok=ok)
+        self.report.ack_status[status] += 1
+        if event_type == "call.hangup":
+            call.done.set()
+
+    def close_turn(self, call: SimulatedCall):
+        if call.turn_started_at is None:
+            return
+        if not call.turn_answered:
+            self.report.unanswered_turns += 1
+        self.report.commands_per_turn.append(sum(call.turn_commands.values()))
+        self.report.turn_actions.update(call.turn_commands)
+        call.turn_started_at = None
+        call.turn_answered = False
+        call.turn_commands = Counter()
+
+
+async def run_call(call: SimulatedCall, sender: WebhookSender, report: LoadReport, stall_seconds: float):
+    report.calls_started += 1
+    await sender.deliver(call, "call.initiated", state="parked")
+    while not call.done.is_set():
+        try:
+            await asyncio.wait_for(call.done.wait(), timeout=1.0)
+        except asyncio.TimeoutError:
+            if time.monotonic() - call.last_activity > stall_seconds:
+                # The app stopped driving the call - hang up so it is cleaned up on the app side too
+                call.stalled = True
+                report.calls_stalled += 1
+                await sender.deliver(call, "call.hangup", hangup_cause="timeout")
+    if not call.stalled:
+        report.calls_completed += 1
+
+
+async def wait_for_app(target: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(timeout=2.0) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(f"{target}/telnyx/health")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.5)
+    raise SystemExit(f"app at {target} did not become healthy")
+
+
+def spawn_app(args) -> subprocess.Popen:
+    env = dict(os.environ)
+    env["TELNYX_API_URL"] = f"{args.standin_url}/v2"
+    env.setdefault("TELNYX_API_KEY", "load-test")
+    env.setdefault("STT_MODE", "record")
+    # Warm Realtime sessions only serve the voice bridge, not this flow
+    env["REALTIME_POOL_SIZE"] = "0"
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.app_port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL if not args.verbose else None
+    )
+
+
+async def run(args) -> LoadReport:
+    report = LoadReport()
+    sender = WebhookSender(args, report)
+    standin = sender.standin = TelnyxStandIn(args, report, sender)
+    server = uvicorn.Server(uvicorn.Config(standin.app, host="127.0.0.1", port=args.standin_port,
+                                           log_level="warning", access_log=False))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    app_process = spawn_app(args) if args.spawn_app else None
+    try:
+        await wait_for_app(args.target)
+        total = max(1, int(args.cps * args.duration))
+        print(f"Starting {total} calls at {args.cps:g}/s, {args.turns} turns each, against {args.target}")
+        started = time.perf_counter()
+        calls = []
+        for index in range(total):
+            delay = started + index / args.cps - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            call = SimulatedCall(args.turns)
+            standin.calls[call.call_control_id] = call
+            calls.append(asyncio.create_task(run_call(call, sender, report, args.stall_seconds)))
+        await asyncio.gather(*calls)
+        report.wall_seconds = time.perf_counter() - started
+        report.unknown_commands = standin.unknown_commands
+    finally:
+        if app_process is not None:
+            app_process.terminate()
+            app_process.wait(timeout=10)
+        await sender.client.aclose()
+        server.should_exit = True
+        await server_task
+    return report
+
+
+def _decode_state(client_state: Optional[str]) -> Optional[str]:
+    if not client_state:
+        return None
+    try:
+        return base64.b64decode(client_state).decode()
+    except Exception:
+        return None
+
+
+def _percentiles(histogram: LatencyHistogram) -> str:
+    if not histogram.count:
+        return "no samples"
+    return (f"p50 {histogram.percentile(50):8.1f}  p95 {histogram.percentile(95):8.1f}  "
+            f"p99 {histogram.percentile(99):8.1f}  max {histogram.max_ms:8.1f} ms  (n={histogram.count})")
+
+
+def print_report(report: LoadReport):
+    print()
+    print(f"Calls: {report.calls_started} started, {report.calls_completed} completed, "
+          f"{report.calls_stalled} stalled, {report.wall_seconds:.1f}s wall")
+    statuses = ", ".join(f"{status}: {count}" for status, count in report.ack_status.most_common())
+    print(f"Webhook ack time        {_percentiles(report.ack)}  [{statuses}]")
+    for event_type, histogram in sorted(report.ack_by_event.items()):
+        print(f"  {event_type:<22}{_percentiles(histogram)}")
+
+    print(f"Turn latency (answer)   {_percentiles(report.turn_latency)}")
+    print(f"Turn latency (error)    {_percentiles(report.error_turn_latency)}")
+    if report.unanswered_turns:
+        print(f"  {report.unanswered_turns} turns got no spoken reply before the next event")
+
+    per_turn = sorted(report.commands_per_turn)
+    if per_turn:
+        mean = sum(per_turn) / len(per_turn)
+        p95 = per_turn[min(len(per_turn) - 1, int(round(0.95 * (len(per_turn) - 1))))]
+        breakdown = ", ".join(f"{action} {count / len(per_turn):.2f}"
+                              for action, count in report.turn_actions.most_common())
+        print(f"Telnyx commands/turn    mean {mean:.2f}  p95 {p95}  max {per_turn[-1]}  ({breakdown})")
+
+    print("Command reaction (webhook sent -> command at the stand-in)")
+    for action, histogram in sorted(report.command_reaction.items()):
+        print(f"  {action:<22}{_percentiles(histogram)}")
+    if report.unknown_commands:
+        print(f"  {report.unknown_commands} commands for unknown calls")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", default=None, help="app base URL (default: the spawned app)")
+    parser.add_argument("--spawn-app", action="store_true", help="start the app with uvicorn, wired to the stand-in")
+    parser.add_argument("--app-port", type=int, default=8791, help="port for --spawn-app")
+    parser.add_argument("--standin-port", type=int, default=8790, help="Call Control stand-in port")
+    parser.add_argument("--cps", type=float, default=1.0, help="new calls per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to keep starting calls")
+    parser.add_argument("--turns", type=int, default=3, help="caller turns per call")
+    parser.add_argument("--utterance-ms", type=int, default=3000, help="caller speech per turn")
+    parser.add_argument("--answer-ms", type=int, default=200, help="answer -> call.answered")
+    parser.add_argument("--speak-chars-per-second", type=float, default=150.0, help="TTS playback speed")
+    parser.add_argument("--api-latency-ms", type=float, default=50.0, help="stand-in response time per command")
+    parser.add_argument("--stall-seconds", type=float, default=60.0, help="hang up calls idle this long")
+    parser.add_argument("--max-connections", type=int, default=100, help="webhook sender connections")
+    parser.add_argument("--verbose", action="store_true", help="show app stderr when spawned")
+    args = parser.parse_args()
+
+    if args.target is None:
+        if not args.spawn_app:
+            parser.error("pass --target or --spawn-app")
+        args.target = f"http://127.0.0.1:{args.app_port}"
+    args.target = args.target.rstrip("/")
+    args.standin_url = f"http://127.0.0.1:{args.standin_port}"
+    if not args.spawn_app:
+        print(f"The app must run with TELNYX_API_URL={args.standin_url}/v2")
+
+    logging.disable(logging.WARNING)
+    print_report(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
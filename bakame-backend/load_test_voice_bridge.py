@@ -0,0 +1,406 @@
+"""
+Concurrent-call capacity of the Telnyx <-> OpenAI Realtime voice bridge on one worker.
+
+Three parts, all local:
+  - fake OpenAI Realtime server (separate process, real websockets): runs an
+    energy VAD on the appended audio and answers each caller turn after
+    --response-latency-ms with --response-ms of audio, streamed --generation-speed
+    times faster than real time
+  - fake Telnyx media streams (in process): each call plays µ-law at real time
+    into VoiceBridgeService.start_session - speech, then silence until the AI's
+    reply has played, then speech again
+  - ramp driver: raises the number of concurrent calls step by step and
+    records, per step, process CPU per bridged 20 ms frame, end-to-end audio
+    latency (caller stops talking -> first AI frame back at the caller) and
+    event-loop lag, then prints a capacity report
+
+End-to-end latency includes the server's VAD silence and the configured
+response latency; "overhead" subtracts both, leaving what the bridge adds
+(queues, jitter buffer, websocket hops).
+
+    python load_test_voice_bridge.py --ramp 1,5,10,25,50 --step-seconds 20
+"""
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import multiprocessing
+import sys
+import time
+
+sys.path.append('.')
+
+from app.config import settings
+from app.services.audio_utils import EnergyVAD, FRAME_BYTES, FRAME_MS, synth_ulaw_tone, ulaw_silence
+from app.services.metrics_service import LatencyHistogram
+
+# A reply not heard within this long counts as timed out
+REPLY_TIMEOUT_S = 15.0
+
+
+# ---------------------------------------------------------------------------
+# Fake OpenAI Realtime server
+# ---------------------------------------------------------------------------
+
+def run_fake_realtime_server(port: int, options: dict, ready):
+    """Process entry point: serve until terminated."""
+    asyncio.run(_serve_fake_realtime(port, options, ready))
+
+
+async def _serve_fake_realtime(port: int, options: dict, ready):
+    from websockets.asyncio.server import serve
+
+    delta_ms = options["delta_ms"]
+    chunk = base64.b64encode(synth_ulaw_tone(delta_ms, frequency=220.0)).decode()
+    chunks = max(1, options["response_ms"] // delta_ms)
+    interval = delta_ms / 1000.0 / options["generation_speed"]
+
+    async def respond(ws, item_id: str):
+        await asyncio.sleep(options["response_latency_ms"] / 1000.0)
+        await ws.send(json.dumps({"type": "response.created", "response": {"id": f"resp_{item_id}"}}))
+        for index in range(chunks):
+            await ws.send(json.dumps({
+                "type": "response.output_audio.delta",
+                "response_id": f"resp_{item_id}",
+                "item_id": item_id,
+                "output_index": 0,
+                "content_index": 0,
+                "delta": chunk
+            }))
+            await asyncio.sleep(interval)
+        await ws.send(json.dumps({"type": "response.output_audio.done", "item_id": item_id}))
+        await ws.send(json.dumps({"type": "response.done", "response": {"id": f"resp_{item_id}", "status": "completed"}}))
+
+    async def handler(ws):
+        vad = EnergyVAD(silence_ms=options["vad_silence_ms"])
+        received_ms = 0
+        turns = 0
+        responding = None
+        await ws.send(json.dumps({"type": "session.created"}))
+        try:
+            async for message in ws:
+                event = json.loads(message)
+                event_type = event.get("type")
+                if event_type == "session.update":
+                    await ws.send(json.dumps({"type": "session.updated"}))
+                elif event_type == "input_audio_buffer.append":
+                    audio = base64.b64decode(event["audio"])
+                    for offset in range(0, len(audio) - FRAME_BYTES + 1, FRAME_BYTES):
+                        received_ms += FRAME_MS
+                        edge = vad.process(audio[offset:offset + FRAME_BYTES])
+                        if edge == "speech_start":
+                            await ws.send(json.dumps({
+                                "type": "input_audio_buffer.speech_started",
+                                "audio_start_ms": received_ms - vad.start_frames * FRAME_MS
+                            }))
+                        elif edge == "speech_end":
+                            await ws.send(json.dumps({"type": "input_audio_buffer.speech_stopped",
+                                                      "audio_end_ms": received_ms}))
+                            turns += 1
+                            responding = asyncio.create_task(respond(ws, f"item_{turns}"))
+                elif event_type == "response.cancel" and responding is not None:
+                    responding.cancel()
+                    await ws.send(json.dumps({"type": "response.done", "response": {"status": "cancelled"}}))
+        finally:
+            if responding is not None:
+                responding.cancel()
+
+    async with serve(handler, "127.0.0.1", port):
+        ready.set()
+        await asyncio.Future()
+
+
+# ---------------------------------------------------------------------------
+# Fake Telnyx media streams
+# ---------------------------------------------------------------------------
+
+def _media_message(audio: bytes) -> str:
+    return json.dumps({"event": "media", "stream_id": "load-test",
+                       "media": {"track": "inbound", "payload": base64.b64encode(audio).decode()}})
+
+
+SPEECH_FRAME = _media_message(synth_ulaw_tone(FRAME_MS)[:FRAME_BYTES])
+SILENCE_FRAME = _media_message(ulaw_silence(FRAME_MS))
+START_MESSAGE = json.dumps({"event": "start", "stream_id": "load-test",
+                            "start": {"media_format": {"encoding": "PCMU", "sample_rate": 8000, "channels": 1}}})
+STOP_MESSAGE = json.dumps({"event": "stop", "stream_id": "load-test"})
+
+
+class FakeTelnyxCall:
+    """
+    One phone call's media stream, standing in for the Telnyx websocket the bridge reads
+    and writes. Frames are produced by the shared CallClock, one per 20 ms tick.
+    """
+
+    def __init__(self, call_id: str, speech_ms: int, pause_ms: int, results: "StepResults", lead_frames: int = 0):
+        self.call_id = call_id
+        self.speech_frames = max(1, speech_ms // FRAME_MS)
+        self.pause_s = pause_ms / 1000.0
+        self.results = results
+        self.inbound: asyncio.Queue = asyncio.Queue()
+        self.inbound.put_nowait(START_MESSAGE)
+
+        # Silence before the first turn, so calls don't speak in lockstep
+        self.lead_frames = lead_frames
+        self.speaking_left = self.speech_frames
+        self.speech_ended_at = None
+        self.last_ai_frame_at = 0.0
+        self.finished = False
+
+    # --- websocket interface used by VoiceBridgeService ---
+
+    async def receive_text(self) -> str:
+        return await self.inbound.get()
+
+    async def send_text(self, text: str):
+        if not text.startswith('{"event":"media"'):
+            return
+        now = time.perf_counter()
+        self.results.frames_out += 1
+        if self.speech_ended_at is not None:
+            self.results.record_reply(now - self.speech_ended_at)
+            self.speech_ended_at = None
+        self.last_ai_frame_at = now
+
+    # --- caller behaviour ---
+
+    def tick(self, now: float):
+        if self.finished:
+            return
+        if self.lead_frames > 0:
+            self.inbound.put_nowait(SILENCE_FRAME)
+            self.lead_frames -= 1
+        elif self.speaking_left > 0:
+            self.inbound.put_nowait(SPEECH_FRAME)
+            self.speaking_left -= 1
+            if self.speaking_left == 0:
+                self.speech_ended_at = now
+        else:
+            self.inbound.put_nowait(SILENCE_FRAME)
+            if self.speech_ended_at is not None:
+                if now - self.speech_ended_at > REPLY_TIMEOUT_S:
+                    self.results.timeouts += 1
+                    self.speech_ended_at = None
+                    self.speaking_left = self.speech_frames
+            elif now - self.last_ai_frame_at > self.pause_s:
+                # The reply has finished playing - take the next turn
+                self.speaking_left = self.speech_frames
+        self.results.frames_in += 1
+
+    def hang_up(self):
+        self.finished = True
+        self.inbound.put_nowait(STOP_MESSAGE)
+
+
+class CallClock:
+    """One real-time 20 ms tick feeding every fake call (one timer, however many calls)."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        next_at = loop.time()
+        while True:
+            now = time.perf_counter()
+            for call in self.calls:
+                call.tick(now)
+            next_at += FRAME_MS / 1000.0
+            delay = next_at - loop.time()
+            if delay < -FRAME_MS / 1000.0:
+                next_at = loop.time()
+            await asyncio.sleep(max(0.0, delay))
+
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+class StepResults:
+    def __init__(self):
+        self.frames_in = 0
+        self.frames_out = 0
+        self.timeouts = 0
+        self.reply_latency = LatencyHistogram(window=100000)
+        self.loop_lag = LatencyHistogram(window=100000)
+
+    def record_reply(self, seconds: float):
+        self.reply_latency.record(seconds * 1000)
+
+
+async def monitor_loop_lag(holder: dict, interval: float = 0.05):
+    """How late the event loop wakes a sleeping task - the queueing every coroutine sees."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        holder["results"].loop_lag.record(max(0.0, (loop.time() - start - interval) * 1000))
+
+
+def _bridge_counters(bridge) -> dict:
+    totals = {"underruns": 0, "overrun_frames": 0, "dropped": 0}
+    for session in bridge.active_sessions.values():
+        pacer = session.get("pacer")
+        if pacer is not None:
+            totals["underruns"] += pacer.underruns
+            totals["overrun_frames"] += pacer.overrun_frames
+        totals["dropped"] += session["downstream"].dropped + session["upstream"].dropped
+    return totals
+
+
+async def drive(args) -> list:
+    from app.services.voice_bridge_service import voice_bridge_service as bridge
+    from app.services.realtime_pool_service import realtime_pool
+
+    realtime_pool.size = args.pool_size
+    realtime_pool.start()
+
+    holder = {"results": StepResults()}
+    clock = CallClock()
+    tasks = [asyncio.create_task(clock.run()), asyncio.create_task(monitor_loop_lag(holder))]
+    sessions = []
+    report = []
+
+    for level in args.ramp:
+        while len(clock.calls) < level:
+            call = FakeTelnyxCall(f"load-{len(clock.calls)}", args.speech_ms, args.pause_ms, holder["results"],
+                                  lead_frames=len(clock.calls) * 7 % 50)
+            clock.calls.append(call)
+            sessions.append(asyncio.create_task(bridge.start_session(call.call_id, call)))
+        # Let new calls connect and reach their first reply before measuring
+        await asyncio.sleep(args.settle_seconds)
+
+        results = holder["results"] = StepResults()
+        for call in clock.calls:
+            call.results = results
+        counters_before = _bridge_counters(bridge)
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        await asyncio.sleep(args.step_seconds)
+        cpu = time.process_time() - cpu_start
+        wall = time.perf_counter() - wall_start
+        counters_after = _bridge_counters(bridge)
+
+        frames = results.frames_in + results.frames_out
+        overhead_p95 = None
+        if results.reply_latency.count:
+            overhead_p95 = results.reply_latency.percentile(95) - args.vad_silence_ms - args.response_latency_ms
+        step = {
+            "calls": level,
+            "active_sessions": len(bridge.active_sessions),
+            "cpu_pct": 100.0 * cpu / wall,
+            "us_per_frame": cpu / frames * 1e6 if frames else None,
+            "loop_lag_p95_ms": results.loop_lag.percentile(95),
+            "loop_lag_max_ms": results.loop_lag.max_ms,
+            "reply_p50_ms": results.reply_latency.percentile(50),
+            "reply_p95_ms": results.reply_latency.percentile(95),
+            "overhead_p95_ms": overhead_p95,
+            "replies": results.reply_latency.count,
+            "timeouts": results.timeouts,
+            **{key: counters_after[key] - counters_before.get(key, 0) for key in counters_after}
+        }
+        report.append(step)
+        print_step(step)
+
+    # "stop" ends each bridge session; the readers are then left waiting on sockets nobody closes
+    for call in clock.calls:
+        call.hang_up()
+    deadline = time.monotonic() + 10
+    while bridge.active_sessions and time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+    for task in sessions + tasks:
+        task.cancel()
+    await asyncio.gather(*sessions, *tasks, return_exceptions=True)
+    await realtime_pool.stop()
+    return report
+
+
+def _fmt(value, pattern="{:.1f}"):
+    return "-" if value is None else pattern.format(value)
+
+
+def print_step(step: dict):
+    print(f"  {step['calls']:>5} {step['active_sessions']:>6} {step['cpu_pct']:>6.1f} "
+          f"{_fmt(step['us_per_frame']):>9} {_fmt(step['loop_lag_p95_ms']):>8} {_fmt(step['loop_lag_max_ms']):>8} "
+          f"{_fmt(step['reply_p50_ms'], '{:.0f}'):>8} {_fmt(step['reply_p95_ms'], '{:.0f}'):>8} "
+          f"{_fmt(step['overhead_p95_ms'], '{:.0f}'):>9} {step['replies']:>7} {step['timeouts']:>5} "
+          f"{step['underruns']:>6} {step['dropped'] + step['overrun_frames']:>7}", flush=True)
+
+
+def print_capacity(report: list, args):
+    def healthy(step):
+        return (
+            step["active_sessions"] >= step["calls"]
+            and step["cpu_pct"] < args.max_cpu_pct
+            and (step["loop_lag_p95_ms"] or 0.0) <= args.max_loop_lag_ms
+            and step["overhead_p95_ms"] is not None and step["overhead_p95_ms"] <= args.max_overhead_ms
+            and step["timeouts"] == 0
+        )
+
+    sustained = [step for step in report if healthy(step)]
+    print()
+    print(f"Limits: cpu < {args.max_cpu_pct:.0f}%, loop lag p95 <= {args.max_loop_lag_ms:.0f}ms, "
+          f"bridge overhead p95 <= {args.max_overhead_ms:.0f}ms, no reply timeouts")
+    if sustained:
+        best = sustained[-1]
+        print(f"Sustained: {best['calls']} concurrent calls on one worker "
+              f"({best['cpu_pct']:.0f}% CPU, {_fmt(best['us_per_frame'])} µs per frame)")
+    else:
+        print("Sustained: none of the steps stayed within limits")
+    busiest = report[-1]
+    if busiest["us_per_frame"]:
+        # 50 frames/s each way per call
+        per_core = 1e6 / (busiest["us_per_frame"] * 100)
+        print(f"CPU-bound ceiling at {busiest['calls']} calls: ~{per_core:,.0f} calls per core "
+              f"(fake callers in this process included)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ramp", default="1,5,10,25", help="comma-separated concurrent call counts")
+    parser.add_argument("--step-seconds", type=float, default=20.0, help="measurement time per step")
+    parser.add_argument("--settle-seconds", type=float, default=5.0, help="time for new calls to connect")
+    parser.add_argument("--speech-ms", type=int, default=1500, help="length of each caller turn")
+    parser.add_argument("--pause-ms", type=int, default=500, help="caller's pause after the AI stops")
+    parser.add_argument("--response-latency-ms", type=int, default=300, help="fake model's time to first audio")
+    parser.add_argument("--response-ms", type=int, default=2000, help="audio per AI reply")
+    parser.add_argument("--delta-ms", type=int, default=100, help="audio per response.output_audio.delta")
+    parser.add_argument("--generation-speed", type=float, default=3.0, help="reply audio generated x real time")
+    parser.add_argument("--vad-silence-ms", type=int, default=500, help="fake server VAD end-of-speech silence")
+    parser.add_argument("--pool-size", type=int, default=4, help="warm Realtime sessions")
+    parser.add_argument("--port", type=int, default=8765, help="fake Realtime server port")
+    parser.add_argument("--max-cpu-pct", type=float, default=85.0)
+    parser.add_argument("--max-loop-lag-ms", type=float, default=20.0)
+    parser.add_argument("--max-overhead-ms", type=float, default=400.0)
+    parser.add_argument("--verbose", action="store_true", help="keep bridge logging")
+    args = parser.parse_args()
+    args.ramp = [int(level) for level in args.ramp.split(",")]
+
+    if not args.verbose:
+        logging.disable(logging.WARNING)
+    settings.openai_api_key = settings.openai_api_key or "load-test"
+    settings.openai_realtime_url = f"ws://127.0.0.1:{args.port}"
+
+    options = {key: getattr(args, key) for key in
+               ("response_latency_ms", "response_ms", "delta_ms", "generation_speed", "vad_silence_ms")}
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(target=run_fake_realtime_server, args=(args.port, options, ready), daemon=True)
+    server.start()
+    if not ready.wait(10):
+        server.terminate()
+        raise SystemExit("fake Realtime server did not start")
+
+    print(f"Ramping {args.ramp} calls, {args.step_seconds:.0f}s per step "
+          f"(paced output {settings.voice_bridge_paced_output}, "
+          f"jitter {settings.voice_bridge_jitter_ms}ms)")
+    print(f"  {'calls':>5} {'active':>6} {'cpu%':>6} {'µs/frame':>9} {'lag p95':>8} {'lag max':>8} "
+          f"{'e2e p50':>8} {'e2e p95':>8} {'overhead':>9} {'replies':>7} {'t/o':>5} {'undrun':>6} {'dropped':>7}")
+    try:
+        report = asyncio.run(drive(args))
+    finally:
+        server.terminate()
+    print_capacity(report, args)
+
+
+if __name__ == "__main__":
+    main()
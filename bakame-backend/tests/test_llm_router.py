@@ -0,0 +1,207 @@
+import asyncio
+
+import pytest
+
+from app.services.llm_router_service import CircuitBreaker, LLMProvider, LLMProviderRouter, ProviderUnavailable
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeBackend:
+    """A provider call that answers (or raises) after `delay` seconds and records max_tokens"""
+
+    def __init__(self, reply: str = "ok", delay: float = 0.0, fail: bool = False):
+        self.reply = reply
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self.cancelled = 0
+        self.max_tokens = []
+
+    async def __call__(self, messages, max_tokens):
+        self.calls += 1
+        self.max_tokens.append(max_tokens)
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise RuntimeError(f"{self.reply} down")
+        return self.reply
+
+
+def make_router(primary: FakeBackend, fallback: FakeBackend, hedge_ms: float = 50, failures: int = 3):
+    return LLMProviderRouter(
+        LLMProvider("llama", primary, CircuitBreaker(failures, 30.0)),
+        LLMProvider("openai", fallback, CircuitBreaker(failures, 30.0)),
+        hedge_ms=hedge_ms
+    )
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=30.0, clock=FakeClock())
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.times_opened == 1
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker(failure_threshold=2, clock=FakeClock())
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_lets_one_trial_through():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30.0, clock=clock)
+    breaker.record_failure()
+
+    clock.now = 30.0
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_failed_trial_reopens_the_circuit():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=30.0, clock=clock)
+    for _ in range(3):
+        breaker.record_failure()
+
+    clock.now = 31.0
+    assert breaker.allow()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.opened_at == 31.0
+    assert not breaker.allow()
+
+
+def test_released_trial_frees_the_slot():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30.0, clock=clock)
+    breaker.record_failure()
+    clock.now = 30.0
+
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+
+@pytest.mark.asyncio
+async def test_fast_primary_wins_without_asking_the_fallback():
+    primary, fallback = FakeBackend("llama"), FakeBackend("openai")
+    router = make_router(primary, fallback)
+
+    assert await router.complete(MESSAGES, max_tokens=800) == "llama"
+    assert fallback.calls == 0
+    assert primary.max_tokens == [800]
+    assert router.primary.wins == 1
+
+
+@pytest.mark.asyncio
+async def test_slow_primary_is_hedged_and_cancelled():
+    primary, fallback = FakeBackend("llama", delay=1.0), FakeBackend("openai")
+    router = make_router(primary, fallback, hedge_ms=20)
+
+    assert await router.complete(MESSAGES) == "openai"
+    assert router.hedged == 1
+    assert primary.cancelled == 1
+    # Losing a hedge race is not a failure
+    assert router.primary.breaker.consecutive_failures == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_primary_fails_over_immediately():
+    primary, fallback = FakeBackend("llama", fail=True), FakeBackend("openai")
+    router = make_router(primary, fallback, hedge_ms=1000)
+
+    assert await router.complete(MESSAGES, max_tokens=300) == "openai"
+    assert router.failovers == 1
+    assert router.hedged == 0
+    assert fallback.max_tokens == [300]
+
+
+@pytest.mark.asyncio
+async def test_empty_reply_counts_as_a_failure():
+    primary, fallback = FakeBackend(""), FakeBackend("openai")
+    router = make_router(primary, fallback)
+
+    assert await router.complete(MESSAGES) == "openai"
+    assert router.primary.failures == 1
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_skips_the_primary():
+    primary, fallback = FakeBackend("llama", fail=True), FakeBackend("openai")
+    router = make_router(primary, fallback, failures=2)
+    for _ in range(3):
+        await router.complete(MESSAGES)
+
+    assert primary.calls == 2
+    assert fallback.calls == 3
+    assert router.primary.short_circuited == 1
+
+
+@pytest.mark.asyncio
+async def test_both_providers_failing_raises_the_fallback_error():
+    primary, fallback = FakeBackend("llama", fail=True), FakeBackend("openai", fail=True)
+    router = make_router(primary, fallback)
+
+    with pytest.raises(RuntimeError, match="openai down"):
+        await router.complete(MESSAGES)
+    assert router.exhausted == 1
+    assert (primary.calls, fallback.calls) == (1, 1)
+    assert router.primary.failures == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_primary_with_fallback_unavailable_raises_the_primary_error():
+    router = make_router(FakeBackend("llama", fail=True), FakeBackend("openai"))
+    router.fallback.enabled = False
+
+    with pytest.raises(RuntimeError, match="llama down"):
+        await router.complete(MESSAGES)
+
+
+@pytest.mark.asyncio
+async def test_hedged_requests_failing_together_raise_the_fallback_error():
+    router = make_router(FakeBackend("llama", fail=True), FakeBackend("openai", fail=True))
+    # The fallback fails first, and both tasks are already in one done set when collected
+    fallback = asyncio.create_task(router.fallback.run(MESSAGES, 100))
+    primary = asyncio.create_task(router.primary.run(MESSAGES, 100))
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(RuntimeError, match="openai down"):
+        await router._collect({primary: router.primary, fallback: router.fallback})
+
+
+@pytest.mark.asyncio
+async def test_no_available_provider_raises_provider_unavailable():
+    router = make_router(FakeBackend("llama"), FakeBackend("openai"))
+    router.primary.enabled = False
+    router.fallback.enabled = False
+
+    with pytest.raises(ProviderUnavailable):
+        await router.complete(MESSAGES)
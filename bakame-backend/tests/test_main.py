@@ -0,0 +1,29 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+
+client = TestClient(app)
+
+def test_root_endpoint():
+    """Test the root endpoint returns correct response"""
+    response = client.get("/")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["message"] == "BAKAME Learning Assistant API - Telnyx Call Control"
+    assert data["voice_provider"] == "Telnyx"
+    assert data["api_version"] == "v2"
+    assert data["endpoints"]["telnyx_webhook"] == "/telnyx/incoming"
+
+def test_health_check():
+    """Test the health check endpoint"""
+    response = client.get("/health")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "healthy"
+    assert data["voice_provider"] == "telnyx"
+
+def test_cors_headers():
+    """Test that CORS headers are properly set"""
+    response = client.get("/", headers={"Origin": "https://example.com"})
+    assert response.status_code == 200
+    assert response.headers["access-control-allow-origin"] == "https://example.com"
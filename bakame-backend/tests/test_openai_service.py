@@ -0,0 +1,99 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.openai_service import OpenAIService
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeCompletions:
+    """Stands in for client.chat.completions: counts calls, answers after a short delay"""
+
+    def __init__(self, delay: float = 0.02, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("upstream error")
+        message = SimpleNamespace(content=f"reply {self.calls}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+@pytest.fixture
+def service():
+    service = OpenAIService(api_key="test-key-for-unit-tests")
+    service.completions = FakeCompletions()
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=service.completions))
+    return service
+
+
+async def test_identical_concurrent_requests_share_one_call(service):
+    replies = await asyncio.gather(*(service.generate_response("Hello", {}) for _ in range(5)))
+
+    assert set(replies) == {"reply 1"}
+    assert service.completions.calls == 1
+    assert service.coalesced == 4
+
+
+async def test_sampled_requests_are_not_cached(service):
+    await service.generate_response("Hello", {})
+    await service.generate_response("Hello", {})
+
+    assert service.completions.calls == 2
+    assert service.cache_hits == 0
+
+
+async def test_temperature_zero_results_are_cached(service):
+    first = await service.generate_response("Grade this", {}, temperature=0)
+    second = await service.generate_response("Grade this", {}, temperature=0)
+
+    assert first == second
+    assert service.completions.calls == 1
+    assert service.cache_hits == 1
+
+
+async def test_errors_are_not_cached(service):
+    service.completions.fail = True
+    assert (await service.generate_response("Grade this", {}, temperature=0)).startswith("Error:")
+
+    service.completions.fail = False
+    assert await service.generate_response("Grade this", {}, temperature=0) == "reply 2"
+
+
+async def test_one_caller_cancelling_does_not_cancel_the_shared_call(service):
+    messages = [{"role": "user", "content": "hi"}]
+    first = asyncio.create_task(service.complete(messages))
+    second = asyncio.create_task(service.complete(messages))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == "reply 1"
+    assert first.cancelled()
+
+
+async def test_utterance_pool_refills_are_sampled_not_cached(service, monkeypatch):
+    from app.modules import general_module
+    from app.routers import webhooks
+
+    monkeypatch.setattr(general_module, "openai_service", service)
+    greetings = [await webhooks.utterance_pool.generators["greeting"]() for _ in range(3)]
+
+    assert len(set(greetings)) == 3
+    assert service.cache_hits == 0
+
+
+async def test_fixed_error_line_hits_the_cache(service, monkeypatch):
+    from app.modules import general_module
+
+    monkeypatch.setattr(general_module, "openai_service", service)
+    for _ in range(3):
+        await general_module.general_module.process("System error occurred", {}, temperature=0)
+
+    assert service.completions.calls == 1
+    assert service.cache_hits == 2
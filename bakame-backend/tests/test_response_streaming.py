@@ -0,0 +1,62 @@
+from app.services.response_streaming_service import SentenceSegmenter
+
+
+def segment(*deltas: str, min_chars: int = 12):
+    segmenter = SentenceSegmenter(min_chars=min_chars)
+    sentences = []
+    for delta in deltas:
+        sentences.extend(segmenter.push(delta))
+    remainder = segmenter.flush()
+    if remainder:
+        sentences.append(remainder)
+    return sentences
+
+
+def test_splits_on_terminal_punctuation():
+    assert segment("Great job today! What is seven plus five? Take your time.") == [
+        "Great job today!", "What is seven plus five?", "Take your time."
+    ]
+
+
+def test_sentence_is_emitted_once_the_next_delta_starts():
+    segmenter = SentenceSegmenter()
+
+    assert segmenter.push("Well done, that is") == []
+    assert segmenter.push(" correct. Now") == ["Well done, that is correct."]
+    assert segmenter.flush() == "Now"
+
+
+def test_does_not_split_on_abbreviations_or_decimals():
+    assert segment("Mr. Johnson paid 2.50 francs for it. Dr. Uwimana agreed.") == [
+        "Mr. Johnson paid 2.50 francs for it.", "Dr. Uwimana agreed."
+    ]
+
+
+def test_keeps_closing_quotes_with_the_sentence():
+    assert segment('She said "thank you so much." Then she left the room.') == [
+        'She said "thank you so much."', "Then she left the room."
+    ]
+
+
+def test_splits_on_line_breaks():
+    assert segment("Here is your problem\nWhat is ten minus four") == [
+        "Here is your problem", "What is ten minus four"
+    ]
+
+
+def test_short_fragments_merge_into_the_next_sentence():
+    assert segment("Yes. That is exactly right.") == ["Yes. That is exactly right."]
+
+
+def test_sentence_final_no_is_split():
+    assert segment("The answer is no. ", "Next, try this one.") == ["The answer is no.", "Next, try this one."]
+
+
+def test_no_before_a_number_is_an_abbreviation():
+    assert segment("Turn to page No. 5 in your book. Read it.", min_chars=1) == [
+        "Turn to page No. 5 in your book.", "Read it."
+    ]
+
+
+def test_no_is_held_until_the_next_delta_shows_what_follows():
+    assert segment("Turn to page no. ", "5 in your book.") == ["Turn to page no. 5 in your book."]
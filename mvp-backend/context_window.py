@@ -0,0 +1,178 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Any, List, Optional
+
+from session_store import CallSession
+
+# Chat format overhead per message (role, separators), on top of the content
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_HEADER = "\n\nEarlier in this call (summary): "
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English) - cheap enough for every turn"""
+    return len(text) // 4 + 1
+
+
+def message_tokens(message: Dict[str, str]) -> int:
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+class PromptWindow:
+    """The messages to send for one turn, and what the budget saved against sending the full history"""
+
+    __slots__ = ("messages", "prompt_tokens", "baseline_tokens", "dropped_messages")
+
+    def __init__(self, messages: List[Dict[str, str]], prompt_tokens: int, baseline_tokens: int, dropped_messages: int):
+        self.messages = messages
+        self.prompt_tokens = prompt_tokens
+        self.baseline_tokens = baseline_tokens
+        self.dropped_messages = dropped_messages
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.baseline_tokens - self.prompt_tokens)
+
+
+class ConversationContextManager:
+    """
+    Keeps each call's prompt under a token budget.
+
+    The last `keep_turns` exchanges go to the model verbatim. Once older messages pile up
+    beyond that, a background task folds them into the session's rolling summary (the
+    previous summary plus the folded messages, condensed by `summarize`) and removes them
+    from the history - the turn that triggers it doesn't wait. The prompt is the system
+    prompt with the summary appended, then as many recent messages as fit in
+    `max_prompt_tokens`, newest first; the caller's latest message is always included.
+    """
+
+    def __init__(self, summarize: Callable[[CallSession, str, List[Dict[str, str]]], Awaitable[str]],
+                 keep_turns: int = 4, fold_turns: int = 2, max_prompt_tokens: int = 1500,
+                 summary_max_tokens: int = 200, baseline_messages: int = 40):
+        self.summarize = summarize
+        self.keep_messages = keep_turns * 2
+        # Fold in batches so summarization runs every few turns, not every turn
+        self.fold_messages = max(1, fold_turns) * 2
+        self.max_prompt_tokens = max_prompt_tokens
+        self.summary_max_tokens = summary_max_tokens
+        # The old prompt: system prompt + up to this many messages of raw history
+        self.baseline_messages = baseline_messages
+
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.turns = 0
+        self.tokens_sent = 0
+        self.tokens_saved = 0
+        self.budget_drops = 0
+        self.summaries = 0
+        self.summary_failures = 0
+        self.summary_ms = deque(maxlen=200)
+
+    def build(self, session: CallSession, system_prompt: str) -> PromptWindow:
+        """Prompt messages for the next completion (the caller's message must already be in the history)"""
+        summary = session.summary
+        system_content = system_prompt + (SUMMARY_HEADER + summary if summary else "")
+        system_tokens = estimate_tokens(system_content) + MESSAGE_OVERHEAD_TOKENS
+        if system_tokens > self.max_prompt_tokens and summary:
+            # Over budget before any history - shorten the summary rather than lose the instructions
+            spare_chars = max(0, (self.max_prompt_tokens - estimate_tokens(system_prompt) - MESSAGE_OVERHEAD_TOKENS) * 4)
+            system_content = system_prompt + SUMMARY_HEADER + summary[:spare_chars]
+            system_tokens = estimate_tokens(system_content) + MESSAGE_OVERHEAD_TOKENS
+
+        recent: List[Dict[str, str]] = []
+        used = system_tokens
+        for index, message in enumerate(reversed(session.messages)):
+            cost = message_tokens(message)
+            if index > 0 and used + cost > self.max_prompt_tokens:
+                break
+            recent.append(message)
+            used += cost
+        recent.reverse()
+        dropped = len(session.messages) - len(recent)
+        if dropped and len(recent) < self.keep_messages:
+            self.budget_drops += 1
+
+        history = session.folded_tokens + [message_tokens(message) for message in session.messages]
+        baseline = (estimate_tokens(system_prompt) + MESSAGE_OVERHEAD_TOKENS
+                    + sum(history[-self.baseline_messages:]))
+
+        window = PromptWindow([{"role": "system", "content": system_content}] + recent, used, baseline, dropped)
+        self.turns += 1
+        self.tokens_sent += window.prompt_tokens
+        self.tokens_saved += window.tokens_saved
+        return window
+
+    def maybe_summarize(self, session: CallSession) -> Optional[asyncio.Task]:
+        """Start folding old messages into the summary in the background, if enough have piled up"""
+        foldable = len(session.messages) - self.keep_messages
+        if foldable < self.fold_messages:
+            return None
+        running = self._tasks.get(session.call_sid)
+        if running is not None and not running.done():
+            return None
+        folded = session.messages[:foldable]
+        task = asyncio.create_task(self._fold(session, folded))
+        self._tasks[session.call_sid] = task
+        task.add_done_callback(lambda done: self._forget(session.call_sid, done))
+        return task
+
+    def _forget(self, call_sid: str, task: asyncio.Task):
+        if self._tasks.get(call_sid) is task:
+            del self._tasks[call_sid]
+
+    async def _fold(self, session: CallSession, folded: List[Dict[str, str]]):
+        start = time.perf_counter()
+        try:
+            summary = await self.summarize(session, session.summary, folded)
+        except Exception as e:
+            self.summary_failures += 1
+            print(f"[CONTEXT] Summarization failed for {session.call_sid}, keeping history: {e}")
+            return
+        self.summary_ms.append((time.perf_counter() - start) * 1000)
+        self.summaries += 1
+
+        # New messages were appended meanwhile (and the store may have trimmed the front),
+        # so remove exactly the folded message objects still at the head of the history
+        folded_ids = {id(message) for message in folded}
+        removed = 0
+        while session.messages and id(session.messages[0]) in folded_ids:
+            session.folded_tokens.append(message_tokens(session.messages.pop(0)))
+            removed += 1
+        del session.folded_tokens[:-self.baseline_messages]
+        session.summary = summary[:self.summary_max_tokens * 4].strip()
+        print(f"[CONTEXT] Folded {removed} messages for {session.call_sid} into a "
+              f"{estimate_tokens(session.summary)}-token summary")
+
+    def cancel(self, call_sid: str):
+        """Stop a pending summarization for a call that ended"""
+        task = self._tasks.pop(call_sid, None)
+        if task is not None:
+            task.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        ordered = sorted(self.summary_ms)
+        return {
+            "keep_turns": self.keep_messages // 2,
+            "max_prompt_tokens": self.max_prompt_tokens,
+            "turns": self.turns,
+            "avg_prompt_tokens": round(self.tokens_sent / self.turns, 1) if self.turns else None,
+            "tokens_saved": self.tokens_saved,
+            "budget_drops": self.budget_drops,
+            "summaries": self.summaries,
+            "summary_failures": self.summary_failures,
+            "summaries_running": sum(1 for task in self._tasks.values() if not task.done()),
+            "summary_p50_ms": round(ordered[len(ordered) // 2], 1) if ordered else None
+        }
+
+
+def create_context_manager(summarize) -> ConversationContextManager:
+    return ConversationContextManager(
+        summarize,
+        keep_turns=int(os.getenv("CONTEXT_KEEP_TURNS", "4")),
+        fold_turns=int(os.getenv("CONTEXT_FOLD_TURNS", "2")),
+        max_prompt_tokens=int(os.getenv("CONTEXT_MAX_PROMPT_TOKENS", "1500")),
+        summary_max_tokens=int(os.getenv("CONTEXT_SUMMARY_MAX_TOKENS", "200")),
+        baseline_messages=int(os.getenv("CALL_SESSION_MAX_MESSAGES", "40"))
+    )
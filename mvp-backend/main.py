@@ -1,18 +1,31 @@
 import os
 import re
+from contextlib import asynccontextmanager
 from datetime import datetime
 from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from twilio.twiml.voice_response import VoiceResponse, Gather
-from openai import OpenAI
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+import httpx
 from pydantic import BaseModel
 from typing import Optional, List, Dict
 import json
 import psycopg2
 from psycopg2.extras import RealDictCursor
 from redis_service import redis_service
+from session_store import session_store, TERMINAL_CALL_STATUSES
+from context_window import create_context_manager
 
-app = FastAPI(title="Bakame AI MVP")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Periodically sweep idle call sessions while the app is running"""
+    ensure_usage_schema()
+    session_store.start()
+    yield
+    await session_store.stop()
+    await openai_client.close()
+
+app = FastAPI(title="Bakame AI MVP", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -23,17 +36,42 @@ app.add_middleware(
 )
 
 # Using GPT-4o as requested by user
-openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# One async client for the process: completions don't block the event loop, keep-alive
+# connections are pooled, and the SDK retries connection errors, 429 and 5xx with backoff
+openai_client = AsyncOpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    timeout=httpx.Timeout(float(os.getenv("OPENAI_TIMEOUT_SECONDS", "20")), connect=5.0),
+    max_retries=int(os.getenv("OPENAI_MAX_RETRIES", "2")),
+    http_client=DefaultAsyncHttpxClient(
+        limits=httpx.Limits(
+            max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(os.getenv("OPENAI_MAX_KEEPALIVE", "20")),
+            keepalive_expiry=30.0
+        )
+    )
+)
 
 # Database connection
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# Older turns are summarized with the smaller model
+SUMMARY_MODEL = "gpt-4o-mini"
+
 def get_db_connection():
     """Create a new database connection"""
     return psycopg2.connect(DATABASE_URL)
 
-# Session storage: conversation history per call (still in-memory for active sessions)
-call_sessions = {}
+def ensure_usage_schema():
+    """Add columns newer code writes to openai_usage_logs (this service has no migration tool)"""
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("ALTER TABLE openai_usage_logs ADD COLUMN IF NOT EXISTS tokens_saved INTEGER NOT NULL DEFAULT 0")
+                conn.commit()
+    except Exception as e:
+        print(f"[DB ERROR] Failed to update openai_usage_logs schema: {e}")
+
+# Session storage: conversation history per call lives in session_store (in-memory, bounded)
 
 class CallLog(BaseModel):
     call_sid: Optional[str] = None
@@ -50,6 +88,7 @@ class OpenAIUsage(BaseModel):
     total_tokens: int
     estimated_cost: float
     request_type: str
+    tokens_saved: int = 0
     timestamp: str
 
 def get_or_create_user(phone_number: str) -> Dict:
@@ -128,6 +167,7 @@ def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> flo
     # Pricing as of 2024 (per 1M tokens)
     pricing = {
         "gpt-4o": {"prompt": 2.50, "completion": 10.00},
+        "gpt-4o-mini": {"prompt": 0.15, "completion": 0.60},
         "gpt-4": {"prompt": 30.00, "completion": 60.00},
     }
     
@@ -137,8 +177,8 @@ def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> flo
         return round(prompt_cost + completion_cost, 6)
     return 0.0
 
-def log_openai_usage(call_sid: str, model: str, usage, request_type: str):
-    """Log OpenAI API usage for cost tracking"""
+def log_openai_usage(call_sid: str, model: str, usage, request_type: str, tokens_saved: int = 0):
+    """Log OpenAI API usage for cost tracking (tokens_saved: prompt tokens the context window kept out)"""
     estimated_cost = estimate_cost(model, usage.prompt_tokens, usage.completion_tokens)
     
     try:
@@ -146,12 +186,12 @@ def log_openai_usage(call_sid: str, model: str, usage, request_type: str):
             with conn.cursor() as cur:
                 cur.execute("""
                     INSERT INTO openai_usage_logs 
-                    (call_sid, model, prompt_tokens, completion_tokens, total_tokens, estimated_cost, request_type, timestamp)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                    (call_sid, model, prompt_tokens, completion_tokens, total_tokens, estimated_cost, request_type, tokens_saved, timestamp)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
                 """, (call_sid, model, usage.prompt_tokens, usage.completion_tokens, 
-                      usage.total_tokens, estimated_cost, request_type, datetime.utcnow()))
+                      usage.total_tokens, estimated_cost, request_type, tokens_saved, datetime.utcnow()))
                 conn.commit()
-        print(f"[OPENAI USAGE] {request_type}: {usage.total_tokens} tokens, ~${estimated_cost}")
+        print(f"[OPENAI USAGE] {request_type}: {usage.total_tokens} tokens, ~${estimated_cost}, {tokens_saved} prompt tokens saved")
     except Exception as e:
         print(f"[DB ERROR] Failed to log OpenAI usage: {e}")
     
@@ -162,9 +202,32 @@ def log_openai_usage(call_sid: str, model: str, usage, request_type: str):
         "completion_tokens": usage.completion_tokens,
         "total_tokens": usage.total_tokens,
         "estimated_cost": estimated_cost,
-        "request_type": request_type
+        "request_type": request_type,
+        "tokens_saved": tokens_saved
     }
 
+async def summarize_conversation(session, previous_summary: str, messages: List[Dict[str, str]]) -> str:
+    """Fold older turns of a call into its rolling summary (runs in the background, off the turn)"""
+    transcript = "\n".join(
+        f"{'Student' if message['role'] == 'user' else 'Tutor'}: {message['content']}" for message in messages
+    )
+    completion = await openai_client.chat.completions.create(
+        model=SUMMARY_MODEL,
+        messages=[
+            {"role": "system", "content": "You keep running notes of a voice tutoring call. Update the summary with the new exchanges: "
+                                          "what the student is learning, what they got right or wrong, facts they shared about themselves, "
+                                          "and any open question. Plain sentences, no more than 120 words."},
+            {"role": "user", "content": f"Summary so far: {previous_summary or '(none)'}\n\nNew exchanges:\n{transcript}"}
+        ],
+        max_tokens=context_manager.summary_max_tokens,
+        temperature=0.2
+    )
+    log_openai_usage(session.call_sid, SUMMARY_MODEL, completion.usage, "conversation_summary")
+    return completion.choices[0].message.content
+
+# Last few turns verbatim + a rolling summary of the rest, under a prompt-token budget
+context_manager = create_context_manager(summarize_conversation)
+
 @app.get("/")
 async def root():
     return {"message": "Bakame AI MVP Backend", "status": "running"}
@@ -198,12 +261,8 @@ async def handle_incoming_call(request: Request):
         print(f"[DB ERROR] Failed to log Twilio call: {e}")
     
     # Initialize conversation history for this call (keyed by call_sid)
-    if call_sid not in call_sessions:
-        call_sessions[call_sid] = []
-        print(f"[SESSION] Started new conversation for {call_sid}")
-    
-    # Store phone number mapping for this call
-    call_sessions[f"{call_sid}_phone"] = from_number
+    session = session_store.get_or_create(call_sid, from_number)
+    session.phone_number = from_number
     
     # Log the incoming call
     try:
@@ -276,7 +335,7 @@ Remember: You're on a phone call, so be concise and conversational. Your goal is
         
         enhanced_system_prompt = system_prompt + profile_context
         
-        greeting_response = openai_client.chat.completions.create(
+        greeting_response = await openai_client.chat.completions.create(
             model="gpt-4o",
             messages=[
                 {"role": "system", "content": enhanced_system_prompt},
@@ -324,15 +383,9 @@ async def process_speech(request: Request):
         response.redirect('/voice/incoming')
         return Response(content=str(response), media_type="application/xml")
     
-    # Get phone number for this call
-    if f"{call_sid}_phone" not in call_sessions:
-        call_sessions[f"{call_sid}_phone"] = from_number
-    
-    phone_number = call_sessions.get(f"{call_sid}_phone", from_number)
-    
-    # Initialize session if needed
-    if call_sid not in call_sessions:
-        call_sessions[call_sid] = []
+    # Get (or resume) the session and the phone number for this call
+    session = session_store.get_or_create(call_sid, from_number)
+    phone_number = session.phone_number or from_number
     
     # Get user profile
     user = get_or_create_user(phone_number)
@@ -355,10 +408,10 @@ async def process_speech(request: Request):
     exit_keywords = ['goodbye', 'bye', 'stop talking', 'hang up', 'end call', 'finish']
     if check_intent(str(user_speech), exit_keywords):
         # User explicitly wants to end call
-        if call_sid in call_sessions:
-            session_length = len(call_sessions[call_sid])
-            del call_sessions[call_sid]
-            print(f"[SESSION] User ended conversation for {call_sid} ({session_length} messages)")
+        ended_session = session_store.end(call_sid)
+        context_manager.cancel(call_sid)
+        if ended_session is not None:
+            print(f"[SESSION] User ended conversation for {call_sid} ({len(ended_session.messages)} messages)")
         
         # Update Twilio call details
         try:
@@ -379,9 +432,9 @@ async def process_speech(request: Request):
         return Response(content=str(response), media_type="application/xml")
     
     # Add user message to conversation history
-    call_sessions[call_sid].append({"role": "user", "content": user_speech})
+    session_store.add_message(session, "user", user_speech)
     print(f"[GPT-4o CALL] User said: {user_speech}")
-    print(f"[SESSION] Conversation history length: {len(call_sessions[call_sid])} messages")
+    print(f"[SESSION] Conversation history length: {len(session.messages)} messages")
     
     # Get AI response from OpenAI
     try:
@@ -465,16 +518,16 @@ Remember: You're on a phone call, so be concise and conversational. Your goal is
                 profile_goal = f"\n\nGOAL: Naturally find out their {', '.join(missing_info)} during this conversation. Be conversational - don't make it feel like a form."
             
             enhanced_prompt = system_prompt + profile_goal
-            messages = [{"role": "system", "content": enhanced_prompt}] + call_sessions[call_sid]
+            window = context_manager.build(session, enhanced_prompt)
             
-            completion = openai_client.chat.completions.create(
+            completion = await openai_client.chat.completions.create(
                 model="gpt-4o",
-                messages=messages,
+                messages=window.messages,
                 temperature=1.0
             )
             
             ai_text = completion.choices[0].message.content
-            log_openai_usage(str(call_sid), "gpt-4o", completion.usage, "conversation_response")
+            log_openai_usage(str(call_sid), "gpt-4o", completion.usage, "conversation_response", window.tokens_saved)
         else:
             # Normal learning conversation for users with completed profiles
             user_name = user.get('name', 'friend')
@@ -498,21 +551,22 @@ Remember: You're on a phone call, so be concise and conversational. Your goal is
             
             context_message = "\n".join(context_parts)
             enhanced_prompt = system_prompt + f"\n\n{context_message}"
-            messages = [{"role": "system", "content": enhanced_prompt}] + call_sessions[call_sid]
+            window = context_manager.build(session, enhanced_prompt)
             
-            completion = openai_client.chat.completions.create(
+            completion = await openai_client.chat.completions.create(
                 model="gpt-4o",
-                messages=messages,
+                messages=window.messages,
                 temperature=1.0
             )
             
             ai_text = completion.choices[0].message.content
-            log_openai_usage(str(call_sid), "gpt-4o", completion.usage, "conversation_response")
+            log_openai_usage(str(call_sid), "gpt-4o", completion.usage, "conversation_response", window.tokens_saved)
         
         print(f"[GPT-4o RESPONSE] AI said: {ai_text}")
         
-        # Add assistant response to conversation history
-        call_sessions[call_sid].append({"role": "assistant", "content": ai_text})
+        # Add assistant response to conversation history, then fold old turns into the summary in the background
+        session_store.add_message(session, "assistant", ai_text)
+        context_manager.maybe_summarize(session)
         
         # Store in Redis for long-term context
         redis_service.add_to_conversation_history(phone_number, str(user_speech), str(ai_text))
@@ -559,6 +613,39 @@ def check_intent(text: str, keywords: list) -> bool:
     pattern = r'\b(' + '|'.join(map(re.escape, keywords)) + r')\b'
     return bool(re.search(pattern, text_lower))
 
+# Twilio only posts here once the phone number's "Call status changes" webhook points at this route.
+# TwiML can't set a status callback for an inbound call, so configure it on the number, e.g.
+#   twilio api:core:incoming-phone-numbers:update --sid PNxxx \
+#     --status-callback https://<host>/voice/status --status-callback-method POST
+# Without it, sessions of dropped calls are only reclaimed by the idle sweep (CALL_SESSION_IDLE_TTL_SECONDS).
+@app.post("/voice/status")
+async def handle_call_status(request: Request):
+    """Twilio status callback - release the session once the call is over (dropped calls included)"""
+    form_data = await request.form()
+    call_sid = str(form_data.get("CallSid", ""))
+    call_status = str(form_data.get("CallStatus", ""))
+    print(f"[STATUS] Call {call_sid} status: {call_status}")
+    
+    if call_status in TERMINAL_CALL_STATUSES:
+        ended_session = session_store.end(call_sid)
+        context_manager.cancel(call_sid)
+        if ended_session is not None:
+            print(f"[SESSION] Released session for {call_sid} on status {call_status} ({len(ended_session.messages)} messages)")
+        
+        try:
+            with get_db_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        UPDATE twilio_call_logs 
+                        SET end_time = COALESCE(end_time, %s), call_status = %s
+                        WHERE call_sid = %s
+                    """, (datetime.utcnow(), call_status, call_sid))
+                    conn.commit()
+        except Exception as e:
+            print(f"[DB ERROR] Failed to update call status: {e}")
+    
+    return {"status": "ok"}
+
 @app.post("/voice/continue")
 async def handle_continue(request: Request):
     """Handle user decision to continue or end call - This endpoint is now unused but kept for compatibility"""
@@ -595,6 +682,7 @@ async def get_openai_usage():
                 logs = cur.fetchall()
                 logs_list = [dict(log) for log in logs]
                 total_tokens = sum(log["total_tokens"] for log in logs_list)
+                tokens_saved = sum(log.get("tokens_saved") or 0 for log in logs_list)
                 total_cost = sum(float(log["estimated_cost"]) for log in logs_list)
                 
                 return {
@@ -602,6 +690,7 @@ async def get_openai_usage():
                     "summary": {
                         "total_requests": len(logs_list),
                         "total_tokens": total_tokens,
+                        "tokens_saved": tokens_saved,
                         "total_cost": round(total_cost, 4),
                         "greeting_requests": len([l for l in logs_list if l["request_type"] == "greeting_generation"]),
                         "conversation_requests": len([l for l in logs_list if l["request_type"] == "conversation_response"])
@@ -609,7 +698,7 @@ async def get_openai_usage():
                 }
     except Exception as e:
         print(f"[DB ERROR] Failed to fetch OpenAI usage: {e}")
-        return {"logs": [], "summary": {"total_requests": 0, "total_tokens": 0, "total_cost": 0, "greeting_requests": 0, "conversation_requests": 0}}
+        return {"logs": [], "summary": {"total_requests": 0, "total_tokens": 0, "tokens_saved": 0, "total_cost": 0, "greeting_requests": 0, "conversation_requests": 0}}
 
 @app.get("/api/twilio-calls")
 async def get_twilio_calls():
@@ -628,11 +717,12 @@ async def get_twilio_calls():
 @app.get("/api/conversations/{call_sid}")
 async def get_conversation(call_sid: str):
     """Get full conversation history for a specific call"""
-    if call_sid in call_sessions:
+    session = session_store.get(call_sid)
+    if session is not None:
         return {
             "call_sid": call_sid,
-            "messages": call_sessions[call_sid],
-            "message_count": len(call_sessions[call_sid])
+            "messages": session.messages,
+            "message_count": len(session.messages)
         }
     return {"error": "Conversation not found or already ended"}
 
@@ -656,7 +746,7 @@ async def get_dashboard_stats():
                 total_conversations = total_conversations_result["conversations"] if total_conversations_result else 0
                 
                 # Get OpenAI stats
-                cur.execute("SELECT COUNT(*) as total, COALESCE(SUM(total_tokens), 0) as tokens, COALESCE(SUM(estimated_cost), 0) as cost FROM openai_usage_logs")
+                cur.execute("SELECT COUNT(*) as total, COALESCE(SUM(total_tokens), 0) as tokens, COALESCE(SUM(estimated_cost), 0) as cost, COALESCE(SUM(tokens_saved), 0) as tokens_saved FROM openai_usage_logs")
                 openai_stats = cur.fetchone()
                 
                 # Get Twilio stats
@@ -668,11 +758,14 @@ async def get_dashboard_stats():
                         "total": total_calls,
                         "unique_callers": unique_callers,
                         "conversations": total_conversations,
-                        "active_sessions": len(call_sessions)
+                        "active_sessions": len(session_store)
                     },
+                    "sessions": session_store.get_stats(),
+                    "context": context_manager.get_stats(),
                     "openai": {
                         "total_requests": openai_stats["total"] if openai_stats else 0,
                         "total_tokens": int(openai_stats["tokens"]) if openai_stats else 0,
+                        "tokens_saved": int(openai_stats["tokens_saved"]) if openai_stats else 0,
                         "estimated_cost": round(float(openai_stats["cost"]), 4) if openai_stats else 0
                     },
                     "twilio": {
@@ -683,8 +776,10 @@ async def get_dashboard_stats():
     except Exception as e:
         print(f"[DB ERROR] Failed to fetch dashboard stats: {e}")
         return {
-            "calls": {"total": 0, "unique_callers": 0, "conversations": 0, "active_sessions": 0},
-            "openai": {"total_requests": 0, "total_tokens": 0, "estimated_cost": 0},
+            "calls": {"total": 0, "unique_callers": 0, "conversations": 0, "active_sessions": len(session_store)},
+            "sessions": session_store.get_stats(),
+            "context": context_manager.get_stats(),
+            "openai": {"total_requests": 0, "total_tokens": 0, "tokens_saved": 0, "estimated_cost": 0},
             "twilio": {"total_calls": 0, "completed_calls": 0}
         }
 
@@ -0,0 +1,152 @@
+import asyncio
+import os
+import sys
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+# Terminal Twilio CallStatus values - the session can be dropped once one of these arrives
+TERMINAL_CALL_STATUSES = {"completed", "no-answer", "busy", "failed", "canceled"}
+
+
+class CallSession:
+    """Conversation state for one active call"""
+
+    __slots__ = ("call_sid", "phone_number", "messages", "summary", "folded_tokens", "created_at", "last_active")
+
+    def __init__(self, call_sid: str, phone_number: Optional[str] = None):
+        self.call_sid = call_sid
+        self.phone_number = phone_number
+        self.messages: List[Dict[str, str]] = []
+        # Rolling summary of messages folded out of `messages`, and their token estimates
+        self.summary = ""
+        self.folded_tokens: List[int] = []
+        self.created_at = time.monotonic()
+        self.last_active = self.created_at
+
+    def approx_bytes(self) -> int:
+        size = (sys.getsizeof(self.messages) + sys.getsizeof(self.phone_number or "")
+                + sys.getsizeof(self.summary) + sys.getsizeof(self.folded_tokens))
+        for message in self.messages:
+            size += sys.getsizeof(message) + sum(sys.getsizeof(value) for value in message.values())
+        return size
+
+
+class CallSessionStore:
+    """
+    Bounded in-memory store for per-call conversation history.
+
+    Sessions are kept in least-recently-active order. The store holds at most
+    `max_sessions` calls (evicting the longest idle), drops calls idle for longer than
+    `idle_ttl_seconds` on a periodic sweep, and keeps only the last `max_messages`
+    messages of each conversation.
+    """
+
+    def __init__(self, max_sessions: int = 1000, idle_ttl_seconds: float = 7200,
+                 max_messages: int = 40, sweep_interval_seconds: float = 60):
+        self.max_sessions = max_sessions
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.max_messages = max_messages
+        self.sweep_interval_seconds = sweep_interval_seconds
+
+        self._sessions: "OrderedDict[str, CallSession]" = OrderedDict()
+        self._sweep_task: Optional[asyncio.Task] = None
+
+        self.ended = 0
+        self.expired = 0
+        self.evicted = 0
+        self.trimmed_messages = 0
+
+    def get_or_create(self, call_sid: str, phone_number: Optional[str] = None) -> CallSession:
+        """Return the call's session (marking it active), creating it if needed"""
+        session = self._sessions.get(call_sid)
+        if session is None:
+            session = CallSession(call_sid, phone_number)
+            self._sessions[call_sid] = session
+            self._evict_over_capacity()
+            print(f"[SESSION] Started new conversation for {call_sid}")
+        else:
+            self._sessions.move_to_end(call_sid)
+            if not session.phone_number:
+                session.phone_number = phone_number
+        session.last_active = time.monotonic()
+        return session
+
+    def get(self, call_sid: str) -> Optional[CallSession]:
+        """Look up a session without marking it active"""
+        return self._sessions.get(call_sid)
+
+    def add_message(self, session: CallSession, role: str, content: str):
+        """Append to the conversation, dropping the oldest messages past the cap"""
+        session.messages.append({"role": role, "content": content})
+        overflow = len(session.messages) - self.max_messages
+        if overflow > 0:
+            del session.messages[:overflow]
+            self.trimmed_messages += overflow
+        session.last_active = time.monotonic()
+
+    def end(self, call_sid: str) -> Optional[CallSession]:
+        """Drop a finished call's session"""
+        session = self._sessions.pop(call_sid, None)
+        if session is not None:
+            self.ended += 1
+        return session
+
+    def sweep(self) -> int:
+        """Drop sessions idle for longer than the TTL; returns how many were removed"""
+        cutoff = time.monotonic() - self.idle_ttl_seconds
+        removed = 0
+        while self._sessions:
+            call_sid, session = next(iter(self._sessions.items()))
+            if session.last_active >= cutoff:
+                break
+            del self._sessions[call_sid]
+            removed += 1
+        if removed:
+            self.expired += removed
+            print(f"[SESSION] Swept {removed} idle sessions ({len(self._sessions)} active)")
+        return removed
+
+    def _evict_over_capacity(self):
+        while len(self._sessions) > self.max_sessions:
+            call_sid, _ = self._sessions.popitem(last=False)
+            self.evicted += 1
+            print(f"[SESSION] Store full - evicted least recently active session {call_sid}")
+
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval_seconds)
+            self.sweep()
+
+    def start(self):
+        if self._sweep_task is None or self._sweep_task.done():
+            self._sweep_task = asyncio.create_task(self._sweep_loop())
+
+    async def stop(self):
+        if self._sweep_task is not None:
+            self._sweep_task.cancel()
+            await asyncio.gather(self._sweep_task, return_exceptions=True)
+            self._sweep_task = None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "active_sessions": len(self._sessions),
+            "messages": sum(len(session.messages) for session in self._sessions.values()),
+            "memory_bytes": sum(session.approx_bytes() for session in self._sessions.values()),
+            "ended": self.ended,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "trimmed_messages": self.trimmed_messages
+        }
+
+
+# Idle TTL must outlast the 1 hour Gather timeout, or a student who pauses to think loses their history
+session_store = CallSessionStore(
+    max_sessions=int(os.getenv("CALL_SESSION_MAX", "1000")),
+    idle_ttl_seconds=float(os.getenv("CALL_SESSION_IDLE_TTL_SECONDS", "7200")),
+    max_messages=int(os.getenv("CALL_SESSION_MAX_MESSAGES", "40")),
+    sweep_interval_seconds=float(os.getenv("CALL_SESSION_SWEEP_SECONDS", "60"))
+)